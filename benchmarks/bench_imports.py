@@ -0,0 +1,97 @@
+"""
+Время старта точек входа: сколько занимает `import main_*` сверх пустого интерпретатора,
+и какие модули тянут больше всего. Каждый импорт — в отдельном процессе (холодный
+sys.modules, тёплый дисковый кэш) вперемешку с запуском пустого интерпретатора;
+берётся медиана из --repeat таких пар.
+Бюджет (BUDGETS) — в долях старта пустого интерпретатора на той же машине, поэтому
+не зависит от её скорости. Выход за бюджет — предупреждение; с --strict — код возврата 1.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_imports.py [--repeat 7] [--top 8] [--strict] [main_dynamic ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Бюджет импорта сверх пустого интерпретатора — во сколько раз больше старта самого
+# интерпретатора. Основное, что остаётся, — pydantic (модели/нормализаторы нужны любому
+# запуску) и asyncio движка сбора; netmiko/paramiko, winrm, commands.yaml и модули
+# вендоров загружаются при первом использовании.
+BUDGETS = {
+    "main": 7,
+    "main_static": 7,
+    "main_dynamic": 7,
+    "main_compact": 2,
+    "main_daemon": 8,
+}
+
+
+def run_import(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def median_time(code: str, repeat: int) -> float:
+    return statistics.median(run_import(code) for _ in range(repeat))
+
+
+def median_overhead(module: str, repeat: int) -> float:
+    """Медиана (import module − пустой запуск) по парам соседних запусков: шум машины в паре общий."""
+    return statistics.median(run_import(f"import {module}") - run_import("pass") for _ in range(repeat))
+
+
+def top_modules(module: str, top: int):
+    """Самые тяжёлые прямые импорты точки входа по накопленному времени (python -X importtime)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    # Пакеты верхнего уровня (по накопленному времени) — что именно тянет точка входа
+    roots = [row for row in rows if row[2].startswith("  ") and not row[2].startswith("   ")]
+    return sorted(roots, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS))
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--top", type=int, default=6)
+    parser.add_argument("--strict", action="store_true", help="код возврата 1, если бюджет превышен")
+    args = parser.parse_args()
+
+    baseline = median_time("pass", args.repeat)
+    print(f"Пустой интерпретатор: {baseline * 1000:.0f} мс\n")
+    print(f"{'точка входа':<16}{'импорт, мс':>12}{'× старт':>10}{'бюджет':>10}")
+
+    over_budget = []
+    for module in args.modules:
+        elapsed = median_overhead(module, args.repeat)
+        ratio = elapsed / baseline
+        budget = BUDGETS.get(module)
+        status = "" if budget is None else ("ok" if ratio <= budget else "ПРЕВЫШЕН")
+        print(f"{module:<16}{elapsed * 1000:>12.0f}{ratio:>10.1f}{budget or '-':>10}  {status}")
+        for cumulative_us, _, name in top_modules(module, args.top):
+            print(f"{'':<18}{cumulative_us / 1000:>8.1f} мс  {name.strip()}")
+        if budget is not None and ratio > budget:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\nБюджет превышен: {', '.join(over_budget)}")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Сравнение шаблонных парсеров (src/parsers/template_engine.py) с ручными парсерами
+Nateks/RVi на синтетических таблицах. Заодно проверяет, что результаты совпадают.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_parsers.py [--lines 50000] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.parsers.nateks import NateksMacAddressTableParser, NateksArpParser
+from src.parsers.rvi import RViMacAddressTableParser
+from src.parsers.template_engine import get_template_parser
+
+DEVICE_IP = "10.60.10.1"  # есть в config/port_filters.yaml — фильтр портов тоже участвует
+
+PORTS = [f"g1/0/{i}" for i in range(1, 49)] + [f"g2/0/{i}" for i in range(1, 49)] + ["tg1/1/1", "po1"]
+
+
+def _mac(rnd: random.Random, sep: str = ".") -> str:
+    value = f"{rnd.getrandbits(48):012x}"
+    if sep == ".":
+        return f"{value[0:4]}.{value[4:8]}.{value[8:12]}"
+    return ":".join(value[i:i + 2] for i in range(0, 12, 2))
+
+
+def nateks_mac_table(lines: int, rnd: random.Random) -> str:
+    out = ["          Mac Address Table", "-------------------------------------------",
+           "Vlan    Mac Address       Type        Ports", "----    -----------       ----        -----"]
+    for _ in range(lines):
+        out.append(f"{rnd.randint(1, 4094):<8}{_mac(rnd):<18}{rnd.choice(['DYNAMIC', 'STATIC']):<12}{rnd.choice(PORTS)}")
+    out.append("Total Mac Addresses for this criterion: %d" % lines)
+    return "\n".join(out)
+
+
+def nateks_arp_table(lines: int, rnd: random.Random) -> str:
+    out = [f"Total ARP entries: {lines}", "Protocol Address         Age(min) Hardware Addr     Type   Interface"]
+    # На ядре ARP-записи приходят через десяток-другой SVI
+    svis = [rnd.randint(2, 999) for _ in range(16)]
+    for i in range(lines):
+        age = rnd.choice(["-", str(rnd.randint(0, 240))])
+        out.append(f"IP       10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}   {age:<8} {_mac(rnd, ':')} ARPA   v{rnd.choice(svis)}({rnd.choice(PORTS)})")
+    return "\n".join(out)
+
+
+def rvi_mac_table(lines: int, rnd: random.Random) -> str:
+    out = ["bridge   VLAN   port       mac             fwd   static"]
+    for _ in range(lines):
+        out.append(f"1        {rnd.randint(1, 4094):<6} {rnd.choice(PORTS):<10} {_mac(rnd)}  1     0")
+    return "\n".join(out)
+
+
+def best_of(func, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    cases = [
+        ("nateks show mac address-table", "nateks", "mac_address_table", "show mac address-table",
+         nateks_mac_table(args.lines, rnd), NateksMacAddressTableParser.parse,
+         {"device_ip": DEVICE_IP, "device_hostname": "core"}),
+        ("nateks show arp", "nateks", "arp", "show arp",
+         nateks_arp_table(args.lines, rnd), NateksArpParser.parse, {"device_ip": DEVICE_IP}),
+        ("rvi show mac address-table", "rvi", "mac_address_table", "show mac address-table",
+         rvi_mac_table(args.lines, rnd), RViMacAddressTableParser.parse,
+         {"device_ip": DEVICE_IP, "device_hostname": "rvi"}),
+    ]
+
+    print(f"Строк в таблице: {args.lines}, повторов: {args.repeat} (берём лучшее время)\n")
+    print(f"{'случай':<32}{'ручной, с':>12}{'шаблон, с':>12}{'ускорение':>12}  результат")
+
+    failed = False
+    for title, vendor, slug, command, text, hand_parse, kwargs in cases:
+        template = get_template_parser(vendor, slug)
+        hand_time, hand_result = best_of(lambda: hand_parse(command, text, vendor, **kwargs), args.repeat)
+        tpl_time, tpl_result = best_of(lambda: template.parse(command, text, vendor, **kwargs), args.repeat)
+
+        same = hand_result == tpl_result
+        failed |= not same
+        print(f"{title:<32}{hand_time:>12.3f}{tpl_time:>12.3f}{hand_time / tpl_time:>11.1f}x  "
+              f"{'совпадает' if same else 'РАСХОДИТСЯ'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Сравнение сериализаторов src/storage/file.py по размеру файла и времени записи:
+прежний формат (json, indent=2) против компактного json, NDJSON и сжатия
+gzip/zstd, со стандартным json и с orjson (если установлен). Каждый файл
+читается обратно через read_document и сверяется с исходным документом.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_serializers.py [--hosts 100000] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.storage.file import Serializer, read_document, orjson, zstandard
+
+
+def hosts_snapshot(count: int, rnd: random.Random) -> dict:
+    hosts = []
+    for i in range(count):
+        mac = f"{rnd.getrandbits(48):012x}"
+        ip = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        device_ip = f"10.60.{rnd.randint(1, 40)}.1"
+        port = f"g1/0/{rnd.randint(1, 48)}"
+        vlan = str(rnd.randint(2, 999))
+        hosts.append({
+            "mac": mac, "ip": ip, "status": "active", "type": rnd.choice(["lease", "reserved", "static"]),
+            "vlan": vlan, "port": port, "device_ip": device_ip, "device_hostname": f"sw-{device_ip}",
+            "description": None, "hostname": f"pc-{i}", "dhcp_server": "10.0.0.10", "lease_end": "2026-01-01 10:00:00",
+            "source": ["mac_table", "arp", "lease"], "ips": [ip],
+            "sightings": [{"device_ip": device_ip, "device_hostname": f"sw-{device_ip}", "port": port, "vlan": vlan}],
+            "dhcp_servers": ["10.0.0.10"],
+        })
+    return {
+        "snapshot": {"id": "bench", "type": "dynamic_hosts", "hosts_count": count},
+        "hosts": hosts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    document = hosts_snapshot(args.hosts, random.Random(42))
+
+    encoders = ["json"] + (["orjson"] if orjson is not None else [])
+    compressions = ["none", "gzip"] + (["zstd"] if zstandard is not None else [])
+    cases = [("json indent=2 (прежний)", dict(format="json", encoder="json", pretty=True))]
+    for encoder in encoders:
+        cases.append((f"json compact, {encoder}", dict(format="json", encoder=encoder, pretty=False)))
+        for compression in compressions:
+            cases.append((f"ndjson {compression}, {encoder}", dict(format="ndjson", compression=compression, encoder=encoder)))
+
+    print(f"Хостов: {args.hosts}, повторов: {args.repeat} (берём лучшее время)\n")
+    print(f"{'вариант':<28}{'размер, МБ':>12}{'запись, с':>12}{'к прежнему':>12}  чтение")
+
+    failed = False
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for title, options in cases:
+            serializer = Serializer(**options)
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                path = serializer.dump(document, Path(tmp) / "snapshot.json")
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            size = path.stat().st_size
+            baseline = baseline or (size, best)
+            same = read_document(path) == document
+            failed |= not same
+            ratio = f"{baseline[0] / size:.1f}x/{baseline[1] / best:.1f}x"
+            print(f"{title:<28}{size / 1e6:>12.2f}{best:>12.3f}{ratio:>12}  {'совпадает' if same else 'РАСХОДИТСЯ'}")
+            path.unlink()
+
+    print("\nк прежнему: во сколько раз меньше размер / быстрее запись")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+SNMP-сборщик (src/collectors/snmp_collector.py) против локального симулятора агента.
+Генерирует .snmprec коммутатора (ifTable/ifXTable, BRIDGE/Q-BRIDGE FDB, ipNetToPhysical/
+ipNetToMediaTable), поднимает snmpsim-command-responder на 127.0.0.1 и опрашивает его
+как --devices устройств (устройства различаются community — у каждого свой файл).
+Проверяет, что собранные записи совпадают со сгенерированными.
+
+Нужен snmpsim (pip install snmpsim). Запуск из корня репозитория:
+    python benchmarks/bench_snmp.py [--macs 2000] [--arps 500] [--devices 10]
+
+Симулятор можно поднять и вручную на сгенерированных файлах (--keep-data):
+    snmpsim-command-responder --data-dir=<каталог> --agent-udpv4-endpoint=127.0.0.1:11161
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.collectors.snmp_collector import DEFAULT_SNMP_CONFIG, collect_snmp_many
+from src.filters.port_filters import get_port_filter
+
+PORTS = 52
+VLANS = [1, 10, 20, 30, 670]
+
+
+def snmprec(macs: int, arps: int, qbridge: bool, rnd: random.Random):
+    """Строки .snmprec и ожидаемые записи: {(vlan, mac, port)}, {(ip, mac, interface)}."""
+    records = []
+    names = {}
+    for if_index in range(1, PORTS + 1):
+        names[if_index] = f"gi1/0/{if_index}" if if_index <= 48 else f"tg1/1/{if_index - 48}"
+    for vlan in VLANS:
+        names[1000 + vlan] = f"vlan{vlan}"
+
+    for if_index, name in names.items():
+        records += [
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 2, if_index), 4, name.upper()),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 3, if_index), 2, 6 if if_index < 1000 else 53),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 7, if_index), 2, 2 if if_index == 7 else 1),
+            ((1, 3, 6, 1, 2, 1, 2, 2, 1, 8, if_index), 2, 1 if if_index % 3 else 2),
+            ((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 1, if_index), 4, name),
+            ((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 15, if_index), 66, 1000 if if_index < 1000 else 0),
+            ((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 18, if_index), 4, f"desc {name}"),
+        ]
+    # Номер порта моста ≠ ifIndex: порт моста N — ifIndex N
+    for bridge_port in range(1, PORTS + 1):
+        records.append(((1, 3, 6, 1, 2, 1, 17, 1, 4, 1, 2, bridge_port), 2, bridge_port))
+    # FDB id 100+vlan — перевод в VLAN через dot1qVlanFdbId
+    for vlan in VLANS:
+        records.append(((1, 3, 6, 1, 2, 1, 17, 7, 1, 4, 2, 1, 3, 0, vlan), 66, 100 + vlan))
+
+    expected_macs = set()
+    for _ in range(macs):
+        mac = rnd.getrandbits(48).to_bytes(6, "big")
+        vlan = rnd.choice(VLANS)
+        bridge_port = rnd.randint(1, PORTS)
+        if qbridge:
+            index = (100 + vlan,) + tuple(mac)
+            records += [
+                ((1, 3, 6, 1, 2, 1, 17, 7, 1, 2, 2, 1, 2) + index, 2, bridge_port),
+                ((1, 3, 6, 1, 2, 1, 17, 7, 1, 2, 2, 1, 3) + index, 2, 3),
+            ]
+        else:
+            vlan = 1
+            records += [
+                ((1, 3, 6, 1, 2, 1, 17, 4, 3, 1, 2) + tuple(mac), 2, bridge_port),
+                ((1, 3, 6, 1, 2, 1, 17, 4, 3, 1, 3) + tuple(mac), 2, 3),
+            ]
+        expected_macs.add((str(vlan), mac.hex(), names[bridge_port]))
+
+    expected_arps = set()
+    for i in range(arps):
+        mac = rnd.getrandbits(48).to_bytes(6, "big")
+        vlan = rnd.choice(VLANS)
+        address = (10, vlan % 256, (i >> 8) & 0xFF, i & 0xFF)
+        if qbridge:
+            index = (1000 + vlan, 1, 4) + address
+            records += [
+                ((1, 3, 6, 1, 2, 1, 4, 35, 1, 4) + index, "4x", mac.hex()),
+                ((1, 3, 6, 1, 2, 1, 4, 35, 1, 6) + index, 2, 3),
+            ]
+        else:
+            index = (1000 + vlan,) + address
+            records += [
+                ((1, 3, 6, 1, 2, 1, 4, 22, 1, 2) + index, "4x", mac.hex()),
+                ((1, 3, 6, 1, 2, 1, 4, 22, 1, 4) + index, 2, 3),
+            ]
+        expected_arps.add((".".join(map(str, address)), mac.hex(), f"vlan{vlan}"))
+
+    lines = [f"{'.'.join(map(str, oid))}|{tag}|{value}" for oid, tag, value in sorted(records)]
+    return "\n".join(lines) + "\n", expected_macs, expected_arps
+
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--macs", type=int, default=2000)
+    parser.add_argument("--arps", type=int, default=500)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--max-repetitions", type=int, default=DEFAULT_SNMP_CONFIG["max_repetitions"])
+    parser.add_argument("--keep-data", action="store_true", help="не удалять сгенерированные .snmprec")
+    args = parser.parse_args()
+
+    responder = shutil.which("snmpsim-command-responder")
+    if not responder:
+        sys.exit("snmpsim не установлен: pip install snmpsim")
+
+    rnd = random.Random(42)
+    data_dir = Path(tempfile.mkdtemp(prefix="snmpsim-"))
+    expected = {}
+    for i in range(args.devices):
+        # Каждое второе устройство — без Q-BRIDGE-MIB и ipNetToPhysicalTable (старый агент)
+        community = f"switch{i}"
+        text, macs, arps = snmprec(args.macs, args.arps, qbridge=i % 2 == 0, rnd=rnd)
+        (data_dir / f"{community}.snmprec").write_text(text)
+        expected[community] = (macs, arps)
+
+    port = free_udp_port()
+    options = [f"--data-dir={data_dir}", f"--agent-udpv4-endpoint=127.0.0.1:{port}",
+               "--logging-method=null", f"--cache-dir={data_dir / 'cache'}"]
+    command = [responder] + options
+    if os.geteuid() == 0:
+        # От root snmpsim не запускается — сбрасываем права, каталог данных делаем читаемым.
+        # dbm и кодек latin-1 snmpsim импортирует уже после сброса прав, когда site-packages может быть
+        # недоступен, — поэтому запускаем его через python с заранее загруженными модулями
+        command = [sys.executable, "-c", "import dbm.dumb, encodings.latin_1, sys; from snmpsim.commands.responder import main; sys.exit(main())"]
+        command += options + ["--process-user=nobody", "--process-group=nogroup"]
+        data_dir.chmod(0o755)
+        (data_dir / "cache").mkdir(mode=0o777)
+        (data_dir / "cache").chmod(0o777)
+    process = subprocess.Popen(command)
+    try:
+        devices = [
+            {"ip": "127.0.0.1", "hostname": community, "snmp_port": port, "snmp_community": community, "collector": "snmp"}
+            for community in expected
+        ]
+        config = dict(DEFAULT_SNMP_CONFIG, max_repetitions=args.max_repetitions, timeout=5)
+
+        # Симулятору нужно время на индексацию файлов — ждём первого ответа
+        deadline = time.time() + 60
+        while not collect_snmp_many(devices[:1], tables=("interfaces",), config=config)[0][1]:
+            if process.poll() is not None or time.time() > deadline:
+                sys.exit("симулятор не запустился")
+            time.sleep(1)
+
+        start = time.perf_counter()
+        results = collect_snmp_many(devices, config=config)
+        elapsed = time.perf_counter() - start
+
+        port_filter = get_port_filter()
+        mismatches = 0
+        total_macs = total_arps = 0
+        for device, result in results:
+            macs, arps = expected[device["snmp_community"]]
+            # Сборщик применяет port_filters.yaml (tg*-аплинки и т.п.) — как CLI-парсеры
+            macs = {m for m in macs if not port_filter.is_ignored(device["ip"], m[2])}
+            arps = {a for a in arps if not port_filter.is_ignored(device["ip"], a[2])}
+            got_macs = {(e["vlan"], e["mac"], e["port"]) for e in result.get("mac_entries", [])}
+            got_arps = {(e["ip"], e["mac"], e["interface"]) for e in result.get("arp_entries", [])}
+            total_macs += len(got_macs)
+            total_arps += len(got_arps)
+            if got_macs != macs or got_arps != arps or len(result.get("interfaces", [])) != PORTS + len(VLANS):
+                mismatches += 1
+                print(f"{device['snmp_community']}: MAC {len(got_macs)}/{len(macs)}, ARP {len(got_arps)}/{len(arps)}")
+
+        print(f"Устройств: {args.devices}, MAC: {total_macs}, ARP: {total_arps}, max_repetitions: {args.max_repetitions}")
+        print(f"Сбор: {elapsed:.2f} с ({elapsed / args.devices * 1000:.0f} мс на устройство в среднем)")
+        print("Результаты совпадают" if not mismatches else f"Расхождения: {mismatches} устройств")
+        if mismatches:
+            sys.exit(1)
+    finally:
+        process.terminate()
+        process.wait()
+        if args.keep_data:
+            print(f"Данные симулятора: {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
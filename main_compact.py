@@ -0,0 +1,23 @@
+import argparse
+import time
+
+from src.storage.compaction import Compactor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архивация и очистка data/ (сроки — config/storage.yaml, секция retention)")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не менять")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    stats = Compactor(dry_run=args.dry_run).run()
+
+    print("Итоги compaction" + (" (dry run)" if args.dry_run else "") + ":")
+    if not stats:
+        print("  нечего архивировать и удалять")
+    for name, count in sorted(stats.items()):
+        print(f"  {name:<32} {count}")
+    print(f"\nCompaction завершён за {time.time() - start_time:.2f} секунд")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import signal
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict
+
+import yaml
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from src.collectors.command_plan import CommandPlanner, run_tick
+from src.collectors.counter_poller import CounterPoller, polls_counters
+from src.collectors.engine import CollectionEngine, load_collector_config
+from src.collectors.session_pool import SessionPool
+from src.collectors.snmp_collector import uses_snmp
+from src.collectors.ssh_collector import get_command_types
+from src.models.validation import report_validation_stats
+from src.parsers.registry import VENDOR_MODULES, load_vendor
+from src.pipeline.offload import get_offloader
+from src.pipeline.static import GlobalVlans, process_static_device
+from src.storage.compaction import Compactor
+
+import main_dynamic
+import main_static
+
+DAEMON_CONFIG_FILE = Path("config/daemon.yaml")
+
+DEFAULT_DAEMON_CONFIG = {
+    "timezone": "UTC",
+    "workers": 4,
+    "config_check_interval": 30,
+    "jobs": {
+        "collect": {"interval": 30, "jitter": 5, "misfire_grace_time": 30, "run_at_start": True},
+        "compaction": {"enabled": True, "cron": "30 4 * * *", "jitter": 300, "misfire_grace_time": 7200},
+        "counters": {"enabled": False, "interval": 30, "misfire_grace_time": 10},
+    },
+}
+
+
+def load_daemon_config() -> dict:
+    config = dict(DEFAULT_DAEMON_CONFIG)
+    config["jobs"] = {name: dict(job) for name, job in DEFAULT_DAEMON_CONFIG["jobs"].items()}
+
+    if not DAEMON_CONFIG_FILE.exists():
+        print("config/daemon.yaml не найден — расписание по умолчанию")
+        return config
+
+    with open(DAEMON_CONFIG_FILE, "r", encoding="utf-8") as f:
+        data = (yaml.safe_load(f) or {}).get("daemon") or {}
+
+    for key, value in data.items():
+        if key == "jobs":
+            for name, job in (value or {}).items():
+                job = {k: v for k, v in (job or {}).items() if v is not None}
+                target = config["jobs"].setdefault(name, {})
+                # Расписание задаётся одним способом: interval из файла отменяет cron по умолчанию и наоборот
+                for kind, other in (("interval", "cron"), ("cron", "interval")):
+                    if kind in job and other not in job:
+                        target.pop(other, None)
+                target.update(job)
+        elif value is not None:
+            config[key] = value
+    return config
+
+
+CRON_WEEKDAYS = ("sun", "mon", "tue", "wed", "thu", "fri", "sat")
+
+
+def crontab_expression(expr: str) -> str:
+    """
+    Выражение cron для CronTrigger.from_crontab. Дни недели числами понимаются как в cron
+    (0 и 7 — воскресенье), а APScheduler считает 0 понедельником — числа заменяются именами.
+    """
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"cron должен содержать 5 полей: {expr}")
+    fields[4] = _weekday_names(fields[4])
+    return " ".join(fields)
+
+
+def _weekday_names(field: str) -> str:
+    days = []
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        if spec == "*" and not step:
+            return "*"
+        low, _, high = ("0-6" if spec == "*" else spec).partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            days.append(part)  # имена (mon-fri) APScheduler понимает сам
+            continue
+        if not high:
+            high = "6" if step else low   # "1/2" — с понедельника до конца недели через день
+        days.extend(CRON_WEEKDAYS[day % 7] for day in range(int(low), int(high) + 1, int(step or 1)))
+    return ",".join(dict.fromkeys(days))
+
+
+class WarmConfig:
+    """
+    devices.yaml и config/servers.yaml в памяти процесса. Файлы перечитываются,
+    только если изменилось их mtime (проверка не чаще check_interval секунд).
+    """
+
+    def __init__(self, check_interval: float = 30):
+        self.check_interval = check_interval
+        self._cache: Dict[str, tuple] = {}  # имя → (mtime, значение)
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, path: Path, loader: Callable):
+        with self._lock:
+            now = time.monotonic()
+            cached = self._cache.get(name)
+            if cached is not None and now - self._checked_at.get(name, 0) < self.check_interval:
+                return cached[1]
+            self._checked_at[name] = now
+            mtime = path.stat().st_mtime if path.exists() else None
+            if cached is None or cached[0] != mtime:
+                if cached is not None:
+                    print(f"[DAEMON] {path} изменился — перечитываем")
+                cached = self._cache[name] = (mtime, loader())
+            return cached[1]
+
+    def devices(self):
+        return self._get("devices", Path("devices.yaml"), main_dynamic.load_devices)
+
+    def dhcp_servers(self):
+        return self._get("dhcp_servers", Path("config/servers.yaml"), main_dynamic.load_dhcp_servers)
+
+
+class CollectorDaemon:
+    """
+    Долгоживущий процесс опроса: конфигурация, реестр парсеров, пул SSH-сессий,
+    движок сбора, план команд с последними выводами устройств и буферы счётчиков
+    интерфейсов живут в памяти между циклами; тик плана (статические и динамические
+    команды за один логин), опрос счётчиков и compaction — задания APScheduler.
+    Одно задание не перекрывается само с собой (max_instances=1, пропущенные
+    запуски сливаются). По SSH на устройства ходит только collect — поэтому два
+    сбора с одним устройством одновременно не работают; counters идут по SNMP,
+    compaction устройств не касается.
+    """
+
+    def __init__(self, config: dict = None):
+        self.config = config or load_daemon_config()
+        collector_config = load_collector_config()
+        self.engine = CollectionEngine.from_config(collector_config)
+        self.pool = SessionPool.from_config(collector_config)
+        self.warm = WarmConfig(self.config["config_check_interval"])
+        self.counters = CounterPoller()
+        self.planner = CommandPlanner()
+        # Последние результаты по устройствам: тик собирает только те команды, которым пора
+        self.latest_dynamic: Dict[str, tuple] = {}            # ip → (macs, arps)
+        self.latest_static: Dict[str, Dict[str, str]] = {}    # ip → {команда: вывод}
+        self.global_vlans = None
+        self.scheduler = BlockingScheduler(
+            executors={"default": ThreadPoolExecutor(int(self.config["workers"]))},
+            job_defaults={"coalesce": True, "max_instances": 1},
+            timezone=self.config["timezone"],
+        )
+
+    # Задания
+
+    def collect_job(self):
+        """
+        Тик плана команд (commands.yaml: interval/priority/group_intervals): каждому устройству,
+        у которого есть команды к выполнению, — один логин и все такие команды, статические
+        и динамические вместе. Выводы расходятся по обычным конвейерам: динамический цикл
+        и статические снапшоты — по последним выводам каждой команды устройства.
+        """
+        start_time = time.time()
+        devices = self.warm.devices()
+        if not devices:
+            print("[DAEMON] collect: нет устройств")
+            return
+
+        ips = [device["ip"] for device in devices]
+        self.planner.retain(ips)
+        for latest in (self.latest_dynamic, self.latest_static):
+            for ip in set(latest) - set(ips):
+                del latest[ip]
+
+        now = time.time()
+        snmp_due = {
+            device["ip"] for device in devices
+            if uses_snmp(device) and any(spec["command_type"] == "dynamic" for spec in self.planner.due_commands(device, now))
+        }
+        collected = run_tick(devices, self.planner, engine=self.engine, pool=self.pool)
+
+        command_types = get_command_types()
+        fresh = {"dynamic": {}, "static": {}}
+        for ip, raw in collected.items():
+            for command, output in raw.items():
+                if isinstance(output, str) and output.startswith("ERROR:"):
+                    continue
+                fresh[command_types.get(command, "static")].setdefault(ip, {})[command] = output
+
+        if fresh["dynamic"] or snmp_due:
+            main_dynamic.run_dynamic(
+                devices, self.warm.dhcp_servers(), engine=self.engine,
+                process=self._dynamic_process(fresh["dynamic"], snmp_due), streaming=False
+            )
+        if fresh["static"]:
+            for ip, raw in fresh["static"].items():
+                self.latest_static.setdefault(ip, {}).update(raw)
+            self.global_vlans = GlobalVlans(devices, previous=self.global_vlans)
+            main_static.run_static(
+                [device for device in devices if device["ip"] in fresh["static"]],
+                engine=self.engine, process=self._static_process, global_vlans=self.global_vlans
+            )
+        if not collected and not snmp_due:
+            return
+        report_validation_stats()
+        print(f"[DAEMON] collect: тик завершён за {time.time() - start_time:.2f} с "
+              f"(устройств опрошено: {len(collected)}, SNMP: {len(snmp_due)})")
+
+    def _dynamic_process(self, fresh: Dict[str, Dict[str, str]], snmp_due: set) -> Callable:
+        """
+        process для run_dynamic: устройства с новыми выводами MAC/ARP разбираются, остальные
+        отдают последний результат — снапшот хостов всегда по всем устройствам, даже
+        если ARP с core снимается чаще MAC.
+        """
+        def process(device, graph=None, **_):
+            ip = device["ip"]
+            if ip in snmp_due:
+                result = main_dynamic.process_device(device, graph=graph)
+            elif ip in fresh:
+                raw = fresh[ip]
+                macs, arps = main_dynamic.process_device(device, raw=raw, graph=graph)
+                previous_macs, previous_arps = self.latest_dynamic.get(ip, ([], []))
+                result = (
+                    macs if "show mac address-table" in raw else previous_macs,
+                    arps if "show arp" in raw else previous_arps,
+                )
+            else:
+                return self.latest_dynamic.get(ip)
+            self.latest_dynamic[ip] = result
+            return result
+        return process
+
+    def _static_process(self, device, global_vlans=None, **_):
+        # Снапшот — по последним выводам всех статических команд: в тик пришли не все
+        return process_static_device(device, global_vlans=global_vlans, raw=self.latest_static[device["ip"]])
+
+    def counters_job(self):
+        # Счётчики идут по SNMP, SSH-сессии не трогают — идут независимо от collect
+        devices = [device for device in self.warm.devices() if polls_counters(device)]
+        if not devices:
+            return
+        start_time = time.time()
+        sampled = self.counters.poll(devices)
+        print(f"[DAEMON] counters: {sampled} интерфейсов за {time.time() - start_time:.2f} с")
+
+    def compaction_job(self):
+        stats = Compactor().run()
+        print(f"[DAEMON] compaction: {stats or 'нечего делать'}")
+
+    # Расписание
+
+    def _trigger(self, job: dict):
+        jitter = job.get("jitter")
+        if job.get("cron"):
+            trigger = CronTrigger.from_crontab(crontab_expression(job["cron"]), timezone=self.config["timezone"])
+            trigger.jitter = jitter
+            return trigger
+        return IntervalTrigger(seconds=int(job["interval"]), timezone=self.config["timezone"], jitter=jitter)
+
+    def schedule(self):
+        handlers = {
+            "collect": self.collect_job,
+            "compaction": self.compaction_job, "counters": self.counters_job,
+        }
+        for name, job in self.config["jobs"].items():
+            if name not in handlers:
+                print(f"[DAEMON] Неизвестное задание {name} — пропускаем")
+                continue
+            if not job.get("enabled", True):
+                continue
+            kwargs = {}
+            if job.get("run_at_start"):
+                kwargs["next_run_time"] = datetime.now(self.scheduler.timezone)
+            self.scheduler.add_job(
+                handlers[name], self._trigger(job), id=name, name=name,
+                misfire_grace_time=job.get("misfire_grace_time"), **kwargs
+            )
+            print(f"[DAEMON] Задание {name}: {job.get('cron') or str(job.get('interval')) + ' с'}, jitter {job.get('jitter') or 0} с")
+
+        self.scheduler.add_listener(self._on_event, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_ERROR)
+
+    @staticmethod
+    def _on_event(event):
+        if event.code == EVENT_JOB_MISSED:
+            print(f"[DAEMON] {event.job_id}: запуск {event.scheduled_run_time} пропущен (вышел misfire_grace_time)")
+        elif event.code == EVENT_JOB_MAX_INSTANCES:
+            print(f"[DAEMON] {event.job_id}: предыдущий запуск ещё идёт — этот пропущен")
+        elif event.code == EVENT_JOB_ERROR:
+            print(f"[DAEMON] {event.job_id}: ошибка {event.exception!r}")
+
+    def stop(self, *_):
+        print("[DAEMON] Остановка: ждём текущие задания")
+        self.scheduler.shutdown(wait=True)
+
+    def run(self):
+        # Долгоживущему процессу ленивая загрузка ни к чему: все парсеры — сразу, до первого задания
+        for vendor in VENDOR_MODULES:
+            load_vendor(vendor)
+        self.schedule()
+        self.pool.start()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            self.scheduler.start()
+        finally:
+            self.pool.close_all()
+            get_offloader().shutdown()
+            self.counters.rollup(final=True)
+
+
+def main():
+    CollectorDaemon().run()
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,29 @@
 import json
+import threading
 import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-import concurrent.futures
 import time
 
 from src.collectors.ssh_collector import collect_raw
-from src.collectors.win_dhcp_collector import collect_dhcp_raw, save_dhcp_raw
-from src.parsers.registry import get_parser
+from src.collectors.snmp_collector import collect_snmp, uses_snmp
+from src.collectors.engine import CollectionEngine, load_collector_config
+from src.collectors.win_dhcp_collector import collect_dhcp_json, save_dhcp_raw
+from src.parsers.registry import get_parser, get_stream_parser, accepts_store
+from src.models.entry_store import MacEntryStore, ArpEntryStore
 from src.normalizer.mac_table import MacTableNormalizer
 from src.normalizer.arp import ArpNormalizer
 from src.normalizer.dhcp import DhcpNormalizer
+from src.normalizer.interface import InterfaceNormalizer
 from src.merge.hosts_merge import merge_hosts
+from src.merge.host_index import HostIndex
 from src.storage.file import save_parsed, save_dynamic_snapshot
-
-# Явные импорты всех парсеров — чтобы регистрация сработала
-import src.parsers.nateks
-import src.parsers.rvi
-import src.parsers.dhcp
+from src.storage.config import enabled_backends
+from src.storage.sqlite import get_history_storage
+from src.models.validation import report_validation_stats
+from src.pipeline.dag import StageGraph
+from src.pipeline.offload import get_offloader, untimed
 
 def load_devices():
     with open("devices.yaml", "r", encoding="utf-8") as f:
@@ -39,12 +45,126 @@ def load_dhcp_servers():
 
     return data.get("DHCP_servers", [])
 
-def process_device(device):
+def stream_consumer(stream_parser, normalize_entries, command, vendor, result_key, store_class=None, size_key=None,
+                    timer=untimed, **parser_kwargs):
+    """
+    Потребитель строк для потокового сбора: разбирает вывод пачками прямо по мере
+    поступления из SSH-канала и сразу нормализует каждую пачку.
+    Со store_class пачки дописываются прямо в колоночное хранилище — новое на каждый
+    вызов: после потери сессии команда выполняется заново, и строки, разобранные
+    до обрыва, не должны попасть в результат дважды.
+    size_key — (ip, slug): объём вывода запоминается для ParseOffloader.
+    timer — замер стадий "parse" (каждая пачка) и "normalize" (см. StageGraph.timed);
+    wall разбора включает и ожидание строк из канала.
+    """
+    next_batch = timer("parse", next)
+    normalize_batch = timer("normalize", normalize_entries)
+
+    def consume(lines):
+        if size_key is not None:
+            lines = counted(lines)
+        if store_class is not None:
+            store = store_class()
+            batches = stream_parser(command, lines, vendor, store=store, **parser_kwargs)
+            while next_batch(batches, None) is not None:
+                pass
+            return {result_key: store}
+
+        normalized = []
+        batches = stream_parser(command, lines, vendor, **parser_kwargs)
+        batch = next_batch(batches, None)
+        while batch is not None:
+            normalized.extend(normalize_batch(batch))
+            batch = next_batch(batches, None)
+        return {result_key: normalized}
+
+    def counted(lines):
+        size = 0
+        try:
+            for line in lines:
+                size += len(line) + 1
+                yield line
+        finally:
+            get_offloader().remember(*size_key, size)
+    return consume
+
+def process_snmp_device(device, timer=untimed):
+    """
+    MAC/ARP/интерфейсы устройства с collector: snmp — таблицами по SNMP вместо CLI.
+    Записи те же, что у CLI-парсеров, поэтому нормализация и merge общие.
+    timer — замер стадии "normalize" (см. StageGraph.timed).
+    """
+    ip = device["ip"]
+    is_core = device.get("group") == "core"
+
+    collected = collect_snmp(device, tables=("mac", "arp", "interfaces") if is_core else ("mac", "interfaces"))
+    if not collected:
+        print(f"Не удалось собрать SNMP для {ip}")
+        return [], []
+
+    normalized_mac = timer("normalize", MacTableNormalizer.normalize)(collected, device["vendor"])
+    macs = normalized_mac.get("mac_entries_normalized", [])
+    print(f"{ip} — MAC записей (SNMP): {len(macs)}")
+    save_parsed(normalized_mac, ip, "mac_address_table")
+
+    arps = []
+    if is_core:
+        normalized_arp = timer("normalize", ArpNormalizer.normalize)(collected, device["vendor"])
+        arps = normalized_arp.get("arp_entries_normalized", [])
+        print(f"{ip} — ARP записей (SNMP): {len(arps)}")
+        save_parsed(normalized_arp, ip, "arp")
+
+    # Состояние интерфейсов (ifTable/ifXTable) — заодно, те же GETBULK-обходы
+    normalized_interfaces = timer("normalize", InterfaceNormalizer.normalize)(collected, device["vendor"])
+    if normalized_interfaces:
+        save_parsed(normalized_interfaces, ip, "interface_status")
+
+    return macs, arps
+
+def process_device(device, pool=None, streaming=False, raw=None, graph=None):
+    """
+    MAC (и ARP с core) одного устройства: (macs, arps).
+    raw — уже собранные выводы команд (тик плана в main_daemon.py): устройство не опрашивается.
+    graph — граф run_dynamic: разбор и нормализация замеряются его стадиями "parse" и "normalize".
+    """
     ip = device["ip"]
     hostname = device.get("hostname", ip)
     print(f"\n=== Обрабатываем {hostname} ({ip}) ===")
 
-    raw = collect_raw(device, command_type="dynamic")
+    timer = graph.timed if graph is not None else untimed
+    if uses_snmp(device):
+        return process_snmp_device(device, timer=timer)
+
+    is_core = device.get("group") == "core"
+
+    # Колоночные хранилища для потокового разбора: шаблонные парсеры дописывают
+    # в них записи без словарей (разбор целого вывода создаёт их сам — parse_normalize)
+    mac_store_class = MacEntryStore if accepts_store(device["vendor"], "mac_address_table") else None
+    arp_store_class = ArpEntryStore if accepts_store(device["vendor"], "arp") else None
+
+    # Потоковый режим: MAC/ARP разбираются, пока вывод ещё идёт по SSH.
+    # Команды, вывод которых в прошлый раз был большим, собираются текстом и
+    # разбираются в пуле процессов — не в потоке сборщика под GIL
+    offloader = get_offloader()
+    consumers = {}
+    if streaming and raw is None:
+        stream_mac = get_stream_parser(device["vendor"], "mac_address_table")
+        if stream_mac and not offloader.expects_large(ip, "mac_address_table"):
+            consumers["show mac address-table"] = stream_consumer(
+                stream_mac, MacTableNormalizer.normalize_entries, "show mac address-table",
+                device["vendor"], "mac_entries_normalized", store_class=mac_store_class,
+                size_key=(ip, "mac_address_table"), timer=timer, device_ip=ip, device_hostname=hostname
+            )
+        stream_arp = get_stream_parser(device["vendor"], "arp")
+        if stream_arp and is_core and not offloader.expects_large(ip, "arp"):
+            consumers["show arp"] = stream_consumer(
+                stream_arp, ArpNormalizer.normalize_entries, "show arp",
+                device["vendor"], "arp_entries_normalized", store_class=arp_store_class,
+                size_key=(ip, "arp"), timer=timer
+            )
+
+    if raw is None:
+        raw = collect_raw(device, command_type="dynamic", pool=pool, consumers=consumers)
     if not raw:
         print(f"Не удалось собрать raw для {ip}")
         return [], []
@@ -56,20 +176,24 @@ def process_device(device):
 
     # MAC со всех устройств
     parser_mac = get_parser(device["vendor"], "mac_address_table")
-    if parser_mac and "show mac address-table" in raw:
-        parsed_mac = parser_mac(
-            "show mac address-table",
-            raw["show mac address-table"],
-            device["vendor"],
-            device_ip=ip,
-            device_hostname=hostname
-        )
-        normalized_mac = MacTableNormalizer.normalize(parsed_mac, device["vendor"])
+    mac_result = raw.get("show mac address-table")
+    if isinstance(mac_result, dict) or (parser_mac and mac_result is not None):
+        if isinstance(mac_result, dict):  # уже разобрано потоком
+            normalized_mac = mac_result
+        else:
+            # Разбор и нормализация — в пуле процессов, если вывод большой
+            normalized_mac = offloader.parse(
+                ip, device["vendor"], "mac_address_table", mac_result,
+                graph=graph, device_ip=ip, device_hostname=hostname
+            )
         macs = normalized_mac.get("mac_entries_normalized", [])
 
-        for m in macs:
-            m["device_ip"] = ip
-            m["device_hostname"] = hostname
+        if isinstance(macs, MacEntryStore):
+            macs.set_device(ip, hostname)
+        else:
+            for m in macs:
+                m["device_ip"] = ip
+                m["device_hostname"] = hostname
 
         print(f"{ip} — MAC записей: {len(macs)}")
         save_parsed(normalized_mac, ip, "mac_address_table")
@@ -77,11 +201,14 @@ def process_device(device):
         print(f"{ip} — MAC не собран (нет парсера или команды)")
 
     # ARP только с core
-    if device.get("group") == "core" and "show arp" in raw:
+    arp_result = raw.get("show arp")
+    if is_core and arp_result is not None:
         parser_arp = get_parser(device["vendor"], "arp")
-        if parser_arp:
-            parsed_arp = parser_arp("show arp", raw["show arp"], device["vendor"])
-            normalized_arp = ArpNormalizer.normalize(parsed_arp, device["vendor"])
+        if isinstance(arp_result, dict) or parser_arp:
+            if isinstance(arp_result, dict):  # уже разобрано потоком
+                normalized_arp = arp_result
+            else:
+                normalized_arp = offloader.parse(ip, device["vendor"], "arp", arp_result, graph=graph)
             arps = normalized_arp.get("arp_entries_normalized", [])
             print(f"{ip} — ARP записей: {len(arps)}")
             save_parsed(normalized_arp, ip, "arp")
@@ -90,6 +217,142 @@ def process_device(device):
 
     return macs, arps
 
+def process_dhcp_server(srv):
+    """Leases и reservations одного DHCP-сервера: сбор (один вызов WinRM), raw, разбор, parsed."""
+    srv_ip = srv["ip"]
+    print(f"\n=== Собираем DHCP с сервера {srv_ip} ({srv.get('location', 'unknown')}) ===")
+
+    json_text = collect_dhcp_json(srv)
+    save_dhcp_raw(json_text, srv_ip)
+
+    parsed = get_parser("dhcp", "dhcp_json")("dhcp_json", json_text, "dhcp")
+    for entry in parsed.get("dhcp_leases", []) + parsed.get("dhcp_reservations", []):
+        entry["dhcp_server"] = srv_ip
+
+    normalized_leases = DhcpNormalizer.normalize_leases(parsed, "dhcp")
+    save_parsed(normalized_leases, srv_ip, "dhcp_leases")
+
+    normalized_reservations = DhcpNormalizer.normalize_reservations(parsed, "dhcp")
+    save_parsed(normalized_reservations, srv_ip, "dhcp_reservations")
+
+    entries = normalized_leases.get("dhcp_leases_normalized", []) + normalized_reservations.get("dhcp_reservations_normalized", [])
+    print(f"[DHCP] Готово для {srv_ip} (записей: {len(entries)})")
+    return entries
+
+def run_dynamic(devices, dhcp_servers, engine=None, pool=None, process=None, streaming=None):
+    """
+    Один динамический цикл — граф стадий (src/pipeline/dag.py):
+        devices (сбор → parse → normalize, по устройствам)     ─┐
+        dhcp (серверы параллельно)                              ─┴→ merge → snapshot, history
+    devices и dhcp идут одновременно и по мере готовности каждого устройства/сервера
+    сразу дописывают его записи в индекс хостов — merge остаётся только собрать хосты.
+    snapshot и history после merge тоже идут одновременно.
+    parse и normalize — части devices со своими замерами, в том числе процессорного
+    времени воркеров пула разбора; у devices остаётся сбор.
+    engine/pool/process — для долгоживущего процесса (main_daemon.py): общий движок,
+    пул SSH-сессий и обёртка над process_device (выводы тика плана).
+    """
+    graph = StageGraph("dynamic")
+
+    # Общие колоночные хранилища: хранилища устройств сливаются без распаковки в словари
+    all_mac_entries = MacEntryStore()
+    all_arp_entries = ArpEntryStore()
+    all_dhcp_leases = []
+    # Индекс пополняют одновременно поток движка (устройства) и стадия dhcp
+    host_index = HostIndex()
+    index_lock = threading.Lock()
+
+    if engine is None or streaming is None:
+        collector_config = load_collector_config()
+        engine = engine or CollectionEngine.from_config(collector_config)
+        streaming = collector_config.get("streaming", False) if streaming is None else streaming
+
+    def on_device_done(device, result):
+        if result is None:
+            return
+        device_macs, device_arps = result
+        all_mac_entries.extend(device_macs)
+        all_arp_entries.extend(device_arps)
+        with index_lock:
+            host_index.extend(device_macs, device_arps)
+
+    def collect_devices():
+        # Параллельный сбор устройств (лимиты — config/collector.yaml)
+        engine.run(
+            devices, graph.timed("devices", process or process_device),
+            pool=pool, streaming=streaming, graph=graph, on_result=on_device_done
+        )
+        print(f"Всего собрано MAC: {len(all_mac_entries)}, ARP: {len(all_arp_entries)}")
+
+    def collect_dhcp():
+        if not dhcp_servers:
+            print("DHCP-серверы не загружены — пропуск DHCP")
+            return
+        process_server = graph.timed("dhcp", process_dhcp_server)
+        with ThreadPoolExecutor(max_workers=len(dhcp_servers), thread_name_prefix="dhcp") as executor:
+            futures = {executor.submit(process_server, srv): srv for srv in dhcp_servers}
+            for future in as_completed(futures):
+                try:
+                    entries = future.result()
+                except Exception as e:
+                    print(f"[DHCP] Ошибка обработки сервера {futures[future]['ip']}: {e}")
+                    continue
+                all_dhcp_leases.extend(entries)
+                with index_lock:
+                    host_index.extend(dhcp_leases=entries)
+        print(f"[DHCP] Всего записей: {len(all_dhcp_leases)}")
+
+    def merge(*_):
+        # Индекс уже заполнен стадиями devices и dhcp — merge только собирает хосты
+        hosts = merge_hosts((), (), index=host_index)
+
+        # Конфликты IP: один адрес в ARP у нескольких MAC
+        ip_conflicts = host_index.ip_conflicts()
+        if ip_conflicts:
+            print(f"Конфликтов IP: {len(ip_conflicts)}")
+            for conflict_ip, macs in list(ip_conflicts.items())[:10]:
+                print(f"  {conflict_ip}: {', '.join(macs)}")
+
+        return {
+            "snapshot": {
+                "id": datetime.utcnow().isoformat(),
+                "type": "dynamic_hosts",
+                "created_at": datetime.utcnow().isoformat() + "Z",
+                "schema_version": "1.0",
+                "devices_count": len(devices),
+                "hosts_count": len(hosts),
+                "ip_conflicts_count": len(ip_conflicts),
+                "sources": ["mac_address_table", "arp", "dhcp"]
+            },
+            "hosts": hosts,
+            "ip_conflicts": ip_conflicts
+        }
+
+    def save_snapshot(snapshot):
+        if "file" in enabled_backends():
+            save_dynamic_snapshot(snapshot, snapshot_type="hosts")
+
+    def write_history(snapshot):
+        # История в SQLite (если включена в config/storage.yaml) — одна транзакция на опрос
+        history = get_history_storage()
+        if history is not None:
+            history.write_dynamic_run(
+                snapshot["hosts"], all_mac_entries, all_arp_entries, all_dhcp_leases, devices_count=len(devices)
+            )
+
+    graph.add("devices", collect_devices)
+    graph.add_part("parse", "devices")
+    graph.add_part("normalize", "devices")
+    graph.add("dhcp", collect_dhcp)
+    graph.add("merge", merge, deps=("devices", "dhcp"))
+    graph.add("snapshot", save_snapshot, deps=("merge",))
+    graph.add("history", write_history, deps=("merge",))
+    try:
+        results = graph.run()
+    finally:
+        graph.report()
+    return results["merge"]
+
 def main():
     start_time = time.time()
 
@@ -100,82 +363,12 @@ def main():
         print("Нет устройств")
         return
 
-    all_mac_entries = []
-    all_arp_entries = []
-
-    # Параллельный сбор устройств
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_device = {executor.submit(process_device, device): device for device in devices}
-        for future in concurrent.futures.as_completed(future_to_device):
-            device_macs, device_arps = future.result()
-            all_mac_entries.extend(device_macs)
-            all_arp_entries.extend(device_arps)
-
-    print(f"Всего собрано MAC: {len(all_mac_entries)}, ARP: {len(all_arp_entries)}")
-
-    # DHCP — сбор и парсинг
-    dhcp_servers = load_dhcp_servers()
-
-    dhcp_raw_dir = Path("data/raw/dhcp")
-    dhcp_parsed_leases_dir = Path("data/parsed/dynamic/dhcp_leases")
-    dhcp_parsed_reservations_dir = Path("data/parsed/dynamic/dhcp_reservations")
-
-    dhcp_parsed_leases_dir.mkdir(parents=True, exist_ok=True)
-    dhcp_parsed_reservations_dir.mkdir(parents=True, exist_ok=True)
-
-    all_dhcp_leases = []
-
-    if not dhcp_servers:
-        print("DHCP-серверы не загружены — пропуск DHCP")
-    else:
-        for srv in dhcp_servers:
-            srv_ip = srv["ip"]
-            print(f"\n=== Собираем DHCP с сервера {srv_ip} ({srv.get('location', 'unknown')}) ===")
-
-            leases_text, reservations_text = collect_dhcp_raw(srv_ip)
-            save_dhcp_raw(leases_text, reservations_text, srv_ip)
-
-            print(f"=== Парсим DHCP для сервера {srv_ip} ===")
-
-            parsed_leases = get_parser("dhcp", "dhcp_leases")("dhcp_leases", leases_text, "dhcp")
-            for lease in parsed_leases.get("dhcp_leases", []):
-                lease["dhcp_server"] = srv_ip
-
-            normalized_leases = DhcpNormalizer.normalize_leases(parsed_leases, "dhcp")
-            save_parsed(normalized_leases, srv_ip, "dhcp_leases")
-
-            parsed_reservations = get_parser("dhcp", "dhcp_reservations")("dhcp_reservations", reservations_text, "dhcp")
-            for res in parsed_reservations.get("dhcp_reservations", []):
-                res["dhcp_server"] = srv_ip
-
-            normalized_reservations = DhcpNormalizer.normalize_reservations(parsed_reservations, "dhcp")
-            save_parsed(normalized_reservations, srv_ip, "dhcp_reservations")
-
-            all_dhcp_leases.extend(normalized_leases.get("dhcp_leases_normalized", []))
-            all_dhcp_leases.extend(normalized_reservations.get("dhcp_reservations_normalized", []))
-
-            print(f"[DHCP] Готово для {srv_ip} (всего записей: {len(all_dhcp_leases)})")
-
-    # Merge — теперь с реальными DHCP-данными
-    hosts = merge_hosts(all_mac_entries, all_arp_entries, dhcp_leases=all_dhcp_leases)
-
-    # Формируем snapshot
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
-    snapshot = {
-        "snapshot": {
-            "id": datetime.utcnow().isoformat(),
-            "type": "dynamic_hosts",
-            "created_at": datetime.utcnow().isoformat() + "Z",
-            "schema_version": "1.0",
-            "devices_count": len(devices),
-            "hosts_count": len(hosts),
-            "sources": ["mac_address_table", "arp", "dhcp"]
-        },
-        "hosts": hosts
-    }
-
-    save_dynamic_snapshot(snapshot, snapshot_type="hosts")
+    try:
+        run_dynamic(devices, load_dhcp_servers())
+    finally:
+        get_offloader().shutdown()
 
+    report_validation_stats()
     end_time = time.time()
     print(f"\nПолный цикл завершён за {end_time - start_time:.2f} секунд")
 
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.collectors.ssh_collector import collect_raw, load_commands_config
+from src.storage.file import static_snapshot_key
+from src.storage.manifest import get_manifest, load_latest
+
+PROBE_STATE_FILE = Path("data/state/probe_state.json")
+
+# Полный статический сбор не реже раза в неделю, даже если проба говорит «без изменений»
+DEFAULT_PROBE_MAX_AGE = 7 * 86400
+
+
+def load_probe_specs(config: dict = None) -> Dict[str, Any]:
+    """
+    Секция probes из commands.yaml:
+      max_age — через сколько секунд сбор полный независимо от пробы;
+      vendors — {вендор: [{command, match, volatile}]}.
+    match — оставить только строки по регулярному выражению (если есть группа — её значение);
+    volatile — выбросить строки, которые меняются без изменения устройства (uptime, часы).
+    """
+    config = config if config is not None else load_commands_config()
+    probes = config.get("probes") or {}
+    vendors = {}
+    for vendor, commands in (probes.get("vendors") or {}).items():
+        vendors[vendor] = [
+            {
+                "command": entry["command"],
+                "match": re.compile(entry["match"]) if entry.get("match") else None,
+                "volatile": [re.compile(pattern) for pattern in entry.get("volatile") or []],
+            }
+            for entry in commands or []
+        ]
+    return {"max_age": int(probes.get("max_age", DEFAULT_PROBE_MAX_AGE)), "vendors": vendors}
+
+
+def probe_fingerprint(outputs: Dict[str, str], commands: List[Dict[str, Any]]) -> str:
+    """Хеш значимых строк вывода проб (в порядке команд из конфига)."""
+    digest = hashlib.sha256()
+    for spec in commands:
+        digest.update(spec["command"].encode("utf-8") + b"\0")
+        for line in outputs.get(spec["command"], "").splitlines():
+            line = line.rstrip()
+            if not line or any(pattern.search(line) for pattern in spec["volatile"]):
+                continue
+            if spec["match"] is not None:
+                found = spec["match"].search(line)
+                if not found:
+                    continue
+                line = found.group(1) if found.groups() else found.group(0)
+            digest.update(line.encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+
+class ProbeResult:
+    """Решение пробы по устройству: нужен ли полный сбор, отпечаток и выводы проб."""
+
+    __slots__ = ("needs_full", "reason", "fingerprint", "outputs")
+
+    def __init__(self, needs_full: bool, reason: str, fingerprint: str = None, outputs: Dict[str, str] = None):
+        self.needs_full = needs_full
+        self.reason = reason
+        self.fingerprint = fingerprint
+        self.outputs = outputs or {}
+
+
+class ChangeProbe:
+    """
+    Предварительная проба перед статическим сбором.
+    Несколько дешёвых команд на вендора (версия без uptime, счётчик/время изменения
+    конфигурации, контрольная сумма running-config) сворачиваются в отпечаток;
+    если он совпал с отпечатком последнего полного сбора — устройство не изменилось,
+    и вместо полного сбора переносится его прошлый статический снапшот.
+    Отпечаток запоминается только после успешного полного сбора.
+    """
+
+    def __init__(self, specs: Dict[str, Any] = None, state_path: Path = PROBE_STATE_FILE):
+        specs = specs if specs is not None else load_probe_specs()
+        self.vendors: Dict[str, List[Dict[str, Any]]] = specs["vendors"]
+        self.max_age = specs["max_age"]
+        self.state_path = state_path
+        self._state: Dict[str, Dict[str, Any]] = {}  # {ip: {fingerprint, collected_at}}
+        self._lock = threading.Lock()
+
+    def enabled_for(self, device: Dict) -> bool:
+        return bool(self.vendors.get(device.get("vendor")))
+
+    def check(self, device: Dict, pool=None, now: float = None) -> ProbeResult:
+        commands = self.vendors.get(device.get("vendor"))
+        if not commands:
+            return ProbeResult(True, "нет пробы для вендора")
+
+        now = now if now is not None else time.time()
+        with self._lock:
+            previous = dict(self._state.get(device["ip"], {}))
+
+        outputs = collect_raw(device, command_type="static", pool=pool, commands=[spec["command"] for spec in commands])
+        if not outputs or any(not isinstance(v, str) or v.startswith("ERROR:") for v in outputs.values()):
+            return ProbeResult(True, "проба не выполнилась", outputs=outputs)
+
+        fingerprint = probe_fingerprint(outputs, commands)
+        if not previous.get("fingerprint"):
+            return ProbeResult(True, "первый сбор", fingerprint, outputs)
+        if previous["fingerprint"] != fingerprint:
+            return ProbeResult(True, "устройство изменилось", fingerprint, outputs)
+        if now - previous.get("collected_at", 0) >= self.max_age:
+            return ProbeResult(True, "истёк max_age", fingerprint, outputs)
+        entry = get_manifest().latest("snapshots_static", static_snapshot_key(device["ip"]))
+        if entry is None or not Path(entry["path"]).exists():
+            return ProbeResult(True, "нет прошлого снапшота", fingerprint, outputs)
+        return ProbeResult(False, "без изменений", fingerprint, outputs)
+
+    def mark_collected(self, device: Dict, result: ProbeResult, now: float = None):
+        """Полный сбор прошёл: запоминаем отпечаток пробы (снапшот находится по манифесту)."""
+        if result.fingerprint is None:
+            return
+        with self._lock:
+            self._state[device["ip"]] = {
+                "fingerprint": result.fingerprint,
+                "collected_at": now if now is not None else time.time(),
+            }
+
+    def load_state(self):
+        if not self.state_path.exists():
+            return
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self._state = data.get("devices", {})
+
+    def save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"devices": self._state}
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+
+def carry_forward_snapshot(device_ip: str) -> Optional[Dict[str, Any]]:
+    """
+    Последний статический снапшот устройства (по манифесту data/, load_latest) с новыми
+    id/created_at и пометкой carried_forward (откуда перенесён). None — если его нет или он не читается.
+    """
+    key = static_snapshot_key(device_ip)
+    entry = get_manifest().latest("snapshots_static", key)
+    if entry is None:
+        return None
+    try:
+        snapshot = load_latest("snapshots_static", key)
+    except (OSError, ValueError) as e:
+        print(f"Не удалось прочитать прошлый снапшот {entry['path']}: {e}")
+        return None
+    now = datetime.utcnow()
+    meta = dict(
+        snapshot.get("snapshot") or {},
+        id=now.isoformat(),
+        created_at=now.isoformat() + "Z",
+        carried_forward=True,
+        carried_from=Path(entry["path"]).name,
+    )
+    return dict(snapshot, snapshot=meta)
+
+
+def get_change_probe() -> Optional[ChangeProbe]:
+    """ChangeProbe с загруженным состоянием, если в commands.yaml есть пробы; иначе None."""
+    specs = load_probe_specs()
+    if not specs["vendors"]:
+        return None
+    probe = ChangeProbe(specs)
+    probe.load_state()
+    return probe
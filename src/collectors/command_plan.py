@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from src.collectors.engine import CollectionEngine
+from src.collectors.snmp_collector import uses_snmp
+from src.collectors.ssh_collector import collect_raw, load_commands_config
+
+DEFAULT_INTERVALS = {"static": 86400, "dynamic": 300}
+DEFAULT_PRIORITY = 100
+
+
+def load_command_specs(config: dict = None) -> List[Dict]:
+    """
+    Плоский список команд из commands.yaml с расписанием:
+    command, slug, command_type, interval, priority, groups, group_intervals.
+    """
+    config = config if config is not None else load_commands_config()
+    specs = []
+
+    for command_type, bucket in (("static", "static_commands"), ("dynamic", "dynamic_commands")):
+        for entry in config.get(bucket) or []:
+            specs.append({
+                "command": entry["command"],
+                "slug": entry.get("slug"),
+                "command_type": command_type,
+                "interval": int(entry.get("interval", DEFAULT_INTERVALS[command_type])),
+                "priority": int(entry.get("priority", DEFAULT_PRIORITY)),
+                "groups": entry.get("groups") or [],
+                "group_intervals": {str(k): int(v) for k, v in (entry.get("group_intervals") or {}).items()},
+            })
+
+    return specs
+
+
+class CommandPlanner:
+    """
+    План опроса по командам.
+    Помнит, когда каждая команда последний раз успешно выполнялась на каждом устройстве,
+    и на каждом тике отдаёт все команды, которым пора, — одним списком на устройство,
+    чтобы собрать их за один логин.
+    Состояние — только в памяти процесса: последние выводы команд держит тот же процесс
+    (main_daemon.py), после перезапуска всем командам сразу пора.
+    """
+
+    def __init__(self, specs: List[Dict] = None):
+        self.specs = sorted(specs if specs is not None else load_command_specs(), key=lambda s: s["priority"])
+        self._last_run: Dict[str, Dict[str, float]] = {}  # {ip: {command: unix time}}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def applies_to(spec: Dict, device: Dict) -> bool:
+        return not spec["groups"] or device.get("group") in spec["groups"]
+
+    @staticmethod
+    def interval_for(spec: Dict, device: Dict) -> int:
+        return spec["group_intervals"].get(str(device.get("group")), spec["interval"])
+
+    def due_commands(self, device: Dict, now: float = None) -> List[Dict]:
+        """Команды, которым пора на этом устройстве, в порядке приоритета."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            last_run = dict(self._last_run.get(device["ip"], {}))
+
+        return [
+            spec for spec in self.specs
+            if self.applies_to(spec, device)
+            and now - last_run.get(spec["command"], 0) >= self.interval_for(spec, device)
+        ]
+
+    def next_due_in(self, device: Dict, now: float = None) -> Optional[float]:
+        """Через сколько секунд устройству понадобится следующая команда."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            last_run = dict(self._last_run.get(device["ip"], {}))
+
+        waits = [
+            max(0.0, last_run.get(spec["command"], 0) + self.interval_for(spec, device) - now)
+            for spec in self.specs if self.applies_to(spec, device)
+        ]
+        return min(waits) if waits else None
+
+    def mark_done(self, device: Dict, raw: Dict[str, str], now: float = None):
+        """Отмечает успешно выполненные команды (ответы с ERROR не считаются)."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            last_run = self._last_run.setdefault(device["ip"], {})
+            for cmd, output in raw.items():
+                if not (isinstance(output, str) and output.startswith("ERROR:")):
+                    last_run[cmd] = now
+
+    def retain(self, ips: Iterable[str]):
+        """Забывает устройства, которых больше нет в devices.yaml."""
+        keep = set(ips)
+        with self._lock:
+            self._last_run = {ip: last_run for ip, last_run in self._last_run.items() if ip in keep}
+
+
+def collect_due(device: Dict, planner: CommandPlanner, pool=None) -> Dict[str, str]:
+    """
+    Собирает за одну сессию все команды устройства, которым пора по плану.
+    MAC/ARP с SNMP-устройств снимаются по SNMP (process_device), в SSH-сессию не идут —
+    здесь они только отмечаются выполненными.
+    """
+    due = planner.due_commands(device)
+    if not due:
+        return {}
+
+    over_snmp = [spec["command"] for spec in due if spec["command_type"] == "dynamic" and uses_snmp(device)]
+    commands = [spec["command"] for spec in due if spec["command"] not in over_snmp]
+    planner.mark_done(device, dict.fromkeys(over_snmp, ""))
+    if not commands:
+        return {}
+
+    print(f"{device['ip']} — по плану: {commands}")
+    raw = collect_raw(device, pool=pool, commands=commands)
+    planner.mark_done(device, raw)
+    return raw
+
+
+def run_tick(devices: List[Dict], planner: CommandPlanner, engine: CollectionEngine = None, pool=None) -> Dict[str, Dict[str, str]]:
+    """
+    Один тик плана: для каждого устройства, у которого есть команды к выполнению,
+    — один логин и все такие команды. Возвращает {ip: {команда: вывод}}.
+    """
+    now = time.time()
+    due_devices = [device for device in devices if planner.due_commands(device, now)]
+    if not due_devices:
+        return {}
+
+    engine = engine or CollectionEngine.from_config()
+    results = engine.run(due_devices, collect_due, planner, pool=pool)
+    return {device["ip"]: raw for device, raw in results if raw}
@@ -0,0 +1,278 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.collectors.engine import load_collector_config
+from src.collectors.snmp_collector import (
+    IF_HIGH_SPEED, IF_NAME_COLUMNS, IF_OPER_STATUS, SnmpSession, interface_names, load_snmp_config, uses_snmp,
+)
+from src.storage.file import get_serializer
+from src.storage.manifest import record_latest
+from src.storage.ring_buffer import RingBuffer
+
+DEFAULT_COUNTER_CONFIG = {
+    "capacity": 720,          # отсчётов на интерфейс в памяти (720 × 30 с = 6 часов)
+    "rollup_interval": 900,   # раз в N секунд свёртка на диск
+    "rollup_bucket": 300,     # интервал свёртки (среднее/максимум), секунд
+    "names_max_age": 3600,    # ifName перечитывается не реже раза в N секунд
+    "path": "data/counters",
+}
+
+IF_SPEED = (1, 3, 6, 1, 2, 1, 2, 2, 1, 5)
+IF_IN_OCTETS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 10)
+IF_IN_DISCARDS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 13)
+IF_IN_ERRORS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 14)
+IF_OUT_OCTETS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 16)
+IF_OUT_DISCARDS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 19)
+IF_OUT_ERRORS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 20)
+IF_HC_IN_OCTETS = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6)
+IF_HC_OUT_OCTETS = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 10)
+
+# Все колонки — один GETBULK-обход (индекс у ifTable и ifXTable общий — ifIndex).
+# 32-битные ifIn/OutOctets — на случай агента без ifXTable; скорость интерфейса
+# (ifHighSpeed/ifSpeed) ограничивает, какой прирост ещё можно считать переполнением
+COUNTER_COLUMNS = (
+    IF_HC_IN_OCTETS, IF_HC_OUT_OCTETS, IF_IN_OCTETS, IF_OUT_OCTETS,
+    IF_IN_ERRORS, IF_OUT_ERRORS, IF_IN_DISCARDS, IF_OUT_DISCARDS, IF_OPER_STATUS,
+    IF_HIGH_SPEED, IF_SPEED,
+)
+
+# Поле → (колонка 64 бит или None, колонка 32 бит, множитель); скорость — в единицах за секунду
+RATES = {
+    "in_bps": (IF_HC_IN_OCTETS, IF_IN_OCTETS, 8),
+    "out_bps": (IF_HC_OUT_OCTETS, IF_OUT_OCTETS, 8),
+    "in_errors": (None, IF_IN_ERRORS, 1),
+    "out_errors": (None, IF_OUT_ERRORS, 1),
+    "in_discards": (None, IF_IN_DISCARDS, 1),
+    "out_discards": (None, IF_OUT_DISCARDS, 1),
+}
+FIELDS = tuple(RATES) + ("oper_status",)
+
+# Запас к приросту, возможному на скорости интерфейса: время отсчёта — время ответа,
+# а не момент, когда агент снял счётчик
+SPEED_SLACK = 1.5
+
+InterfaceKey = Tuple[str, int]  # (IP устройства, ifIndex)
+
+
+def load_counter_config(collector_config: dict = None) -> dict:
+    """Секция counters из config/collector.yaml поверх DEFAULT_COUNTER_CONFIG."""
+    config = dict(DEFAULT_COUNTER_CONFIG)
+    section = (collector_config if collector_config is not None else load_collector_config()).get("counters") or {}
+    config.update({k: v for k, v in section.items() if v is not None})
+    return config
+
+
+def polls_counters(device: Dict) -> bool:
+    """Счётчики опрашиваются у устройств с counters: true (по умолчанию — у всех с collector: snmp)."""
+    return bool(device.get("counters", uses_snmp(device)))
+
+
+def counter_delta(previous: int, current: int, bits: int, max_delta: float = None) -> Optional[int]:
+    """
+    Прирост счётчика с учётом переполнения. Счётчик «уменьшился» — это переполнение,
+    если прирост через него не больше max_delta (сколько интерфейс мог передать за
+    интервал), иначе сброс (перезагрузка, clear counters): None. Без max_delta
+    граница — полкруга счётчика: 32-битные октеты на скоростях от ~570 Мбит/с при
+    опросе раз в 30 с переполняются дальше, поэтому для них нужна скорость интерфейса.
+    """
+    if current >= previous:
+        return current - previous
+    wrapped = current + (1 << bits) - previous
+    limit = max_delta if max_delta is not None else 1 << (bits - 1)
+    return wrapped if wrapped <= limit else None
+
+
+def _speed_bps(row: Dict[Tuple[int, ...], Any]) -> Optional[float]:
+    """Скорость интерфейса, бит/с: ifHighSpeed (Мбит/с), иначе ifSpeed; None — агент не знает."""
+    high_speed = int(row.get(IF_HIGH_SPEED, 0))
+    if high_speed:
+        return high_speed * 1_000_000.0
+    speed = int(row.get(IF_SPEED, 0))
+    return float(speed) if speed else None
+
+
+def _counters(row: Dict[Tuple[int, ...], Any]) -> Dict[str, Tuple[int, int]]:
+    """Поле → (значение счётчика, разрядность) из строки обхода."""
+    values = {}
+    for field, (hc_column, column, _) in RATES.items():
+        if hc_column is not None and hc_column in row:
+            values[field] = (int(row[hc_column]), 64)
+        elif column in row:
+            values[field] = (int(row[column]), 32)
+    return values
+
+
+class CounterPoller:
+    """
+    Частый опрос счётчиков интерфейсов по SNMP (октеты, ошибки, отбросы, ifOperStatus).
+    Скорости считаются по разнице с прошлым отсчётом и пишутся в кольцевые буферы
+    интерфейсов (RingBuffer — фиксированная память на интерфейс). Раз в rollup_interval
+    завершённые интервалы rollup_bucket сворачиваются (среднее/максимум) в файл
+    data/counters/counters_<время> — история на диске, буферы — только последние часы.
+    """
+
+    def __init__(self, config: dict = None, snmp_config: dict = None):
+        collector_config = None if config is not None and snmp_config is not None else load_collector_config()
+        self.config = config or load_counter_config(collector_config)
+        self.snmp_config = snmp_config or load_snmp_config(collector_config)
+        self.rings: Dict[InterfaceKey, RingBuffer] = {}
+        self.names: Dict[str, Dict[int, str]] = {}          # ip → {ifIndex: ifName}
+        self._names_at: Dict[str, float] = {}
+        self._previous: Dict[InterfaceKey, Tuple[float, Dict[str, Tuple[int, int]]]] = {}
+        self._vanished: set = set()   # интерфейсы, пропавшие из обхода: буфер удаляется после свёртки
+        self._rolled_until: Optional[float] = None
+        self._rollup_at = time.time()
+        self._lock = threading.Lock()
+
+    def ring(self, key: InterfaceKey) -> RingBuffer:
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = RingBuffer(self.config["capacity"], FIELDS)
+        return ring
+
+    def record(self, ip: str, rows: Dict[Tuple[int, ...], Dict], timestamp: float) -> int:
+        """
+        Отсчёт устройства: скорости относительно прошлого отсчёта → кольцевые буферы.
+        Интерфейсы устройства, которых нет в обходе, выбывают (forget).
+        """
+        with self._lock:
+            seen = {(ip, index[0]) for index in rows}
+            self._forget({key for key in self.rings if key[0] == ip} - seen)
+            for index, row in rows.items():
+                key = (ip, index[0])
+                self._vanished.discard(key)
+                counters = _counters(row)
+                speed = _speed_bps(row)
+                previous = self._previous.get(key)
+                self._previous[key] = (timestamp, counters)
+
+                values: Dict[str, Optional[float]] = {
+                    "oper_status": float(int(row[IF_OPER_STATUS])) if IF_OPER_STATUS in row else None
+                }
+                if previous is not None and timestamp > previous[0]:
+                    elapsed = timestamp - previous[0]
+                    for field, (current, bits) in counters.items():
+                        before = previous[1].get(field)
+                        # Разрядность сменилась (агент начал/перестал отдавать ifXTable) — отсчёт пропускаем
+                        if before is None or before[1] != bits:
+                            continue
+                        max_delta = None
+                        if speed is not None and RATES[field][2] == 8:
+                            max_delta = speed / 8 * elapsed * SPEED_SLACK
+                        delta = counter_delta(before[0], current, bits, max_delta)
+                        if delta is not None:
+                            values[field] = delta * RATES[field][2] / elapsed
+                self.ring(key).append(timestamp, values)
+        return len(rows)
+
+    def _forget(self, keys):
+        """Интерфейсы больше не опрашиваются: прошлый отсчёт забывается сразу, буфер — после свёртки."""
+        for key in keys:
+            self._previous.pop(key, None)
+            self._vanished.add(key)
+
+    def retain(self, devices: List[Dict]):
+        """Устройства, которых больше нет в списке опроса, выбывают целиком."""
+        ips = {device["ip"] for device in devices}
+        with self._lock:
+            self._forget({key for key in self.rings if key[0] not in ips})
+            for ip in set(self.names) - ips:
+                self.names.pop(ip, None)
+                self._names_at.pop(ip, None)
+
+    async def poll_device(self, snmp_engine, device: Dict) -> int:
+        ip = device["ip"]
+        session = await SnmpSession(snmp_engine, device, self.snmp_config).open()
+        walks = [session.walk(COUNTER_COLUMNS)]
+        refresh_names = time.time() - self._names_at.get(ip, 0) >= self.config["names_max_age"]
+        if refresh_names:
+            walks.append(session.walk(IF_NAME_COLUMNS))
+
+        results = await asyncio.gather(*walks)
+        timestamp = time.time()
+        if refresh_names:
+            self.names[ip] = interface_names(results[1])
+            self._names_at[ip] = timestamp
+        return self.record(ip, results[0], timestamp)
+
+    def poll(self, devices: List[Dict]) -> int:
+        """Один опрос всех устройств (параллельно, в одном event loop); затем свёртка, если пора."""
+        from pysnmp.hlapi.v3arch.asyncio import SnmpEngine
+
+        self.retain(devices)
+
+        async def run():
+            snmp_engine = SnmpEngine()
+            semaphore = asyncio.Semaphore(max(1, int(self.snmp_config["max_concurrency"])))
+
+            async def one(device):
+                async with semaphore:
+                    try:
+                        return await self.poll_device(snmp_engine, device)
+                    except Exception as e:
+                        print(f"[COUNTERS] Ошибка опроса {device.get('hostname', device['ip'])} ({device['ip']}): {e}")
+                        return 0
+
+            try:
+                return sum(await asyncio.gather(*(one(device) for device in devices)))
+            finally:
+                snmp_engine.close_dispatcher()
+
+        sampled = asyncio.run(run()) if devices else 0
+        if time.time() - self._rollup_at >= self.config["rollup_interval"]:
+            self.rollup()
+        return sampled
+
+    def rollup(self, final: bool = False) -> Optional[Path]:
+        """
+        Свёртка в файл: завершённые интервалы rollup_bucket с прошлой свёртки
+        (final — и текущий незавершённый, при остановке процесса).
+        """
+        now = time.time()
+        bucket = float(self.config["rollup_bucket"])
+        until = now if final else now - now % bucket
+        self._rollup_at = now
+
+        with self._lock:
+            since = self._rolled_until
+            rows = []
+            for (ip, if_index), ring in self.rings.items():
+                name = self.names.get(ip, {}).get(if_index, str(if_index))
+                for row in ring.downsample(bucket, since, until):
+                    rows.append({"device_ip": ip, "interface": name, "if_index": if_index, **row})
+            self._rolled_until = until
+            # Пропавшие интерфейсы, все отсчёты которых уже в свёртке, — буферы больше не нужны
+            for key in list(self._vanished):
+                latest = self.rings[key].latest() if key in self.rings else None
+                if latest is None or latest[0] < until:
+                    self.rings.pop(key, None)
+                    self._vanished.discard(key)
+
+        if not rows:
+            return None
+
+        created_at = datetime.now(timezone.utc)
+        timestamp = created_at.strftime("%Y-%m-%d_%H-%M-%S")
+        document = {
+            "rollup": {
+                "created_at": created_at.isoformat().replace("+00:00", "Z"),
+                "bucket": bucket,
+                "from": since,
+                "until": until,
+                "interfaces": len(self.rings),
+            },
+            "samples": rows,
+        }
+        base_path = Path(self.config["path"])
+        base_path.mkdir(parents=True, exist_ok=True)
+        path = get_serializer().dump(document, base_path / f"counters_{timestamp}.json")
+        record_latest("counters", path)
+        print(f"[COUNTERS] Свёртка: {len(rows)} строк, {len(self.rings)} интерфейсов → {path}")
+        return path
+
+    def memory_bytes(self) -> int:
+        return sum(ring.nbytes() for ring in self.rings.values())
@@ -0,0 +1,101 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DHCP_STATE_DIR = Path("data/state/dhcp")
+
+
+class DhcpLeaseCache:
+    """
+    Локальная копия leases одного DHCP-сервера для инкрементального сбора:
+    {scope: {ip: запись}} в формате DHCP_EXPORT_SCRIPT, reservations целиком,
+    synced_at — время последней полной синхронизации, fetched_at — начало
+    последнего успешного сбора (от него отсчитываются изменённые leases).
+    Файл — data/state/dhcp/<ip сервера>.json.
+    """
+
+    def __init__(self, server_ip: str, state_dir: Path = DHCP_STATE_DIR):
+        self.server_ip = server_ip
+        self.path = Path(state_dir) / f"{server_ip}.json"
+        self.synced_at: Optional[float] = None
+        self.fetched_at: Optional[float] = None
+        self.leases: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.reservations: List[Dict[str, Any]] = []
+
+    @classmethod
+    def load(cls, server_ip: str, state_dir: Path = DHCP_STATE_DIR) -> "DhcpLeaseCache":
+        cache = cls(server_ip, state_dir)
+        if not cache.path.exists():
+            return cache
+        try:
+            with open(cache.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[DHCP] {server_ip}: кэш leases не читается ({e}) — будет полная синхронизация")
+            return cache
+        cache.synced_at = data.get("synced_at")
+        cache.fetched_at = data.get("fetched_at")
+        cache.leases = data.get("leases") or {}
+        cache.reservations = data.get("reservations") or []
+        return cache
+
+    def needs_full_sync(self, interval: float, now: float = None) -> bool:
+        now = now if now is not None else time.time()
+        return self.synced_at is None or self.fetched_at is None or now - self.synced_at >= interval
+
+    @staticmethod
+    def _by_scope(leases: List[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        by_scope: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for lease in leases:
+            by_scope.setdefault(lease.get("ScopeId") or "", {})[lease.get("IPAddress")] = lease
+        return by_scope
+
+    def replace(self, scopes: List[str], leases: List[Dict[str, Any]], reservations: List[Dict[str, Any]], fetched_at: float):
+        """Полная синхронизация: кэш = ответ сервера (scope, которых больше нет, выбрасываются)."""
+        by_scope = self._by_scope(leases)
+        self.leases = {scope: by_scope.get(scope, {}) for scope in scopes}
+        self.reservations = reservations
+        self.synced_at = self.fetched_at = fetched_at
+
+    def apply(self, scopes: List[str], changed: List[Dict[str, Any]], present: Dict[str, str],
+              reservations: List[Dict[str, Any]], fetched_at: float) -> int:
+        """
+        Инкрементальный ответ: изменённые leases поверх кэша, удалённые (их IP нет
+        в present scope) — из кэша. Возвращает число обновлённых записей.
+        """
+        by_scope = self._by_scope(changed)
+        leases = {}
+        for scope in scopes:
+            cached = self.leases.get(scope, {})
+            alive = set(filter(None, (present.get(scope) or "").split(",")))
+            merged = {ip: lease for ip, lease in cached.items() if ip in alive}
+            merged.update(by_scope.get(scope, {}))
+            leases[scope] = merged
+        self.leases = leases
+        self.reservations = reservations
+        self.fetched_at = fetched_at
+        return len(changed)
+
+    def document(self) -> Dict[str, Any]:
+        """Всё известное о сервере в формате DHCP_EXPORT_SCRIPT — вход DhcpJsonParser."""
+        return {
+            "leases": [lease for scope in self.leases.values() for lease in scope.values()],
+            "reservations": self.reservations,
+        }
+
+    def lease_count(self) -> int:
+        return sum(len(scope) for scope in self.leases.values())
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "server": self.server_ip,
+            "synced_at": self.synced_at,
+            "fetched_at": self.fetched_at,
+            "leases": self.leases,
+            "reservations": self.reservations,
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp_path.replace(self.path)
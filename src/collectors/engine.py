@@ -0,0 +1,133 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from src.collectors.ssh_collector import collect_raw
+
+DEFAULT_COLLECTOR_CONFIG = {
+    "max_concurrency": 200,
+    "per_location": 20,
+    "locations": {},
+    "streaming": False,
+}
+
+
+def load_collector_config() -> dict:
+    path = Path("config/collector.yaml")
+    config = dict(DEFAULT_COLLECTOR_CONFIG)
+
+    if not path.exists():
+        print("config/collector.yaml не найден — используем лимиты по умолчанию")
+        return config
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    config.update({k: v for k, v in (data.get("collector") or {}).items() if v is not None})
+    config["locations"] = config.get("locations") or {}
+    return config
+
+
+class CollectionEngine:
+    """
+    Асинхронный движок сбора.
+    Держит в работе до max_concurrency устройств одновременно и не более
+    per_location на одну площадку (location из devices.yaml).
+    Сессии netmiko синхронные, поэтому каждая выполняется в своём потоке —
+    asyncio только планирует задачи и соблюдает лимиты.
+    """
+
+    def __init__(self, max_concurrency: int = 200, per_location: int = 20, location_limits: Dict[str, int] = None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.per_location = max(1, int(per_location))
+        self.location_limits = {str(k): max(1, int(v)) for k, v in (location_limits or {}).items()}
+
+    @classmethod
+    def from_config(cls, config: dict = None) -> "CollectionEngine":
+        config = config or load_collector_config()
+        return cls(
+            max_concurrency=config.get("max_concurrency", DEFAULT_COLLECTOR_CONFIG["max_concurrency"]),
+            per_location=config.get("per_location", DEFAULT_COLLECTOR_CONFIG["per_location"]),
+            location_limits=config.get("locations"),
+        )
+
+    def location_limit(self, location: str) -> int:
+        return min(self.location_limits.get(location, self.per_location), self.max_concurrency)
+
+    async def run_async(
+        self,
+        devices: List[Dict],
+        func: Callable,
+        *args,
+        on_result: Optional[Callable[[Dict, Any], None]] = None,
+        **kwargs
+    ) -> List[Tuple[Dict, Any]]:
+        """
+        Выполняет func(device, *args, **kwargs) для каждого устройства.
+        Результаты возвращаются в порядке завершения; on_result (если задан)
+        вызывается в потоке event loop сразу по готовности устройства.
+        Ошибка на одном устройстве не прерывает сбор — его результат будет None.
+        """
+        if not devices:
+            return []
+
+        loop = asyncio.get_running_loop()
+        global_sem = asyncio.Semaphore(self.max_concurrency)
+        location_sems: Dict[str, asyncio.Semaphore] = {}
+
+        workers = min(self.max_concurrency, len(devices))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collector")
+
+        async def run_one(device: Dict) -> Tuple[Dict, Any]:
+            location = str(device.get("location", "unknown"))
+            if location not in location_sems:
+                location_sems[location] = asyncio.Semaphore(self.location_limit(location))
+
+            # Сначала слот площадки, потом глобальный — чтобы устройства одной
+            # перегруженной площадки не занимали глобальные слоты в ожидании
+            async with location_sems[location]:
+                async with global_sem:
+                    try:
+                        result = await loop.run_in_executor(executor, partial(func, device, *args, **kwargs))
+                    except Exception as e:
+                        print(f"Ошибка обработки {device.get('hostname', device.get('ip'))} ({device.get('ip')}): {e}")
+                        result = None
+            return device, result
+
+        results = []
+        try:
+            tasks = [asyncio.create_task(run_one(device)) for device in devices]
+            for task in asyncio.as_completed(tasks):
+                device, result = await task
+                if on_result:
+                    on_result(device, result)
+                results.append((device, result))
+        finally:
+            executor.shutdown(wait=True)
+
+        return results
+
+    def run(
+        self,
+        devices: List[Dict],
+        func: Callable,
+        *args,
+        on_result: Optional[Callable[[Dict, Any], None]] = None,
+        **kwargs
+    ) -> List[Tuple[Dict, Any]]:
+        """Синхронная обёртка над run_async для обычных (не async) точек входа."""
+        return asyncio.run(self.run_async(devices, func, *args, on_result=on_result, **kwargs))
+
+
+def collect_raw_all(devices: List[Dict], command_type: str = "static", engine: CollectionEngine = None) -> Dict[str, Dict[str, str]]:
+    """
+    Массовый collect_raw(): {ip устройства: {команда: вывод}}.
+    Контракт по каждому устройству тот же, что у collect_raw().
+    """
+    engine = engine or CollectionEngine.from_config()
+    results = engine.run(devices, collect_raw, command_type=command_type)
+    return {device["ip"]: raw or {} for device, raw in results}
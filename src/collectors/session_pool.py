@@ -0,0 +1,193 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from src.collectors.ssh_collector import open_session
+
+DEFAULT_SESSION_POOL_CONFIG = {
+    "idle_timeout": 900,       # закрываем сессию, если ей не пользовались N секунд
+    "max_age": 3600,           # пересоздаём сессию не реже раза в N секунд
+    "keepalive_interval": 60,  # период проверки/keepalive простаивающих сессий
+}
+
+
+class PooledSession:
+    def __init__(self, ip: str, conn):
+        self.ip = ip
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Одна сессия — один пользователь: команды в канал пишет только держатель lock
+        self.lock = threading.Lock()
+
+    def age(self, now: float) -> float:
+        return now - self.created_at
+
+    def idle(self, now: float) -> float:
+        return now - self.last_used
+
+    def close(self):
+        try:
+            self.conn.disconnect()
+        except Exception as e:
+            print(f"[POOL] Ошибка закрытия сессии {self.ip}: {e}")
+
+
+class SessionPool:
+    """
+    Пул долгоживущих SSH-сессий, ключ — IP устройства.
+    Сессия открывается один раз (логин, enable, terminal length 0) и переиспользуется
+    между циклами опроса. Фоновый поток шлёт keepalive, закрывает простаивающие
+    (idle_timeout) и слишком старые (max_age) сессии; мёртвый канал при выдаче
+    сессии прозрачно переоткрывается.
+    """
+
+    def __init__(self, idle_timeout: float = 900, max_age: float = 3600, keepalive_interval: float = 60):
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.keepalive_interval = keepalive_interval
+
+        self._sessions: Dict[str, PooledSession] = {}
+        self._connect_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._maintenance: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: dict = None) -> "SessionPool":
+        settings = dict(DEFAULT_SESSION_POOL_CONFIG)
+        settings.update((config or {}).get("session_pool") or {})
+        return cls(**settings)
+
+    def _connect_lock(self, ip: str) -> threading.Lock:
+        with self._lock:
+            return self._connect_locks.setdefault(ip, threading.Lock())
+
+    def _is_usable(self, entry: PooledSession, now: float) -> bool:
+        if entry.age(now) > self.max_age:
+            print(f"[POOL] {entry.ip}: сессия старше {self.max_age} с — пересоздаём")
+            return False
+        try:
+            alive = entry.conn.is_alive()
+        except Exception:
+            alive = False
+        if not alive:
+            print(f"[POOL] {entry.ip}: канал мёртв — переподключаемся")
+        return alive
+
+    def _forget(self, entry: PooledSession):
+        with self._lock:
+            if self._sessions.get(entry.ip) is entry:
+                del self._sessions[entry.ip]
+
+    def _drop(self, entry: PooledSession):
+        self._forget(entry)
+        entry.close()
+
+    def _acquire(self, device: Dict) -> PooledSession:
+        ip = device["ip"]
+
+        # Подключение долгое — держим lock конкретного IP, а не всего пула
+        with self._connect_lock(ip):
+            entry = self._sessions.get(ip)
+            if entry is not None:
+                entry.lock.acquire()
+                if self._is_usable(entry, time.monotonic()):
+                    return entry
+                self._forget(entry)
+                entry.lock.release()
+                entry.close()
+
+            entry = PooledSession(ip, open_session(device, keepalive=self.keepalive_interval))
+            entry.lock.acquire()
+            with self._lock:
+                self._sessions[ip] = entry
+            return entry
+
+    @contextmanager
+    def session(self, device: Dict):
+        """Выдаёт готовую (залогиненную, в enable, без paging) сессию устройства."""
+        entry = self._acquire(device)
+        try:
+            yield entry.conn
+        except Exception:
+            # Состояние канала после ошибки неизвестно — не возвращаем его в пул
+            self._forget(entry)
+            entry.lock.release()
+            entry.close()
+            raise
+        else:
+            entry.last_used = time.monotonic()
+            entry.lock.release()
+
+    def invalidate(self, ip: str):
+        entry = self._sessions.get(ip)
+        if entry is not None:
+            self._drop(entry)
+
+    def maintain(self):
+        """Один проход обслуживания: keepalive, вытеснение по простою и возрасту."""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._sessions.values())
+
+        for entry in entries:
+            # Занятые сессии не трогаем — ими сейчас кто-то пользуется
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.idle(now) > self.idle_timeout:
+                    print(f"[POOL] {entry.ip}: простой {entry.idle(now):.0f} с — закрываем")
+                    expired = True
+                elif entry.age(now) > self.max_age:
+                    print(f"[POOL] {entry.ip}: возраст {entry.age(now):.0f} с — закрываем")
+                    expired = True
+                else:
+                    # is_alive() пишет в канал служебный байт — это и есть keepalive
+                    expired = not entry.conn.is_alive()
+                    if expired:
+                        print(f"[POOL] {entry.ip}: канал мёртв — удаляем из пула")
+            except Exception as e:
+                print(f"[POOL] {entry.ip}: ошибка keepalive: {e}")
+                expired = True
+
+            # Из пула убираем, пока держим lock, — чтобы сессию не успели выдать
+            if expired:
+                self._forget(entry)
+            entry.lock.release()
+
+            if expired:
+                entry.close()
+
+    def _maintenance_loop(self):
+        while not self._stop.wait(self.keepalive_interval):
+            self.maintain()
+
+    def start(self):
+        if self._maintenance and self._maintenance.is_alive():
+            return
+        self._stop.clear()
+        self._maintenance = threading.Thread(target=self._maintenance_loop, name="session-pool", daemon=True)
+        self._maintenance.start()
+
+    def close_all(self):
+        self._stop.set()
+        if self._maintenance:
+            self._maintenance.join(timeout=5)
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            entry.close()
+        print(f"[POOL] Закрыто сессий: {len(entries)}")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close_all()
@@ -0,0 +1,373 @@
+import asyncio
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.collectors.engine import load_collector_config
+from src.collectors.ssh_collector import load_env
+from src.filters.port_filters import get_port_filter
+
+# Сбор MAC/ARP/интерфейсов по SNMP (GETBULK) — дешёвая альтернатива разбору CLI.
+# Устройство переключается на SNMP полем collector: snmp в devices.yaml; результат —
+# те же записи, что отдают CLI-парсеры ({"mac_entries": [...]}, {"arp_entries": [...]}).
+# pysnmp загружается при первом обращении к устройству.
+
+DEFAULT_SNMP_CONFIG = {
+    "version": "2c",          # 1 или 2c (community в .env: SNMP_COMMUNITY)
+    "port": 161,
+    "timeout": 2,             # секунд на один запрос
+    "retries": 1,
+    "max_repetitions": 25,    # строк таблицы в одном GETBULK
+    "max_concurrency": 100,   # устройств одновременно в collect_snmp_many
+}
+
+# Колонки MIB (OID без индекса)
+IF_DESCR = (1, 3, 6, 1, 2, 1, 2, 2, 1, 2)
+IF_TYPE = (1, 3, 6, 1, 2, 1, 2, 2, 1, 3)
+IF_ADMIN_STATUS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 7)
+IF_OPER_STATUS = (1, 3, 6, 1, 2, 1, 2, 2, 1, 8)
+IF_NAME = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 1)
+IF_HIGH_SPEED = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 15)
+IF_ALIAS = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 18)
+
+DOT1D_BASE_PORT_IFINDEX = (1, 3, 6, 1, 2, 1, 17, 1, 4, 1, 2)
+DOT1D_TP_FDB_PORT = (1, 3, 6, 1, 2, 1, 17, 4, 3, 1, 2)
+DOT1D_TP_FDB_STATUS = (1, 3, 6, 1, 2, 1, 17, 4, 3, 1, 3)
+DOT1Q_TP_FDB_PORT = (1, 3, 6, 1, 2, 1, 17, 7, 1, 2, 2, 1, 2)
+DOT1Q_TP_FDB_STATUS = (1, 3, 6, 1, 2, 1, 17, 7, 1, 2, 2, 1, 3)
+DOT1Q_VLAN_FDB_ID = (1, 3, 6, 1, 2, 1, 17, 7, 1, 4, 2, 1, 3)
+
+IP_NET_TO_MEDIA_PHYS = (1, 3, 6, 1, 2, 1, 4, 22, 1, 2)
+IP_NET_TO_MEDIA_TYPE = (1, 3, 6, 1, 2, 1, 4, 22, 1, 4)
+IP_NET_TO_PHYSICAL_PHYS = (1, 3, 6, 1, 2, 1, 4, 35, 1, 4)
+IP_NET_TO_PHYSICAL_TYPE = (1, 3, 6, 1, 2, 1, 4, 35, 1, 6)
+
+# Группы колонок, которые идут одним GETBULK (общий индекс таблицы)
+IF_NAME_COLUMNS = (IF_NAME, IF_DESCR)
+IF_STATUS_COLUMNS = (IF_ALIAS, IF_ADMIN_STATUS, IF_OPER_STATUS, IF_HIGH_SPEED, IF_TYPE)
+BRIDGE_PORT_COLUMNS = (DOT1D_BASE_PORT_IFINDEX,)
+QBRIDGE_FDB_COLUMNS = (DOT1Q_TP_FDB_PORT, DOT1Q_TP_FDB_STATUS)
+QBRIDGE_VLAN_COLUMNS = (DOT1Q_VLAN_FDB_ID,)
+BRIDGE_FDB_COLUMNS = (DOT1D_TP_FDB_PORT, DOT1D_TP_FDB_STATUS)
+ARP_PHYSICAL_COLUMNS = (IP_NET_TO_PHYSICAL_PHYS, IP_NET_TO_PHYSICAL_TYPE)
+ARP_MEDIA_COLUMNS = (IP_NET_TO_MEDIA_PHYS, IP_NET_TO_MEDIA_TYPE)
+
+# dot1dTpFdbStatus / dot1qTpFdbStatus: 2 = invalid — таких записей в таблице MAC нет
+FDB_STATUS_TYPES = {1: "other", 3: "dynamic", 4: "self", 5: "static"}
+# ipNetToMediaType / ipNetToPhysicalType: 2 = invalid
+ARP_TYPES = {1: "other", 3: "dynamic", 4: "static", 5: "local"}
+# ifType → тип интерфейса, как у CLI-парсеров
+IF_TYPES = {6: "ethernet", 24: "loopback", 53: "vlan", 131: "tunnel", 135: "vlan", 136: "vlan", 161: "port-channel"}
+
+Row = Dict[Tuple[int, ...], Dict[Tuple[int, ...], Any]]  # индекс строки → {колонка: значение}
+
+
+def load_snmp_config(collector_config: dict = None) -> dict:
+    """Секция snmp из config/collector.yaml поверх DEFAULT_SNMP_CONFIG."""
+    config = dict(DEFAULT_SNMP_CONFIG)
+    section = (collector_config if collector_config is not None else load_collector_config()).get("snmp") or {}
+    config.update({k: v for k, v in section.items() if v is not None})
+    return config
+
+
+def uses_snmp(device: Dict) -> bool:
+    return device.get("collector") == "snmp"
+
+
+def _format_mac(octets: bytes) -> Optional[str]:
+    return octets.hex() if len(octets) == 6 else None
+
+
+def _text(value) -> str:
+    return value.asOctets().decode("utf-8", errors="replace").strip("\x00 ")
+
+
+class SnmpSession:
+    """
+    SNMP-сессия одного устройства внутри event loop: общий SnmpEngine процесса сбора,
+    адрес, community. walk() обходит несколько колонок одной таблицы одним GETBULK
+    на каждые max_repetitions строк; разные таблицы устройства обходятся параллельно.
+    """
+
+    def __init__(self, snmp_engine, device: Dict, config: dict):
+        from pysnmp.hlapi.v3arch.asyncio import CommunityData, ContextData
+
+        load_env()
+        self.snmp_engine = snmp_engine
+        self.device = device
+        self.host = device["ip"]
+        self.port = int(device.get("snmp_port", config["port"]))
+        self.timeout = float(config["timeout"])
+        self.retries = int(config["retries"])
+        self.max_repetitions = int(config["max_repetitions"])
+        community = device.get("snmp_community") or os.getenv("SNMP_COMMUNITY", "public")
+        version = str(device.get("snmp_version", config["version"]))
+        self.auth = CommunityData(community, mpModel=0 if version == "1" else 1)
+        self.context = ContextData()
+        self.target = None
+
+    async def open(self):
+        from pysnmp.hlapi.v3arch.asyncio import UdpTransportTarget
+
+        self.target = await UdpTransportTarget.create((self.host, self.port), timeout=self.timeout, retries=self.retries)
+        return self
+
+    async def walk(self, columns: Iterable[Tuple[int, ...]]) -> Row:
+        """
+        {индекс строки: {колонка: значение}} для колонок таблицы. Колонка, которая
+        закончилась (ответ вышел за её OID или endOfMibView), дальше не запрашивается.
+        Ошибка SNMP (таймаут, отказ агента) — RuntimeError.
+        """
+        from pysnmp.hlapi.v3arch.asyncio import ObjectIdentity, ObjectType, bulk_cmd
+        from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchInstance, NoSuchObject
+
+        rows: Row = {}
+        cursor = {column: column for column in columns}  # колонка → последний полученный OID
+
+        while cursor:
+            active = list(cursor)
+            error_indication, error_status, error_index, var_binds = await bulk_cmd(
+                self.snmp_engine, self.auth, self.target, self.context,
+                0, self.max_repetitions,
+                *[ObjectType(ObjectIdentity(cursor[column])) for column in active],
+                lookupMib=False,
+            )
+            if error_indication:
+                raise RuntimeError(str(error_indication))
+            if error_status:
+                raise RuntimeError(error_status.prettyPrint())
+            if not var_binds:
+                break
+
+            finished = set()
+            # Ответ GETBULK — строки по max_repetitions: (колонка 1, колонка 2, ...) подряд
+            for i, (name, value) in enumerate(var_binds):
+                column = active[i % len(active)]
+                if column in finished:
+                    continue
+                oid = tuple(name)
+                if isinstance(value, (EndOfMibView, NoSuchObject, NoSuchInstance)) or oid[:len(column)] != column:
+                    finished.add(column)
+                    continue
+                if oid <= cursor[column]:  # агент не продвинулся — защита от зацикливания
+                    finished.add(column)
+                    continue
+                cursor[column] = oid
+                rows.setdefault(oid[len(column):], {})[column] = value
+
+            for column in finished:
+                cursor.pop(column, None)
+        return rows
+
+
+def interface_names(name_rows: Row) -> Dict[int, str]:
+    """ifIndex → ifName (ifDescr, если ifName пуст или не поддерживается)."""
+    names = {}
+    for index, row in name_rows.items():
+        name = _text(row[IF_NAME]) if IF_NAME in row else ""
+        names[index[0]] = name or (_text(row[IF_DESCR]) if IF_DESCR in row else str(index[0]))
+    return names
+
+
+def build_interfaces(names: Dict[int, str], status_rows: Row) -> List[Dict[str, Any]]:
+    """Интерфейсы в формате CLI-парсеров (вход InterfaceNormalizer)."""
+    interfaces = []
+    for index, row in sorted(status_rows.items()):
+        if_index = index[0]
+        admin = int(row.get(IF_ADMIN_STATUS, 1))
+        oper = int(row.get(IF_OPER_STATUS, 2))
+        speed = int(row.get(IF_HIGH_SPEED, 0))
+        if_type = int(row.get(IF_TYPE, 0))
+        interfaces.append({
+            "name": names.get(if_index, str(if_index)),
+            "description": _text(row[IF_ALIAS]) if IF_ALIAS in row else None,
+            "status": "shutdown" if admin == 2 else ("up" if oper == 1 else "down"),
+            "speed": f"{speed}Mb" if speed else "auto",
+            "duplex": "unknown",
+            "type": IF_TYPES.get(if_type, str(if_type)),
+            "if_index": if_index,
+        })
+    return interfaces
+
+
+def build_mac_entries(
+    names: Dict[int, str],
+    bridge_rows: Row,
+    qbridge_rows: Row,
+    vlan_rows: Row,
+    dot1d_rows: Row,
+    device_ip: str = None,
+    device_hostname: str = None,
+) -> List[Dict[str, Any]]:
+    """
+    Записи MAC-таблицы (формат MacTableNormalizer) из Q-BRIDGE-MIB; если коммутатор
+    его не поддерживает — из BRIDGE-MIB (без VLAN — такой мост один, пишем VLAN 1).
+    Номер FDB переводится в VLAN через dot1qVlanFdbId, когда соответствие однозначно
+    (при общей FDB на несколько VLAN — остаётся номер FDB, обычно он и есть VLAN).
+    """
+    port_names = {}
+    for index, row in bridge_rows.items():
+        if_index = int(row[DOT1D_BASE_PORT_IFINDEX])
+        port_names[index[0]] = names.get(if_index, str(if_index))
+
+    fdb_vlans: Dict[int, List[int]] = {}
+    for index, row in vlan_rows.items():  # индекс: timeMark.vlan
+        fdb_vlans.setdefault(int(row[DOT1Q_VLAN_FDB_ID]), []).append(index[-1])
+
+    if qbridge_rows:
+        source = ((index[0], index[1:], row.get(DOT1Q_TP_FDB_PORT), row.get(DOT1Q_TP_FDB_STATUS))
+                  for index, row in qbridge_rows.items())
+    else:
+        source = ((None, index, row.get(DOT1D_TP_FDB_PORT), row.get(DOT1D_TP_FDB_STATUS))
+                  for index, row in dot1d_rows.items())
+
+    entries = []
+    for fdb_id, mac_index, bridge_port, status in source:
+        mac_type = FDB_STATUS_TYPES.get(int(status) if status is not None else 3)
+        if mac_type is None or len(mac_index) != 6 or not bridge_port:
+            continue
+        if fdb_id is None:
+            vlan = 1
+        else:
+            vlans = fdb_vlans.get(fdb_id, [])
+            vlan = vlans[0] if len(vlans) == 1 else fdb_id
+        entry = {
+            "vlan": str(vlan),
+            "mac": bytes(mac_index).hex(),
+            "type": mac_type,
+            "port": port_names.get(int(bridge_port), str(int(bridge_port))),
+        }
+        if device_ip:
+            entry["device_ip"] = device_ip
+        if device_hostname:
+            entry["device_hostname"] = device_hostname
+        entries.append(entry)
+
+    # Фильтрация портов (port_filters.yaml) — как у CLI-парсеров
+    if device_ip:
+        entries = get_port_filter().filter_entries(device_ip, entries)
+    return entries
+
+
+def build_arp_entries(names: Dict[int, str], physical_rows: Row, media_rows: Row, device_ip: str = None) -> List[Dict[str, Any]]:
+    """
+    ARP-записи (формат ArpNormalizer): IPv4 из ipNetToPhysicalTable, если агент её
+    отдаёт, иначе из ipNetToMediaTable. Возраста записи в SNMP нет — age всегда None.
+    """
+    rows = []
+    if physical_rows:
+        for index, row in physical_rows.items():  # ifIndex.addrType.len.addr
+            if len(index) == 7 and index[1] == 1 and index[2] == 4:
+                rows.append((index[0], index[3:], row.get(IP_NET_TO_PHYSICAL_PHYS), row.get(IP_NET_TO_PHYSICAL_TYPE)))
+    else:
+        for index, row in media_rows.items():  # ifIndex.a.b.c.d
+            if len(index) == 5:
+                rows.append((index[0], index[1:], row.get(IP_NET_TO_MEDIA_PHYS), row.get(IP_NET_TO_MEDIA_TYPE)))
+
+    port_filter = get_port_filter() if device_ip else None
+    entries = []
+    for if_index, address, phys, arp_type in rows:
+        mac = _format_mac(phys.asOctets()) if phys is not None else None
+        type_ = ARP_TYPES.get(int(arp_type) if arp_type is not None else 3)
+        if mac is None or type_ is None:
+            continue
+        interface = names.get(if_index, str(if_index))
+        if port_filter and port_filter.is_ignored(device_ip, interface):
+            continue
+        entries.append({
+            "ip": ".".join(map(str, address)),
+            "mac": mac,
+            "age": None,
+            "type": type_,
+            "interface": interface,
+        })
+    return entries
+
+
+async def collect_snmp_async(
+    snmp_engine, device: Dict, config: dict, tables: Iterable[str] = ("mac", "arp", "interfaces")
+) -> Dict[str, Any]:
+    """
+    Таблицы устройства по SNMP: {"mac_entries": [...], "arp_entries": [...], "interfaces": [...]}
+    (только запрошенные в tables). Все нужные таблицы обходятся параллельно.
+    """
+    tables = set(tables)
+    session = await SnmpSession(snmp_engine, device, config).open()
+
+    walks = {"names": IF_NAME_COLUMNS}
+    if "interfaces" in tables:
+        walks["status"] = IF_STATUS_COLUMNS
+    if "mac" in tables:
+        walks.update(bridge=BRIDGE_PORT_COLUMNS, qbridge=QBRIDGE_FDB_COLUMNS, vlans=QBRIDGE_VLAN_COLUMNS, dot1d=BRIDGE_FDB_COLUMNS)
+    if "arp" in tables:
+        walks.update(physical=ARP_PHYSICAL_COLUMNS, media=ARP_MEDIA_COLUMNS)
+
+    results = await asyncio.gather(*(session.walk(columns) for columns in walks.values()))
+    rows = dict(zip(walks, results))
+    names = interface_names(rows["names"])
+
+    collected = {}
+    if "mac" in tables:
+        collected["mac_entries"] = build_mac_entries(
+            names, rows["bridge"], rows["qbridge"], rows["vlans"], rows["dot1d"],
+            device_ip=device["ip"], device_hostname=device.get("hostname", device["ip"])
+        )
+    if "arp" in tables:
+        collected["arp_entries"] = build_arp_entries(names, rows["physical"], rows["media"], device_ip=device["ip"])
+    if "interfaces" in tables:
+        collected["interfaces"] = build_interfaces(names, rows["status"])
+    return collected
+
+
+async def _collect_one(snmp_engine, device: Dict, config: dict, tables: Iterable[str]) -> Dict[str, Any]:
+    try:
+        return await collect_snmp_async(snmp_engine, device, config, tables)
+    except Exception as e:
+        print(f"[SNMP] Ошибка сбора {device.get('hostname', device['ip'])} ({device['ip']}): {e}")
+        return {}
+
+
+def collect_snmp(device: Dict, tables: Iterable[str] = ("mac", "arp", "interfaces"), config: dict = None) -> Dict[str, Any]:
+    """
+    Синхронная обёртка для потоков CollectionEngine: один event loop на устройство,
+    таблицы устройства — параллельно. При ошибке возвращает {} (как collect_raw).
+    """
+    from pysnmp.hlapi.v3arch.asyncio import SnmpEngine
+
+    config = config or load_snmp_config()
+
+    async def run():
+        snmp_engine = SnmpEngine()
+        try:
+            return await _collect_one(snmp_engine, device, config, tables)
+        finally:
+            snmp_engine.close_dispatcher()
+
+    return asyncio.run(run())
+
+
+def collect_snmp_many(
+    devices: List[Dict], tables: Iterable[str] = ("mac", "arp", "interfaces"), config: dict = None
+) -> List[Tuple[Dict, Dict[str, Any]]]:
+    """
+    Много устройств в одном event loop и одном SnmpEngine, не более max_concurrency
+    одновременно. Возвращает [(device, результат collect_snmp)] в порядке devices.
+    """
+    from pysnmp.hlapi.v3arch.asyncio import SnmpEngine
+
+    config = config or load_snmp_config()
+    tables = tuple(tables)
+
+    async def run():
+        snmp_engine = SnmpEngine()
+        semaphore = asyncio.Semaphore(max(1, int(config["max_concurrency"])))
+
+        async def one(device):
+            async with semaphore:
+                return device, await _collect_one(snmp_engine, device, config, tables)
+
+        try:
+            return await asyncio.gather(*(one(device) for device in devices))
+        finally:
+            snmp_engine.close_dispatcher()
+
+    return asyncio.run(run())
@@ -1,44 +1,130 @@
 import os
+import re
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
 import yaml
-from dotenv import load_dotenv
-from netmiko import ConnectHandler, NetmikoTimeoutException, NetmikoAuthenticationException
 
-load_dotenv()
+from src.storage.blobs import get_blob_store
+from src.storage.manifest import record_latest
 
-# Загружаем команды из файла
+# netmiko (с paramiko) и .env загружаются при первом подключении, commands.yaml — при первом
+# обращении к командам: импорт модуля ничего не читает и не тянет SSH-стек
 COMMANDS_FILE = Path("commands.yaml")
 
-if not COMMANDS_FILE.exists():
-    raise FileNotFoundError(f"Файл команд не найден: {COMMANDS_FILE}")
+_commands: Dict[str, Any] = {}
+_env_loaded = False
 
-with open(COMMANDS_FILE, "r") as f:
-    commands_config = yaml.safe_load(f)
+def load_commands_config() -> Dict[str, Any]:
+    """commands.yaml — читается один раз на процесс."""
+    if "config" not in _commands:
+        if not COMMANDS_FILE.exists():
+            raise FileNotFoundError(f"Файл команд не найден: {COMMANDS_FILE}")
+        with open(COMMANDS_FILE, "r") as f:
+            config = yaml.safe_load(f)
+        static = [cmd["command"] for cmd in config.get("static_commands", [])]
+        dynamic = [cmd["command"] for cmd in config.get("dynamic_commands", [])]
+        _commands.update(
+            static=static,
+            dynamic=dynamic,
+            # Команда → тип (static/dynamic): нужен, когда в одной сессии выполняются команды обоих типов
+            types={**{cmd: "static" for cmd in static}, **{cmd: "dynamic" for cmd in dynamic}},
+            config=config,
+        )
+    return _commands["config"]
 
-STATIC_COMMANDS = [cmd["command"] for cmd in commands_config.get("static_commands", [])]
-DYNAMIC_COMMANDS = [cmd["command"] for cmd in commands_config.get("dynamic_commands", [])]
+def get_static_commands() -> List[str]:
+    load_commands_config()
+    return _commands["static"]
+
+def get_dynamic_commands() -> List[str]:
+    load_commands_config()
+    return _commands["dynamic"]
+
+def get_command_types() -> Dict[str, str]:
+    load_commands_config()
+    return _commands["types"]
+
+_LAZY_ATTRS = {
+    "commands_config": load_commands_config,
+    "STATIC_COMMANDS": get_static_commands,
+    "DYNAMIC_COMMANDS": get_dynamic_commands,
+    "COMMAND_TYPES": get_command_types,
+}
+
+def __getattr__(name: str):
+    # Старые имена модуля (commands_config, STATIC_COMMANDS, ...) — тоже лениво
+    if name in _LAZY_ATTRS:
+        return _LAZY_ATTRS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 def sanitize_filename(s: str) -> str:
     return "".join(c if c.isalnum() or c in ('-', '_') else '_' for c in s)
 
-def save_raw_output(identifier: str, command: str, output: str, command_type: str = "static"):
+def raw_output_path(identifier: str, command: str, command_type: str = "static", suffix: str = ".txt") -> Path:
     timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
     slug = sanitize_filename(command.replace(" ", "_"))
-    path = Path("data/raw") / command_type / f"{identifier}_{timestamp}_{slug}.txt"
+    path = Path("data/raw") / command_type / f"{identifier}_{timestamp}_{slug}{suffix}"
     path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+def save_raw_output(identifier: str, command: str, output: str, command_type: str = "static"):
+    store = get_blob_store()
+    if store is not None:
+        # raw.mode: blobs — текст хранится по хешу один раз, опрос пишет только ссылку
+        digest = store.put(output)
+        path = store.write_ref(raw_output_path(identifier, command, command_type, ".ref"), digest,
+                               device=identifier, command=command)
+        record_latest("raw", path, blob=digest)
+        print(f"Сохранён raw: {path} → blob {digest[:12]}")
+        return
+    path = raw_output_path(identifier, command, command_type)
     path.write_text(output, encoding="utf-8")
+    record_latest("raw", path)
     print(f"Сохранён raw: {path}")
 
-def collect_raw(device: Dict, command_type: str = "static") -> Dict[str, str]:
-    identifier = device.get("ip")
-    vendor = device["vendor"]
+def stream_raw_output(identifier: str, command: str, lines: Iterable[str], command_type: str = "static") -> Iterator[str]:
+    """Пропускает строки дальше, параллельно дописывая их в raw-файл (весь текст в памяти не держим)."""
+    store = get_blob_store()
+    if store is not None:
+        writer = store.writer()
+        try:
+            with writer:
+                for line in lines:
+                    writer.write(line)
+                    writer.write("\n")
+                    yield line
+        finally:
+            path = store.write_ref(raw_output_path(identifier, command, command_type, ".ref"), writer.digest,
+                                   device=identifier, command=command)
+            record_latest("raw", path, blob=writer.digest)
+        print(f"Сохранён raw (поток) → blob {writer.digest[:12]}")
+        return
+    path = raw_output_path(identifier, command, command_type)
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+            yield line
+    record_latest("raw", path)
+    print(f"Сохранён raw (поток): {path}")
+
+class SessionLostError(Exception):
+    """Канал SSH умер посреди выполнения команд."""
 
-    commands = STATIC_COMMANDS if command_type == "static" else DYNAMIC_COMMANDS
 
-    conn_params = {
+def build_conn_params(device: Dict) -> Dict:
+    load_env()
+    return {
         "device_type": "cisco_ios",
         "host": device["ip"],
         "username": os.getenv("SSH_USERNAME"),
@@ -53,36 +139,171 @@ def collect_raw(device: Dict, command_type: str = "static") -> Dict[str, str]:
         "secret": "",  # пустой secret — netmiko НЕ будет требовать пароль для enable
     }
 
+def prepare_session(conn, identifier: str):
+    """Подготовка свежей сессии: enable, отключение paging, проверка промпта."""
+    # Пытаемся войти в enable без пароля (просто команда enable + Enter)
+    try:
+        conn.send_command_timing("enable", delay_factor=2)
+        print(f"Вошли в enable mode на {identifier} (без ввода пароля)")
+    except Exception as e:
+        print(f"Enable не удался на {identifier}: {e}")
+        print("Продолжаем в текущем режиме — некоторые команды могут не отработать")
+
+    # Отключаем paging (terminal length 0)
+    conn.send_command("terminal length 0", expect_string=r"[>#]")
+
+    # Проверяем текущий промпт
+    prompt = conn.find_prompt()
+    print(f"Текущий промпт: {prompt}")
+
+def open_session(device: Dict, **extra_params):
+    """Открывает и подготавливает SSH-сессию (вызывающий сам закрывает её)."""
+    from netmiko import ConnectHandler
+
+    conn = ConnectHandler(**{**build_conn_params(device), **extra_params})
+    print(f"Подключено к {device.get('ip')} ({device['vendor']})")
+    try:
+        prepare_session(conn, device.get("ip"))
+    except Exception:
+        conn.disconnect()
+        raise
+    return conn
+
+def stream_command(conn, command: str, read_timeout: float = 120, poll_interval: float = 0.05) -> Iterator[str]:
+    """
+    Выполняет команду и отдаёт вывод построчно по мере поступления из канала
+    (без эха команды и финального промпта). Если потребитель остановился раньше,
+    остаток вывода вычитывается до промпта, чтобы канал остался пригодным.
+    """
+    from netmiko import ReadTimeout
+
+    prompt_re = re.compile(re.escape(conn.base_prompt) + r"[^\r\n]*[>#]\s*$")
+    conn.write_channel(command + conn.RETURN)
+
+    tail = ""
+    echo_checked = False
+    done = False
+    last_data = time.monotonic()
+
+    def read_chunk() -> str:
+        nonlocal last_data
+        chunk = conn.read_channel()
+        if chunk:
+            last_data = time.monotonic()
+            return chunk.replace("\r\n", "\n").replace("\r", "")
+        if time.monotonic() - last_data > read_timeout:
+            raise ReadTimeout(f"Нет данных {read_timeout} с при выполнении '{command}'")
+        time.sleep(poll_interval)
+        return ""
+
+    try:
+        while not done:
+            chunk = read_chunk()
+            if not chunk:
+                continue
+            *lines, tail = (tail + chunk).split("\n")
+            for line in lines:
+                if not echo_checked:
+                    echo_checked = True
+                    if command in line:
+                        continue
+                yield line
+            done = bool(prompt_re.search(tail))
+    finally:
+        while not done:
+            tail = (tail + read_chunk()).rsplit("\n", 1)[-1]
+            done = bool(prompt_re.search(tail))
+
+def run_commands(
+    conn,
+    identifier: str,
+    commands: List[str],
+    command_type: str,
+    raw_data: Dict[str, Any],
+    consumers: Dict[str, Callable[[Iterator[str]], Any]] = None
+):
+    """
+    Выполняет команды в готовой сессии, дописывая результаты в raw_data.
+    Для команд из consumers вывод не накапливается: строки из канала сразу идут
+    в consumer (потоковый разбор), а в raw_data кладётся его результат.
+    Уже собранные команды пропускаются — это позволяет продолжить после переподключения.
+    Команда, на которой сессия оборвалась, выполняется заново и её consumer вызывается
+    повторно — он должен начинать с чистого состояния, а не дописывать к прежнему.
+    """
+    consumers = consumers or {}
+    command_types = get_command_types()
+    for cmd in commands:
+        if cmd in raw_data:
+            continue
+        print(f"Выполняю: {cmd}")
+        try:
+            if cmd in consumers:
+                channel_lines = stream_command(conn, cmd)
+                lines = stream_raw_output(identifier, cmd, channel_lines, command_types.get(cmd, command_type))
+                try:
+                    raw_data[cmd] = consumers[cmd](lines)
+                finally:
+                    # Явно закрываем генераторы: файл raw закрывается, а остаток вывода
+                    # вычитывается до промпта до того, как в канал пойдёт следующая команда
+                    lines.close()
+                    channel_lines.close()
+                continue
+            output = conn.send_command(cmd, expect_string=r'[>#]')
+            raw_data[cmd] = output.strip()
+            save_raw_output(identifier, cmd, output, command_types.get(cmd, command_type))
+        except Exception as e:
+            if not conn.is_alive():
+                raise SessionLostError(f"{identifier}: сессия потеряна на '{cmd}': {e}") from e
+            print(f"Ошибка выполнения {cmd} на {identifier}: {e}")
+            raw_data[cmd] = f"ERROR: {e}"
+
+def collect_raw(
+    device: Dict,
+    command_type: str = "static",
+    pool=None,
+    commands: List[str] = None,
+    consumers: Dict[str, Callable[[Iterator[str]], Any]] = None
+) -> Dict[str, Any]:
+    """
+    Собирает вывод команд с устройства: {команда: вывод}.
+    commands — явный список команд (например, всё, что пора выполнить по плану);
+    по умолчанию берутся все команды типа command_type из commands.yaml.
+    consumers — потоковый режим: {команда: функция(итератор строк)}; для таких команд
+    значение в результате — то, что вернула функция, а не текст.
+    Если передан pool (SessionPool) — используется уже открытая и подготовленная сессия,
+    иначе открывается новое подключение на время сбора.
+    """
+    from netmiko import ConnectHandler, NetmikoTimeoutException, NetmikoAuthenticationException
+
+    identifier = device.get("ip")
+
+    if commands is None:
+        commands = get_static_commands() if command_type == "static" else get_dynamic_commands()
+
     raw_data = {}
 
     try:
-        with ConnectHandler(**conn_params) as conn:
-            print(f"Подключено к {identifier} ({vendor})")
-
-            # Пытаемся войти в enable без пароля (просто команда enable + Enter)
-            try:
-                conn.send_command_timing("enable", delay_factor=2)
-                print(f"Вошли в enable mode на {identifier} (без ввода пароля)")
-            except Exception as e:
-                print(f"Enable не удался на {identifier}: {e}")
-                print("Продолжаем в текущем режиме — некоторые команды могут не отработать")
-
-            # Отключаем paging (terminal length 0)
-            conn.send_command("terminal length 0", expect_string=r"[>#]")
-
-            # Проверяем текущий промпт
-            prompt = conn.find_prompt()
-            print(f"Текущий промпт: {prompt}")
-
-            for cmd in commands:
-                print(f"Выполняю: {cmd}")
+        if pool is None:
+            with ConnectHandler(**build_conn_params(device)) as conn:
+                print(f"Подключено к {identifier} ({device['vendor']})")
+                prepare_session(conn, identifier)
+                try:
+                    run_commands(conn, identifier, commands, command_type, raw_data, consumers)
+                except SessionLostError as e:
+                    print(f"{e} — возвращаем то, что успели собрать")
+        else:
+            # Одна попытка переподключения, если канал умер посреди сбора
+            for attempt in range(2):
                 try:
-                    output = conn.send_command(cmd, expect_string=r'[>#]')
-                    raw_data[cmd] = output.strip()
-                    save_raw_output(identifier, cmd, output, command_type)
-                except Exception as e:
-                    print(f"Ошибка выполнения {cmd} на {identifier}: {e}")
-                    raw_data[cmd] = f"ERROR: {e}"
+                    with pool.session(device) as conn:
+                        run_commands(conn, identifier, commands, command_type, raw_data, consumers)
+                    break
+                except SessionLostError as e:
+                    if attempt:
+                        # Вторая потеря подряд — отдаём то, что успели собрать (как и без пула)
+                        print(f"{e} — возвращаем то, что успели собрать")
+                        break
+                    print(f"{e} — переподключаемся")
 
     except NetmikoTimeoutException:
         print(f"Timeout подключения к {identifier}")
@@ -94,4 +315,4 @@ def collect_raw(device: Dict, command_type: str = "static") -> Dict[str, str]:
         print(f"Ошибка на {identifier}: {e}")
         return {}
 
-    return raw_data
\ No newline at end of file
+    return raw_data
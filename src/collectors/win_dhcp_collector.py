@@ -1,76 +1,259 @@
-import winrm
-from datetime import datetime
+import ipaddress
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 import os
 
-def collect_dhcp_raw(server_ip: str) -> tuple[str, str]:
-    """
-    Собирает сырые leases и reservations со ВСЕХ scope.
-    Возвращает (leases_text, reservations_text) — просто текст PowerShell.
-    """
-    print(f"[DHCP] Подключаемся к {server_ip}")
+from src.collectors.dhcp_cache import DhcpLeaseCache
+from src.collectors.engine import load_collector_config
+from src.collectors.ssh_collector import load_env
+from src.storage.manifest import record_latest
 
-    try:
-        session = winrm.Session(
-            f"http://{server_ip}:5985/wsman",
-            auth=(os.getenv("WINRM_USERNAME"), os.getenv("WINRM_PASSWORD")),
-            transport="ntlm",
-            server_cert_validation='ignore'
-        )
-        print("[DHCP] WinRM-сессия создана")
-
-    except Exception as e:
-        print(f"[DHCP] Не удалось подключиться: {e}")
-        return "", ""
+DEFAULT_DHCP_CONFIG = {
+    "incremental": True,            # только изменившиеся leases поверх локального кэша
+    "full_resync_interval": 21600,  # полная синхронизация не реже раза в N секунд
+    "margin": 300,                  # запас к времени прошлого сбора (часы сервера, задержки), секунд
+    "sessions": 1,                  # параллельных WinRM-сессий на сервер (или sessions у сервера в servers.yaml)
+    "split_min_leases": 5000,       # scope делятся между сессиями, только если leases на сервере не меньше
+}
 
-    # Leases
-    try:
-        leases_cmd = r"""
+# Leases и reservations одним вызовом PowerShell, сразу в JSON (без Format-List).
+# Даты — ISO, перечисления и адреса — строки: ConvertTo-Json в PowerShell 5.1 иначе
+# отдаёт \/Date(...)\/ и вложенные объекты. @() — чтобы одна запись тоже была массивом.
+# $since — инкрементальный сбор: только leases, выданные/продлённые (срок минус
+# длительность аренды scope) или истёкшие после $since, плюс present — все текущие IP
+# scope (по ним из кэша убираются удалённые). $scopeIds — только эти scope.
+DHCP_EXPORT_SCRIPT = r"""
 [Console]::OutputEncoding = [System.Text.Encoding]::UTF8
-Get-DhcpServerv4Scope | ForEach-Object {
-    Get-DhcpServerv4Lease -ScopeId $_.ScopeId -AllLeases |
-        Select-Object IPAddress, ClientId, HostName, AddressState, LeaseExpiryTime
+$since = __SINCE__
+$scopeIds = @(__SCOPES__)
+$now = Get-Date
+$scopes = @(Get-DhcpServerv4Scope | Where-Object { $scopeIds.Count -eq 0 -or $scopeIds -contains $_.ScopeId.IPAddressToString })
+$present = @{}
+$leases = foreach ($scope in $scopes) {
+    $scopeId = $scope.ScopeId.IPAddressToString
+    $all = @(Get-DhcpServerv4Lease -ScopeId $scope.ScopeId -AllLeases)
+    if ($since) {
+        $present[$scopeId] = ($all | ForEach-Object { $_.IPAddress.IPAddressToString }) -join ','
+        $renewedAfter = $since.Add($scope.LeaseDuration)
+        $all = $all | Where-Object {
+            -not $_.LeaseExpiryTime -or $_.LeaseExpiryTime -ge $renewedAfter -or
+            ($_.LeaseExpiryTime -ge $since -and $_.LeaseExpiryTime -le $now)
+        }
+    }
+    $all | ForEach-Object {
+        [pscustomobject]@{
+            IPAddress       = $_.IPAddress.IPAddressToString
+            ClientId        = $_.ClientId
+            HostName        = $_.HostName
+            AddressState    = "$($_.AddressState)"
+            LeaseExpiryTime = if ($_.LeaseExpiryTime) { $_.LeaseExpiryTime.ToString('yyyy-MM-ddTHH:mm:ss') } else { $null }
+            ScopeId         = $scopeId
+        }
+    }
+}
+$reservations = foreach ($scope in $scopes) {
+    Get-DhcpServerv4Reservation -ScopeId $scope.ScopeId | ForEach-Object {
+        [pscustomobject]@{
+            IPAddress   = $_.IPAddress.IPAddressToString
+            ClientId    = $_.ClientId
+            Name        = $_.Name
+            Description = $_.Description
+            Type        = "$($_.Type)"
+            ScopeId     = $scope.ScopeId.IPAddressToString
+        }
+    }
 }
+[pscustomobject]@{
+    scopes       = @($scopes | ForEach-Object { $_.ScopeId.IPAddressToString })
+    leases       = @($leases)
+    reservations = @($reservations)
+    present      = $present
+} | ConvertTo-Json -Depth 3 -Compress
 """
-        result = session.run_ps(leases_cmd)
-        leases_text = result.std_out.decode('utf-8', errors='replace')
-        print(f"[DHCP] Leases строк: {len(leases_text.splitlines())}")
-    except Exception as e:
-        print(f"[DHCP] Ошибка leases: {e}")
-        leases_text = ""
 
-    # Reservations
-    try:
-        reservations_cmd = r"""
+# Scope сервера и число занятых адресов — чтобы разделить большой сервер между сессиями
+SCOPE_STATS_SCRIPT = r"""
 [Console]::OutputEncoding = [System.Text.Encoding]::UTF8
-Get-DhcpServerv4Scope | ForEach-Object {
-    Get-DhcpServerv4Reservation -ScopeId $_.ScopeId |
-        Select-Object IPAddress, ClientId, Name, Description, Type
-}
+ConvertTo-Json -Compress -InputObject @(Get-DhcpServerv4ScopeStatistics | ForEach-Object {
+    [pscustomobject]@{ ScopeId = $_.ScopeId.IPAddressToString; InUse = [int]$_.InUse }
+})
 """
-        result = session.run_ps(reservations_cmd)
-        reservations_text = result.std_out.decode('utf-8', errors='replace')
-        print(f"[DHCP] Reservations строк: {len(reservations_text.splitlines())}")
+
+
+def load_dhcp_config(collector_config: dict = None) -> dict:
+    """Секция dhcp из config/collector.yaml поверх DEFAULT_DHCP_CONFIG."""
+    config = dict(DEFAULT_DHCP_CONFIG)
+    section = (collector_config if collector_config is not None else load_collector_config()).get("dhcp") or {}
+    config.update({k: v for k, v in section.items() if v is not None})
+    return config
+
+
+def build_export_script(since: float = None, scope_ids: List[str] = None) -> str:
+    """DHCP_EXPORT_SCRIPT с подставленными $since (unix time, UTC) и списком scope."""
+    if since is None:
+        since_expr = "$null"
+    else:
+        iso = datetime.fromtimestamp(since, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        since_expr = f"[DateTimeOffset]::Parse('{iso}').LocalDateTime"
+    # ScopeId подставляются в текст скрипта — только настоящие IPv4-адреса
+    scopes = ",".join(f"'{ipaddress.IPv4Address(scope_id)}'" for scope_id in scope_ids or [])
+    return DHCP_EXPORT_SCRIPT.replace("__SINCE__", since_expr).replace("__SCOPES__", scopes)
+
+
+def open_winrm_session(server_ip: str):
+    import winrm  # тяжёлый (requests, ntlm, cryptography) — только когда DHCP-серверы есть
+
+    load_env()
+    return winrm.Session(
+        f"http://{server_ip}:5985/wsman",
+        auth=(os.getenv("WINRM_USERNAME"), os.getenv("WINRM_PASSWORD")),
+        transport="ntlm",
+        server_cert_validation='ignore'
+    )
+
+
+def run_ps_json(server_ip: str, script: str) -> Optional[Any]:
+    """Скрипт в своей WinRM-сессии; разобранный JSON из stdout или None при ошибке."""
+    try:
+        result = open_winrm_session(server_ip).run_ps(script)
     except Exception as e:
-        print(f"[DHCP] Ошибка reservations: {e}")
-        reservations_text = ""
+        print(f"[DHCP] {server_ip}: ошибка WinRM: {e}")
+        return None
+
+    if result.status_code != 0:
+        print(f"[DHCP] {server_ip}: PowerShell завершился с кодом {result.status_code}: "
+              f"{result.std_err.decode('utf-8', errors='replace')[:500]}")
+        return None
+
+    text = result.std_out.decode('utf-8', errors='replace').lstrip("\ufeff")
+    try:
+        return json.loads(text) if text.strip() else None
+    except ValueError as e:
+        print(f"[DHCP] {server_ip}: некорректный JSON ({len(text)} байт): {e}")
+        return None
 
-    return leases_text, reservations_text
 
+def _records(value) -> list:
+    # ConvertTo-Json: пустой список — null, одна запись — объект вместо массива
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
 
-def save_dhcp_raw(leases_text: str, reservations_text: str, server_ip: str):
+
+def partition_scopes(scopes: List[Tuple[str, int]], sessions: int) -> List[List[str]]:
+    """Scope по сессиям: самые большие — первыми, каждый в наименее загруженную группу."""
+    groups: List[Tuple[int, List[str]]] = [(0, []) for _ in range(max(1, min(sessions, len(scopes))))]
+    for scope_id, in_use in sorted(scopes, key=lambda s: -s[1]):
+        load, members = min(groups, key=lambda g: g[0])
+        groups.remove((load, members))
+        groups.append((load + in_use, members + [scope_id]))
+    return [members for _, members in groups if members]
+
+
+def scope_groups(server: Dict, config: dict) -> List[Optional[List[str]]]:
+    """
+    Как делить сервер между сессиями: [None] — все scope в одной сессии;
+    иначе списки scope (по числу занятых адресов) для параллельных сессий.
+    """
+    sessions = int(server.get("sessions", config["sessions"]))
+    if sessions <= 1:
+        return [None]
+    stats = run_ps_json(server["ip"], SCOPE_STATS_SCRIPT)
+    if stats is None:
+        return [None]
+    scopes = [(item["ScopeId"], int(item.get("InUse") or 0)) for item in _records(stats)]
+    if sum(in_use for _, in_use in scopes) < int(config["split_min_leases"]) or len(scopes) < 2:
+        return [None]
+    return partition_scopes(scopes, sessions)
+
+
+def fetch_dhcp(server: Dict, since: float = None, config: dict = None) -> Optional[Dict[str, Any]]:
+    """
+    Ответ сервера (полный или с $since — инкрементальный), собранный из групп scope,
+    выполняемых параллельно в отдельных WinRM-сессиях. None — если хоть одна группа не удалась.
+    """
+    config = config or load_dhcp_config()
+    server_ip = server["ip"]
+    groups = scope_groups(server, config)
+
+    if len(groups) == 1:
+        results = [run_ps_json(server_ip, build_export_script(since, groups[0]))]
+    else:
+        print(f"[DHCP] {server_ip}: {sum(map(len, groups))} scope в {len(groups)} параллельных сессиях")
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix=f"dhcp-{server_ip}") as executor:
+            results = list(executor.map(lambda group: run_ps_json(server_ip, build_export_script(since, group)), groups))
+
+    if any(result is None for result in results):
+        return None
+
+    merged = {"scopes": [], "leases": [], "reservations": [], "present": {}}
+    for result in results:
+        merged["scopes"] += _records(result.get("scopes"))
+        merged["leases"] += _records(result.get("leases"))
+        merged["reservations"] += _records(result.get("reservations"))
+        merged["present"].update(result.get("present") or {})
+    return merged
+
+
+def collect_dhcp_json(server: Dict, config: dict = None) -> str:
+    """
+    Leases и reservations со ВСЕХ scope сервера — JSON {"leases": [...], "reservations": [...]}
+    (вход DhcpJsonParser) или "" при ошибке. В инкрементальном режиме с сервера
+    приходят только изменения, а документ собирается из кэша data/state/dhcp/<ip>.json;
+    полная синхронизация — при пустом кэше и раз в full_resync_interval.
+    """
+    config = config or load_dhcp_config()
+    server_ip = server["ip"]
+    print(f"[DHCP] Подключаемся к {server_ip}")
+
+    if not config["incremental"]:
+        result = fetch_dhcp(server, config=config)
+        if result is None:
+            return ""
+        print(f"[DHCP] {server_ip}: leases {len(result['leases'])}, reservations {len(result['reservations'])}")
+        return json.dumps({"leases": result["leases"], "reservations": result["reservations"]}, ensure_ascii=False)
+
+    cache = DhcpLeaseCache.load(server_ip)
+    started = time.time()
+    full = cache.needs_full_sync(float(config["full_resync_interval"]), started)
+    since = None if full else cache.fetched_at - float(config["margin"])
+
+    result = fetch_dhcp(server, since=since, config=config)
+    if result is None:
+        return ""
+
+    if full:
+        cache.replace(result["scopes"], result["leases"], result["reservations"], started)
+        print(f"[DHCP] {server_ip}: полная синхронизация — leases {cache.lease_count()}")
+    else:
+        # Новые scope в кэше пусты — их leases забираем целиком
+        new_scopes = [scope for scope in result["scopes"] if scope not in cache.leases]
+        if new_scopes:
+            extra = run_ps_json(server_ip, build_export_script(None, new_scopes))
+            if extra is None:
+                return ""
+            result["leases"] += _records(extra.get("leases"))
+            print(f"[DHCP] {server_ip}: новые scope {', '.join(new_scopes)} — забраны целиком")
+        changed = cache.apply(result["scopes"], result["leases"], result["present"], result["reservations"], started)
+        print(f"[DHCP] {server_ip}: изменилось leases {changed}, всего в кэше {cache.lease_count()}")
+    cache.save()
+    return json.dumps(cache.document(), ensure_ascii=False)
+
+
+def save_dhcp_raw(json_text: str, server_ip: str) -> Path:
     timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
     output_dir = Path("data/raw/dhcp")
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    leases_path = output_dir / f"{server_ip}_{timestamp}_leases.txt"
-    reservations_path = output_dir / f"{server_ip}_{timestamp}_reservations.txt"
-
-    with open(leases_path, "w", encoding="utf-8") as f:
-        f.write(leases_text)
-
-    with open(reservations_path, "w", encoding="utf-8") as f:
-        f.write(reservations_text)
+    path = output_dir / f"{server_ip}_{timestamp}_dhcp.json"
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json_text, encoding="utf-8")
+    tmp_path.replace(path)
+    record_latest("raw", path)
 
-    print(f"[✓] Сохранено leases: {leases_path}")
-    print(f"[✓] Сохранено reservations: {reservations_path}")
\ No newline at end of file
+    print(f"[✓] Сохранено DHCP: {path}")
+    return path
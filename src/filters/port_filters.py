@@ -1,46 +1,116 @@
+import re
+import threading
+import time
 from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
 import yaml
 
+PORT_FILTERS_FILE = Path("config/port_filters.yaml")
+
+# Как часто (не чаще) проверяем mtime файла фильтров
+RELOAD_CHECK_INTERVAL = 1.0
+
+EMPTY_FILTERS = {"global": {"ignore_patterns": [], "ignore_ports": []}, "devices": {}}
+
 def load_port_filters() -> dict:
-    path = Path("config/port_filters.yaml")
+    path = PORT_FILTERS_FILE
     if not path.exists():
         print("port_filters.yaml не найден — фильтр отключён")
-        return {"global": {"ignore_patterns": [], "ignore_ports": []}, "devices": {}}
+        return EMPTY_FILTERS
 
     with open(path, "r") as f:
         config = yaml.safe_load(f)
 
     return config.get("filters", {})
 
+
+class PortFilter:
+    """
+    Скомпилированный фильтр портов.
+    Паттерны (подстроки без учёта регистра) собраны в одно регулярное выражение,
+    списки игнорируемых портов заранее разложены по устройствам во frozenset
+    (глобальные + свои + fallback "*"). Результат по каждому порту кешируется —
+    портов на устройстве десятки, а MAC-записей на них тысячи.
+    """
+
+    def __init__(self, filters: dict):
+        filters = filters or {}
+        global_filters = filters.get("global") or {}
+        devices = filters.get("devices") or {}
+
+        patterns = [str(p).lower() for p in global_filters.get("ignore_patterns") or [] if p]
+        self.matcher = re.compile("|".join(re.escape(p) for p in patterns), re.IGNORECASE) if patterns else None
+
+        global_ports = {str(p) for p in global_filters.get("ignore_ports") or []}
+        fallback_ports = {str(p) for p in ((devices.get("*") or {}).get("ignore_ports") or [])}
+
+        self.default_ignore: FrozenSet[str] = frozenset(global_ports | fallback_ports)
+        self.device_ignore: Dict[str, FrozenSet[str]] = {
+            str(ip): frozenset(self.default_ignore | {str(p) for p in ((cfg or {}).get("ignore_ports") or [])})
+            for ip, cfg in devices.items() if ip != "*"
+        }
+
+        self._cache: Dict[str, Dict[str, bool]] = {}
+
+    @classmethod
+    def from_file(cls) -> "PortFilter":
+        return cls(load_port_filters())
+
+    def ignored_for(self, device_ip: str) -> FrozenSet[str]:
+        return self.device_ignore.get(device_ip, self.default_ignore)
+
+    def is_ignored(self, device_ip: str, port: str) -> bool:
+        if not port:
+            return False
+
+        device_cache = self._cache.get(device_ip)
+        if device_cache is None:
+            device_cache = self._cache.setdefault(device_ip, {})
+
+        result = device_cache.get(port)
+        if result is None:
+            result = bool(self.matcher and self.matcher.search(port)) or port in self.ignored_for(device_ip)
+            device_cache[port] = result
+        return result
+
+    def filter_entries(self, device_ip: str, entries: Iterable[Dict], port_key: str = "port") -> List[Dict]:
+        """Пакетная фильтрация: возвращает записи, порт которых не игнорируется."""
+        is_ignored = self.is_ignored
+        return [entry for entry in entries if not is_ignored(device_ip, entry.get(port_key))]
+
+
+_port_filter: Optional[PortFilter] = None
+_loaded_mtime: Optional[float] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def _file_mtime() -> Optional[float]:
+    try:
+        return PORT_FILTERS_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+def get_port_filter() -> PortFilter:
+    """
+    Общий PortFilter процесса. YAML читается один раз и перечитывается,
+    только если у файла сменился mtime (проверка не чаще раза в секунду).
+    """
+    global _port_filter, _loaded_mtime, _checked_at
+
+    now = time.monotonic()
+    if _port_filter is not None and now - _checked_at < RELOAD_CHECK_INTERVAL:
+        return _port_filter
+
+    with _lock:
+        mtime = _file_mtime()
+        if _port_filter is None or mtime != _loaded_mtime:
+            if _port_filter is not None:
+                print("port_filters.yaml изменился — перечитываем фильтр")
+            _port_filter = PortFilter.from_file()
+            _loaded_mtime = mtime
+        _checked_at = now
+        return _port_filter
+
 def is_ignored_port(device_ip: str, port: str) -> bool:
-    if not port:
-        return False
-
-    filters = load_port_filters()
-
-    # Глобальные паттерны (tg, te, xe...)
-    global_patterns = filters.get("global", {}).get("ignore_patterns", [])
-    for pattern in global_patterns:
-        if pattern.lower() in port.lower():
-            return True
-
-    # Глобальные конкретные порты
-    global_ignore = filters.get("global", {}).get("ignore_ports", [])
-    if port in global_ignore:
-        return True
-
-    # Конкретное устройство (по IP)
-    device_filters = filters.get("devices", {}).get(device_ip, {})
-    if device_filters:
-        ignore_ports = device_filters.get("ignore_ports", [])
-        if port in ignore_ports:
-            return True
-
-    # Fallback "*"
-    fallback = filters.get("devices", {}).get("*", {})
-    if fallback:
-        ignore_ports = fallback.get("ignore_ports", [])
-        if port in ignore_ports:
-            return True
-
-    return False
\ No newline at end of file
+    return get_port_filter().is_ignored(device_ip, port)
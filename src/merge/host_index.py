@@ -0,0 +1,119 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.models.entry_store import iter_mac_rows, iter_arp_rows
+
+
+class HostRecord:
+    """Все наблюдения одного MAC: где виден, какие IP, какие DHCP-записи."""
+
+    __slots__ = ("mac", "sightings", "arp", "leases")
+
+    def __init__(self, mac: str):
+        self.mac = mac
+        self.sightings: List[Dict[str, Any]] = []   # {device_ip, device_hostname, port, vlan}
+        self.arp: List[Dict[str, Any]] = []         # {ip, interface, device_ip}
+        self.leases: List[Dict[str, Any]] = []      # нормализованные DHCP lease/reservation
+
+    @property
+    def ips(self) -> List[str]:
+        """IP хоста без повторов: сначала по ARP, затем по DHCP."""
+        seen = dict.fromkeys(a["ip"] for a in self.arp)
+        seen.update(dict.fromkeys(lease["ip"] for lease in self.leases if lease.get("ip")))
+        return list(seen)
+
+    @property
+    def dhcp_servers(self) -> List[str]:
+        return list(dict.fromkeys(lease["dhcp_server"] for lease in self.leases if lease.get("dhcp_server")))
+
+
+class HostIndex:
+    """
+    Индекс хостов по MAC с вторичными индексами.
+    Строится одним линейным проходом по MAC-таблицам, ARP и DHCP; ничего не
+    перезаписывает — каждый MAC хранит все наблюдения. Обратные запросы
+    (чей IP, кто за портом, что на устройстве) и поиск конфликтов IP — O(1).
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, HostRecord] = {}
+        self.by_ip: Dict[str, Dict[str, List[str]]] = {}           # ip → {mac: [источники]}
+        self.by_device: Dict[str, Dict[str, None]] = {}            # device_ip → {mac} (упорядоченное множество)
+        self.by_port: Dict[Tuple[str, str], Dict[str, None]] = {}  # (device_ip, port) → {mac}
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def __contains__(self, mac: str) -> bool:
+        return mac in self.hosts
+
+    def _record(self, mac: str) -> HostRecord:
+        record = self.hosts.get(mac)
+        if record is None:
+            record = self.hosts[mac] = HostRecord(mac)
+        return record
+
+    def _index_ip(self, ip: str, mac: str, source: str):
+        self.by_ip.setdefault(ip, {}).setdefault(mac, []).append(source)
+
+    def add_sighting(self, mac: str, vlan: str, port: str, device_ip: str, device_hostname: str):
+        self._record(mac).sightings.append(
+            {"device_ip": device_ip, "device_hostname": device_hostname, "port": port, "vlan": vlan}
+        )
+        self.by_device.setdefault(device_ip, {})[mac] = None
+        self.by_port.setdefault((device_ip, port), {})[mac] = None
+
+    def add_arp(self, ip: str, mac: str, interface: str = None, device_ip: str = None):
+        self._record(mac).arp.append({"ip": ip, "interface": interface, "device_ip": device_ip})
+        self._index_ip(ip, mac, "arp")
+
+    def add_lease(self, lease: Dict[str, Any]):
+        mac = lease.get("mac")
+        if not mac:
+            return
+        self._record(mac).leases.append(lease)
+        if lease.get("ip"):
+            self._index_ip(lease["ip"], mac, lease.get("source") or "dhcp")
+
+    @classmethod
+    def build(cls, mac_entries: Iterable, arp_entries: Iterable, dhcp_leases: Iterable[Dict] = ()) -> "HostIndex":
+        index = cls()
+        index.extend(mac_entries, arp_entries, dhcp_leases)
+        return index
+
+    def extend(self, mac_entries: Iterable = (), arp_entries: Iterable = (), dhcp_leases: Iterable[Dict] = ()):
+        """MAC-записи и ARP — списки словарей или колоночные хранилища."""
+        for mac, vlan, _type, port, device_ip, device_hostname in iter_mac_rows(mac_entries):
+            self.add_sighting(mac, vlan, port, device_ip, device_hostname)
+        for ip, mac, _age, _type, interface, device_ip, _device_hostname in iter_arp_rows(arp_entries):
+            self.add_arp(ip, mac, interface, device_ip)
+        for lease in dhcp_leases or ():
+            self.add_lease(lease)
+
+    # Обратные запросы
+
+    def get(self, mac: str) -> Optional[HostRecord]:
+        return self.hosts.get(mac)
+
+    def macs_by_ip(self, ip: str) -> List[str]:
+        return list(self.by_ip.get(ip, ()))
+
+    def macs_on_device(self, device_ip: str) -> List[str]:
+        return list(self.by_device.get(device_ip, ()))
+
+    def macs_behind_port(self, device_ip: str, port: str) -> List[str]:
+        return list(self.by_port.get((device_ip, port), ()))
+
+    def ip_conflicts(self, sources: Tuple[str, ...] = ("arp",)) -> Dict[str, List[str]]:
+        """
+        IP, которые одновременно заявлены несколькими MAC.
+        По умолчанию учитывается только ARP — DHCP-аренды могут законно
+        переходить от одного MAC к другому.
+        """
+        conflicts = {}
+        for ip, macs in self.by_ip.items():
+            if len(macs) < 2:
+                continue
+            owners = [mac for mac, mac_sources in macs.items() if any(s in sources for s in mac_sources)]
+            if len(owners) > 1:
+                conflicts[ip] = owners
+        return conflicts
@@ -1,11 +1,13 @@
-from typing import List, Dict, Optional
-from pydantic import ValidationError
+from typing import Iterable, List, Dict, Optional
 from src.models.host import Host
+from src.models.validation import validate_batch
+from src.merge.host_index import HostIndex
 
 def merge_hosts(
-    mac_entries: List[Dict],
-    arp_entries: List[Dict],
-    dhcp_leases: List[Dict] = None
+    mac_entries: Iterable,
+    arp_entries: Iterable,
+    dhcp_leases: List[Dict] = None,
+    index: Optional[HostIndex] = None
 ) -> List[Dict]:
     """
     Merge по MAC:
@@ -14,25 +16,36 @@ def merge_hosts(
     - status — строго по ARP (active если mac-ip пара есть, иначе unknown)
     - type — lease/reserved по DHCP, static если ARP+MAC без DHCP, unknown если только MAC
     - DHCP обогащает description/hostname/dhcp_server/lease_end
+    mac_entries/arp_entries — списки словарей или колоночные хранилища (MacEntryStore/ArpEntryStore)
+
+    Все наблюдения сначала собираются в HostIndex (ничего не теряется): у хоста
+    остаются все места, где он виден (sightings), все IP (ips) и все DHCP-серверы
+    (dhcp_servers). Основные поля — как раньше, по последнему наблюдению.
+    Если передан index — он заполняется и остаётся вызывающему для обратных запросов.
+    index может быть уже заполнен по мере сбора (run_dynamic) — тогда записи
+    передаются пустыми, и merge только собирает хосты из индекса.
     """
     if dhcp_leases is None:
         dhcp_leases = []
 
+    if index is None:
+        index = HostIndex()
+    index.extend(mac_entries, arp_entries, dhcp_leases)
+
     hosts_dict = {}
 
-    # 1. MAC-table — основа
-    for entry in mac_entries:
-        mac = entry["mac"]
-        port = entry["port"]
-        device_ip = entry["device_ip"]
-        device_hostname = entry["device_hostname"]
-
-        hosts_dict[mac] = {
-            "mac": mac,
-            "vlan": entry.get("vlan"),
-            "port": entry.get("port"),
-            "device_ip": device_ip,
-            "device_hostname": device_hostname,
+    for record in index.hosts.values():
+        # 1. MAC-table — основа (хосты без MAC-записей в результат не попадают)
+        if not record.sightings:
+            continue
+
+        last = record.sightings[-1]
+        host = hosts_dict[record.mac] = {
+            "mac": record.mac,
+            "vlan": last["vlan"],
+            "port": last["port"],
+            "device_ip": last["device_ip"],
+            "device_hostname": last["device_hostname"],
             "ip": "unknown",
             "status": "unknown",
             "type": "unknown",
@@ -40,51 +53,45 @@ def merge_hosts(
             "hostname": None,
             "dhcp_server": None,
             "lease_end": None,
-            "source": ["mac_table"]
+            "source": ["mac_table"],
+            "ips": record.ips,
+            "sightings": record.sightings,
+            "dhcp_servers": record.dhcp_servers,
         }
 
-    # 2. ARP — главный источник статуса и IP
-    for entry in arp_entries:
-        mac = entry["mac"]
-        ip = entry["ip"]
-        if mac in hosts_dict:
-            hosts_dict[mac]["ip"] = ip
-            hosts_dict[mac]["status"] = "active"  # ← только здесь ставим active
-            hosts_dict[mac]["source"].append("arp")
-
-    # 3. DHCP — обогащение (НЕ влияет на status!)
-    for lease in dhcp_leases:
-        mac = lease.get("mac")
-        if not mac or mac not in hosts_dict:
-            continue
-
-        host = hosts_dict[mac]
+        # 2. ARP — главный источник статуса и IP
+        for arp in record.arp:
+            host["ip"] = arp["ip"]
+            host["status"] = "active"  # ← только здесь ставим active
+            host["source"].append("arp")
 
-        # IP из DHCP (fallback, если ARP не дал)
-        if host["ip"] == "unknown":
-            host["ip"] = lease.get("ip") or host["ip"]
+        # 3. DHCP — обогащение (НЕ влияет на status!)
+        for lease in record.leases:
+            # IP из DHCP (fallback, если ARP не дал)
+            if host["ip"] == "unknown":
+                host["ip"] = lease.get("ip") or host["ip"]
 
-        # DHCP-сервер
-        host["dhcp_server"] = lease.get("dhcp_server")
+            # DHCP-сервер
+            host["dhcp_server"] = lease.get("dhcp_server")
 
-        # Type
-        source = lease.get("source")
-        if source == "lease":
-            host["type"] = "lease"
-        elif source == "reservation":
-            host["type"] = "reserved"
+            # Type
+            source = lease.get("source")
+            if source == "lease":
+                host["type"] = "lease"
+            elif source == "reservation":
+                host["type"] = "reserved"
 
-        # Имя и описание
-        host["hostname"] = lease.get("hostname") or lease.get("name") or host["hostname"]
-        host["description"] = lease.get("description") or host["description"]
+            # Имя и описание
+            host["hostname"] = lease.get("hostname") or lease.get("name") or host["hostname"]
+            host["description"] = lease.get("description") or host["description"]
 
-        # Lease end только для lease
-        if source == "lease":
-            host["lease_end"] = lease.get("lease_end")
-        else:
-            host["lease_end"] = None
+            # Lease end только для lease
+            if source == "lease":
+                host["lease_end"] = lease.get("lease_end")
+            else:
+                host["lease_end"] = None
 
-        host["source"].append(source)
+            host["source"].append(source)
 
     # Fallback для type
     for data in hosts_dict.values():
@@ -95,14 +102,8 @@ def merge_hosts(
         if data["ip"] != "unknown" and data["status"] == "unknown":
             data["status"] = "active"
 
-    # Валидация
-    valid_hosts = []
-    for data in hosts_dict.values():
-        try:
-            host = Host(**data)
-            valid_hosts.append(host.model_dump())
-        except ValidationError as e:
-            print(f"Ошибка валидации хоста {data.get('mac')}: {e}")
+    # Валидация — одной пачкой (в режиме trusted без перепроверки)
+    valid_hosts = validate_batch(Host, list(hosts_dict.values()), "hosts", label="хоста", key="mac")
 
     print(f"Сформировано валидных хостов: {len(valid_hosts)}")
-    return valid_hosts
\ No newline at end of file
+    return valid_hosts
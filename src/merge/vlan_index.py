@@ -0,0 +1,64 @@
+from typing import Dict, Iterable, List, Tuple
+
+from src.models.vlan_set import VlanSet
+
+PortKey = Tuple[str, str]  # (device_ip, порт)
+
+# Trunk с таким числом разрешённых VLAN (1-4094 и т.п.) не раскладывается по всем
+# VLAN индекса — проверяется по своей маске при запросе
+WIDE_TRUNK = 1024
+
+
+class VlanPortIndex:
+    """
+    Обратный индекс VLAN → (устройство, порт), строится за статический прогон.
+    members — порты VLAN по show vlan; trunks — trunk-порты, где VLAN разрешён
+    (allowed/untagged из running-config, маски VlanSet). «Какие trunk несут VLAN 610»
+    — словарь по номеру VLAN, без разбора строк по всем устройствам.
+    """
+
+    def __init__(self):
+        self.members: Dict[int, Dict[PortKey, None]] = {}   # vlan → {порт} (упорядоченное множество)
+        self.trunks: Dict[int, Dict[PortKey, None]] = {}    # vlan → {trunk-порт}
+        self.wide: Dict[PortKey, VlanSet] = {}              # trunk-порты с WIDE_TRUNK и более VLAN
+        self.port_vlans: Dict[PortKey, VlanSet] = {}        # trunk-порт → разрешённые VLAN
+
+    def add_device(self, device_ip: str, vlans: Iterable[Dict], interfaces: Iterable[Dict] = ()):
+        """VLAN устройства (с ports) и его интерфейсы (allowed_vlans/untagged_vlans — VlanSet или строка)."""
+        for vlan in vlans:
+            members = self.members.setdefault(int(vlan["vlan_id"]), {})
+            for port in vlan.get("ports", []):
+                members[(device_ip, port)] = None
+
+        for intf in interfaces:
+            if intf.get("mode") != "trunk":
+                continue
+            key = (device_ip, intf["name"])
+            try:
+                allowed = VlanSet.coerce(intf.get("allowed_vlans")) | VlanSet.coerce(intf.get("untagged_vlans"))
+            except ValueError as e:
+                print(f"{device_ip} {intf['name']}: {e} — порт не попадёт в индекс VLAN")
+                continue
+            self.port_vlans[key] = allowed
+            if len(allowed) >= WIDE_TRUNK:
+                self.wide[key] = allowed
+                continue
+            for vlan_id in allowed:
+                self.trunks.setdefault(vlan_id, {})[key] = None
+
+    def trunks_carrying(self, vlan_id: int) -> List[PortKey]:
+        carrying = list(self.trunks.get(vlan_id, ()))
+        carrying += [key for key, allowed in self.wide.items() if vlan_id in allowed]
+        return carrying
+
+    def ports(self, vlan_id: int) -> List[PortKey]:
+        """Все порты VLAN: члены по show vlan и trunk, где он разрешён."""
+        ports = dict.fromkeys(self.members.get(vlan_id, ()))
+        ports.update(dict.fromkeys(self.trunks_carrying(vlan_id)))
+        return list(ports)
+
+    def devices(self, vlan_id: int) -> List[str]:
+        return list(dict.fromkeys(device_ip for device_ip, _ in self.ports(vlan_id)))
+
+    def vlans_on_trunk(self, device_ip: str, port: str) -> VlanSet:
+        return self.port_vlans.get((device_ip, port), VlanSet())
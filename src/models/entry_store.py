@@ -0,0 +1,339 @@
+import socket
+import sys
+from socket import inet_aton, inet_ntoa
+from array import array
+from itertools import repeat
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.models.vlan_set import VlanSet
+
+# Значение-заглушка в числовой колонке: настоящее значение лежит в словаре "сырых" значений
+VLAN_RAW = 0xFFFF
+IP_RAW = 0xFFFFFFFF
+
+
+class InternTable:
+    """Строки (и None) ↔ компактные целые id. Повторяющиеся порты/типы/устройства хранятся один раз."""
+
+    __slots__ = ("values", "index")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.index: Dict[Any, int] = {}
+
+    def id(self, value) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self.index[value] = idx
+            self.values.append(value)
+        return idx
+
+    def ids(self, values: Sequence) -> List[int]:
+        index = self.index
+        for value in set(values).difference(index):
+            self.id(value)
+        return list(map(index.__getitem__, values))
+
+    def remap(self, other: "InternTable") -> List[int]:
+        """id другой таблицы → id этой (для слияния хранилищ)."""
+        return [self.id(v) for v in other.values]
+
+
+def _mac_to_int(mac: str) -> int:
+    return int(mac, 16)
+
+def _int_to_mac(value: int) -> str:
+    return f"{value:012x}"
+
+def _ip_to_int(ip: str) -> Optional[int]:
+    try:
+        return int.from_bytes(socket.inet_aton(ip), "big") if ip.count(".") == 3 else None
+    except (OSError, AttributeError):
+        return None
+
+def _int_to_ip(value: int) -> str:
+    return socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+class MacEntryStore:
+    """
+    Колоночное хранилище MAC-записей.
+    MAC — 48-битное целое (array 'Q'), VLAN — uint16 ('H'), порт/тип/устройство —
+    id в таблицах интернирования ('I'/'H'). Записи не существуют как словари:
+    парсер дописывает столбцы, нормализатор и merge читают кортежи через rows(),
+    а словари собираются только на границе — при сохранении в JSON (to_dicts()).
+    """
+
+    FIELDS = ("vlan", "mac", "type", "port")
+
+    def __init__(self):
+        self.macs = array("Q")
+        self.vlans = array("H")
+        self.types = array("H")
+        self.ports = array("I")
+        self.devices = array("I")
+
+        self.type_table = InternTable()
+        self.port_table = InternTable()
+        self.device_table = InternTable()  # (device_ip, device_hostname)
+        self.vlan_raw: Dict[int, str] = {}  # нечисловые VLAN: {номер строки: значение}
+
+    def __len__(self) -> int:
+        return len(self.macs)
+
+    def _vlan_ids(self, vlans: Sequence[str], offset: int) -> array:
+        try:
+            numbers = list(map(int, vlans))
+            # Быстрый путь: все VLAN — обычные числа (без ведущих нулей и пробелов)
+            if max(numbers) < VLAN_RAW and min(numbers) >= 0 and list(map(str, numbers)) == list(vlans):
+                return array("H", numbers)
+        except (TypeError, ValueError):
+            pass
+
+        out = array("H")
+        for i, vlan in enumerate(vlans):
+            if vlan.isdigit() and int(vlan) < VLAN_RAW and str(int(vlan)) == vlan:
+                out.append(int(vlan))
+            else:
+                out.append(VLAN_RAW)
+                self.vlan_raw[offset + i] = vlan
+        return out
+
+    def extend_rows(self, rows: Sequence[Tuple], device_ip: str = None, device_hostname: str = None):
+        """Дописывает строки (vlan, mac, type, port) одного устройства."""
+        if rows:
+            self.extend_columns(list(zip(*rows)), device_ip, device_hostname)
+
+    def extend_columns(self, columns: Sequence[Sequence], device_ip: str = None, device_hostname: str = None):
+        """Дописывает столбцы (vlans, macs, types, ports) одной длины — основной путь парсеров."""
+        vlans, macs, types, ports = columns
+        if not macs:
+            return
+        offset = len(self.macs)
+        self.macs.extend(map(int, macs, repeat(16)))
+        self.vlans.extend(self._vlan_ids(vlans, offset))
+        self.types.extend(self.type_table.ids(types))
+        self.ports.extend(self.port_table.ids(ports))
+        self.devices.extend(repeat(self.device_table.id((device_ip, device_hostname)), len(macs)))
+
+    def append(self, vlan: str, mac: str, type_: str, port: str, device_ip: str = None, device_hostname: str = None):
+        self.extend_rows([(vlan, mac, type_, port)], device_ip, device_hostname)
+
+    def extend_dicts(self, entries: Iterable[Dict[str, Any]]):
+        """Для парсеров, которые пока отдают список словарей."""
+        by_device: Dict[Tuple, List[Tuple]] = {}
+        for e in entries:
+            by_device.setdefault((e.get("device_ip"), e.get("device_hostname")), []).append(
+                (e["vlan"], e["mac"], e["type"], e["port"])
+            )
+        for (device_ip, device_hostname), rows in by_device.items():
+            self.extend_rows(rows, device_ip, device_hostname)
+
+    def extend(self, other: "MacEntryStore"):
+        """Слияние хранилищ устройств в общее — без распаковки записей."""
+        if not isinstance(other, MacEntryStore):
+            self.extend_dicts(other)
+            return
+        offset = len(self.macs)
+        type_map = self.type_table.remap(other.type_table)
+        port_map = self.port_table.remap(other.port_table)
+        device_map = self.device_table.remap(other.device_table)
+
+        self.macs.extend(other.macs)
+        self.vlans.extend(other.vlans)
+        self.types.extend(type_map[i] for i in other.types)
+        self.ports.extend(port_map[i] for i in other.ports)
+        self.devices.extend(device_map[i] for i in other.devices)
+        for row, vlan in other.vlan_raw.items():
+            self.vlan_raw[offset + row] = vlan
+
+    def set_device(self, device_ip: str, device_hostname: str):
+        """Проставляет устройство всем записям (аналог цикла по словарям в process_device)."""
+        device_id = self.device_table.id((device_ip, device_hostname))
+        self.devices = array("I", repeat(device_id, len(self.macs)))
+
+    def rows(self) -> Iterator[Tuple[str, str, str, str, Optional[str], Optional[str]]]:
+        """Кортежи (mac, vlan, type, port, device_ip, device_hostname) — строки, как в словарях."""
+        types = self.type_table.values
+        ports = self.port_table.values
+        devices = self.device_table.values
+        vlan_raw = self.vlan_raw
+        for i, (mac, vlan, type_id, port_id, device_id) in enumerate(zip(self.macs, self.vlans, self.types, self.ports, self.devices)):
+            device_ip, device_hostname = devices[device_id]
+            yield (
+                _int_to_mac(mac),
+                vlan_raw[i] if vlan == VLAN_RAW else str(vlan),
+                types[type_id],
+                ports[port_id],
+                device_ip,
+                device_hostname,
+            )
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Граница хранилища: словари в формате MacTableNormalizer, по одному (для потоковой записи)."""
+        for mac, vlan, type_, port, device_ip, device_hostname in self.rows():
+            yield {"vlan": vlan, "mac": mac, "type": type_, "port": port, "device_ip": device_ip, "device_hostname": device_hostname}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self.iter_dicts())
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.macs, self.vlans, self.types, self.ports, self.devices))
+
+
+class ArpEntryStore:
+    """
+    Колоночное хранилище ARP-записей: IPv4 — uint32, MAC — 48-битное целое,
+    возраст/тип/интерфейс/устройство — id в таблицах интернирования.
+    """
+
+    FIELDS = ("ip", "mac", "age", "type", "interface")
+
+    def __init__(self):
+        self.ips = array("I")
+        self.macs = array("Q")
+        self.ages = array("I")
+        self.types = array("H")
+        self.interfaces = array("I")
+        self.devices = array("I")
+
+        self.age_table = InternTable()
+        self.type_table = InternTable()
+        self.interface_table = InternTable()
+        self.device_table = InternTable()  # (device_ip, device_hostname)
+        self.ip_raw: Dict[int, str] = {}  # не IPv4: {номер строки: значение}
+
+    def __len__(self) -> int:
+        return len(self.ips)
+
+    def _ip_ids(self, ips: Sequence[str], offset: int) -> array:
+        try:
+            packed = list(map(inet_aton, ips))
+            # Быстрый путь: все адреса — канонический IPv4 (inet_aton понимает и "10.1", и "010.0.0.1")
+            if list(map(inet_ntoa, packed)) == list(ips):
+                numbers = array("I")
+                numbers.frombytes(b"".join(packed))
+                if sys.byteorder == "little":
+                    numbers.byteswap()
+                if IP_RAW not in numbers:
+                    return numbers
+        except (OSError, TypeError):
+            pass
+
+        out = array("I")
+        for i, ip in enumerate(ips):
+            value = _ip_to_int(ip)
+            if value is None or value == IP_RAW or _int_to_ip(value) != ip:
+                out.append(IP_RAW)
+                self.ip_raw[offset + i] = ip
+            else:
+                out.append(value)
+        return out
+
+    def extend_rows(self, rows: Sequence[Tuple], device_ip: str = None, device_hostname: str = None):
+        """Дописывает строки (ip, mac, age, type, interface) одного устройства."""
+        if rows:
+            self.extend_columns(list(zip(*rows)), device_ip, device_hostname)
+
+    def extend_columns(self, columns: Sequence[Sequence], device_ip: str = None, device_hostname: str = None):
+        """Дописывает столбцы (ips, macs, ages, types, interfaces) одной длины."""
+        ips, macs, ages, types, interfaces = columns
+        if not ips:
+            return
+        offset = len(self.ips)
+        self.ips.extend(self._ip_ids(ips, offset))
+        self.macs.extend(map(int, macs, repeat(16)))
+        self.ages.extend(self.age_table.ids(ages))
+        self.types.extend(self.type_table.ids(types))
+        self.interfaces.extend(self.interface_table.ids(interfaces))
+        self.devices.extend(repeat(self.device_table.id((device_ip, device_hostname)), len(ips)))
+
+    def extend_dicts(self, entries: Iterable[Dict[str, Any]]):
+        by_device: Dict[Tuple, List[Tuple]] = {}
+        for e in entries:
+            by_device.setdefault((e.get("device_ip"), e.get("device_hostname")), []).append(
+                (e["ip"], e["mac"], e.get("age"), e.get("type"), e.get("interface"))
+            )
+        for (device_ip, device_hostname), rows in by_device.items():
+            self.extend_rows(rows, device_ip, device_hostname)
+
+    def extend(self, other: "ArpEntryStore"):
+        if not isinstance(other, ArpEntryStore):
+            self.extend_dicts(other)
+            return
+        offset = len(self.ips)
+        age_map = self.age_table.remap(other.age_table)
+        type_map = self.type_table.remap(other.type_table)
+        interface_map = self.interface_table.remap(other.interface_table)
+        device_map = self.device_table.remap(other.device_table)
+
+        self.ips.extend(other.ips)
+        self.macs.extend(other.macs)
+        self.ages.extend(age_map[i] for i in other.ages)
+        self.types.extend(type_map[i] for i in other.types)
+        self.interfaces.extend(interface_map[i] for i in other.interfaces)
+        self.devices.extend(device_map[i] for i in other.devices)
+        for row, ip in other.ip_raw.items():
+            self.ip_raw[offset + row] = ip
+
+    def set_device(self, device_ip: str, device_hostname: str):
+        device_id = self.device_table.id((device_ip, device_hostname))
+        self.devices = array("I", repeat(device_id, len(self.ips)))
+
+    def rows(self) -> Iterator[Tuple[str, str, Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]]:
+        """Кортежи (ip, mac, age, type, interface, device_ip, device_hostname)."""
+        ages = self.age_table.values
+        types = self.type_table.values
+        interfaces = self.interface_table.values
+        devices = self.device_table.values
+        ip_raw = self.ip_raw
+        for i, (ip, mac, age_id, type_id, interface_id, device_id) in enumerate(
+            zip(self.ips, self.macs, self.ages, self.types, self.interfaces, self.devices)
+        ):
+            device_ip, device_hostname = devices[device_id]
+            yield (
+                ip_raw[i] if ip == IP_RAW else _int_to_ip(ip),
+                _int_to_mac(mac),
+                ages[age_id],
+                types[type_id],
+                interfaces[interface_id],
+                device_ip,
+                device_hostname,
+            )
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Граница хранилища: словари в формате ArpNormalizer, по одному."""
+        for ip, mac, age, _type, interface, _device_ip, _device_hostname in self.rows():
+            yield {"ip": ip, "mac": mac, "age": age, "interface": interface}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self.iter_dicts())
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.ips, self.macs, self.ages, self.types, self.interfaces, self.devices))
+
+
+def iter_mac_rows(entries) -> Iterator[Tuple]:
+    """(mac, vlan, type, port, device_ip, device_hostname) из хранилища или списка словарей."""
+    if isinstance(entries, MacEntryStore):
+        yield from entries.rows()
+        return
+    for e in entries:
+        yield e["mac"], e.get("vlan"), e.get("type"), e.get("port"), e.get("device_ip"), e.get("device_hostname")
+
+def iter_arp_rows(entries) -> Iterator[Tuple]:
+    """(ip, mac, age, type, interface, device_ip, device_hostname) из хранилища или списка словарей."""
+    if isinstance(entries, ArpEntryStore):
+        yield from entries.rows()
+        return
+    for e in entries:
+        yield e["ip"], e["mac"], e.get("age"), e.get("type"), e.get("interface"), e.get("device_ip"), e.get("device_hostname")
+
+def json_default(obj):
+    """Хук для json.dump: хранилища сериализуются как списки словарей, VlanSet — строкой диапазонов."""
+    if isinstance(obj, (MacEntryStore, ArpEntryStore)):
+        return obj.to_dicts()
+    if isinstance(obj, VlanSet):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,6 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Literal, List
 
+class HostSighting(BaseModel):
+    """Где MAC виден: устройство, порт, VLAN."""
+    device_ip: Optional[str] = None
+    device_hostname: Optional[str] = None
+    port: Optional[str] = None
+    vlan: Optional[str] = None
+
 class Host(BaseModel):
     mac: str = Field(..., pattern=r'^[0-9a-f]{12}$')
     ip: str = "unknown"
@@ -14,4 +21,7 @@ class Host(BaseModel):
     hostname: Optional[str] = None
     dhcp_server: Optional[str] = None
     lease_end: Optional[str] = None
-    source: List[str] = Field(default_factory=list)
\ No newline at end of file
+    source: List[str] = Field(default_factory=list)
+    ips: List[str] = Field(default_factory=list)                    # все IP хоста (ARP, затем DHCP)
+    sightings: List[HostSighting] = Field(default_factory=list)     # все порты, где виден MAC
+    dhcp_servers: List[str] = Field(default_factory=list)           # все DHCP-серверы с записью о MAC
@@ -12,7 +12,7 @@ class Interface(BaseModel):
 
     # Новые поля из running-config
     mode: Literal["access", "trunk"] = "access"
-    allowed_vlans: Optional[str] = None
+    allowed_vlans: Optional[str] = None     # диапазоны "1-100,200"; после обогащения — VlanSet
     untagged_vlans: Optional[str] = None
     pvid: str = "1"
     voice_vlan_mode: Optional[str] = None
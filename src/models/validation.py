@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+from types import UnionType
+from typing import Annotated, Any, Callable, Dict, List, Optional, Type, Union, get_args, get_origin
+
+from pydantic import AfterValidator, BaseModel, BeforeValidator, TypeAdapter, ValidationError
+from typing_extensions import TypedDict
+
+# strict  — каждая пачка проходит полную валидацию pydantic (по умолчанию)
+# trusted — данные наших парсеров/нормализаторов не перепроверяются: только
+#           дополняются значениями по умолчанию и приводятся к полям модели
+VALIDATION_MODES = ("strict", "trusted")
+
+
+def get_validation_mode() -> str:
+    mode = (os.getenv("VALIDATION_MODE") or "strict").strip().lower()
+    return mode if mode in VALIDATION_MODES else "strict"
+
+
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+_fillers: Dict[Type[BaseModel], Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+def _filler(model: Type[BaseModel]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Функция записи в порядке полей модели: недостающие поля — значения по умолчанию,
+    лишние ключи отброшены (как после model_dump). Генерируется один раз на модель.
+    """
+    filler = _fillers.get(model)
+    if filler is not None:
+        return filler
+
+    namespace: Dict[str, Any] = {}
+    items = []
+    for i, (name, field) in enumerate(model.model_fields.items()):
+        if field.is_required():
+            items.append((name, f"row[{name!r}]", True))
+        elif field.default_factory is not None:
+            namespace[f"_f{i}"] = field.default_factory
+            items.append((name, f"(row[{name!r}] if {name!r} in row else _f{i}())", False))
+        else:
+            namespace[f"_d{i}"] = field.default
+            items.append((name, f"row.get({name!r}, _d{i})", False))
+
+    # Обязательного поля нет в записи — ключ не добавляется (ошибку выдаст валидация)
+    required = [name for name, _, is_required in items if is_required]
+    body = ", ".join(f"{name!r}: {expr}" for name, expr, _ in items)
+    source = "def fill(row):\n"
+    if required:
+        source += f"    if not ({' and '.join(f'{name!r} in row' for name in required)}):\n"
+        source += "        return _slow(row)\n"
+    source += f"    return {{{body}}}\n"
+
+    def slow(row):
+        out = {}
+        for name, field in model.model_fields.items():
+            if name in row:
+                out[name] = row[name]
+            elif not field.is_required():
+                out[name] = field.get_default(call_default_factory=True)
+        return out
+
+    namespace["_slow"] = slow
+    exec(compile(source, f"<filler {model.__name__}>", "exec"), namespace)
+    filler = _fillers.setdefault(model, namespace["fill"])
+    return filler
+
+def _plain_validators(model: Type[BaseModel]) -> Optional[Dict[str, list]]:
+    """field_validator'ы модели режима after по полям; None — если есть другие (тогда нужна сама модель)."""
+    decorators = model.__pydantic_decorators__
+    if decorators.model_validators or decorators.root_validators:
+        return None
+    by_field: Dict[str, list] = {}
+    for decorator in decorators.field_validators.values():
+        if decorator.info.mode != "after":
+            return None
+        for field in decorator.info.fields:
+            by_field.setdefault(field, []).append(AfterValidator(decorator.func))
+    return by_field
+
+def _dict_type(annotation: Any) -> Any:
+    """Аннотация поля, в которой вложенные модели заменены на их TypedDict-двойники."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _typed_dict(annotation) or annotation
+    args = get_args(annotation)
+    origin = get_origin(annotation)
+    if not args or origin is None:
+        return annotation
+    converted = tuple(_dict_type(arg) for arg in args)
+    if converted == args:
+        return annotation
+    if origin is list:
+        return List[converted[0]]
+    if origin in (Union, UnionType):
+        return Union[converted]
+    return annotation
+
+def _typed_dict(model: Type[BaseModel]) -> Optional[Any]:
+    """
+    TypedDict с теми же типами, ограничениями Field и after-валидаторами, что у модели.
+    Валидация в словарь без создания объектов модели и model_dump() — в разы быстрее.
+    None — если модель так не описать (before/wrap/model-валидаторы).
+    """
+    validators = _plain_validators(model)
+    if validators is None:
+        return None
+    annotations = {}
+    for name, field in model.model_fields.items():
+        metadata = list(field.metadata) + validators.get(name, [])
+        annotation = _dict_type(field.annotation)
+        annotations[name] = Annotated[(annotation, *metadata)] if metadata else annotation
+    typed = TypedDict(f"{model.__name__}Dict", annotations)
+    fill = _filler(model)
+    return Annotated[typed, BeforeValidator(lambda row: fill(row) if isinstance(row, dict) else row)]
+
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter над списком записей модели — строится один раз на модель."""
+    adapter = _adapters.get(model)
+    if adapter is None:
+        typed = _typed_dict(model)
+        adapter = _adapters.setdefault(model, TypeAdapter(List[typed if typed is not None else model]))
+    return adapter
+
+
+class ValidationStats:
+    """Счётчики валидации по стадиям: записи, отброшенные, время."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, stage: str, mode: str, rows: int, invalid: int, seconds: float):
+        with self._lock:
+            stat = self.stages.setdefault(stage, {"mode": mode, "batches": 0, "rows": 0, "invalid": 0, "seconds": 0.0})
+            stat["mode"] = mode
+            stat["batches"] += 1
+            stat["rows"] += rows
+            stat["invalid"] += invalid
+            stat["seconds"] += seconds
+
+    def merge(self, stages: Dict[str, Dict[str, Any]]):
+        """Добавляет счётчики другого процесса (snapshot() воркера разбора)."""
+        with self._lock:
+            for stage, other in stages.items():
+                stat = self.stages.setdefault(stage, {"mode": other["mode"], "batches": 0, "rows": 0, "invalid": 0, "seconds": 0.0})
+                stat["mode"] = other["mode"]
+                for key in ("batches", "rows", "invalid", "seconds"):
+                    stat[key] += other[key]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {stage: dict(stat) for stage, stat in self.stages.items()}
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+
+_stats = ValidationStats()
+
+def get_validation_stats() -> Dict[str, Dict[str, Any]]:
+    return _stats.snapshot()
+
+def reset_validation_stats():
+    _stats.reset()
+
+def merge_validation_stats(stages: Dict[str, Dict[str, Any]]):
+    _stats.merge(stages)
+
+def report_validation_stats():
+    stats = get_validation_stats()
+    if not stats:
+        return
+    print("Валидация по стадиям:")
+    for stage, stat in stats.items():
+        print(f"  {stage:<12} {stat['mode']:<8} записей: {stat['rows']:<8} отброшено: {stat['invalid']:<6} "
+              f"пачек: {stat['batches']:<5} время: {stat['seconds']:.3f} с")
+
+
+def _validate_rows(model: Type[BaseModel], rows: List[Dict[str, Any]], label: str, key: str) -> List[Dict[str, Any]]:
+    """Медленный путь: по одной записи, невалидные отбрасываются с сообщением."""
+    valid = []
+    for row in rows:
+        try:
+            valid.append(model(**row).model_dump())
+        except ValidationError as e:
+            print(f"Ошибка валидации {label} {row.get(key)}: {e}")
+    return valid
+
+def _trusted_rows(model: Type[BaseModel], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return list(map(_filler(model), rows))
+
+def validate_batch(
+    model: Type[BaseModel],
+    rows: List[Dict[str, Any]],
+    stage: str,
+    label: str = "записи",
+    key: str = "name",
+    trusted: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Валидация пачки записей одной моделью — вместо model(**row).model_dump() на каждую.
+    strict: один вызов TypeAdapter на всю пачку (по TypedDict-двойнику модели); если в пачке есть ошибки —
+    повтор по одной записи, чтобы отбросить только невалидные (как раньше).
+    trusted: без проверки — дополнение значениями по умолчанию (см. VALIDATION_MODE).
+    label/key — для сообщения об ошибке: "Ошибка валидации {label} {row[key]}".
+    """
+    if trusted is None:
+        trusted = get_validation_mode() == "trusted"
+    mode = "trusted" if trusted else "strict"
+
+    start = time.perf_counter()
+    if not rows:
+        result = []
+    elif trusted:
+        result = _trusted_rows(model, rows)
+    else:
+        adapter = _adapter(model)
+        try:
+            result = adapter.validate_python(rows)
+            if result and isinstance(result[0], BaseModel):
+                result = [item.model_dump() for item in result]
+        except ValidationError:
+            result = _validate_rows(model, rows, label, key)
+
+    _stats.record(stage, mode, len(rows), len(rows) - len(result), time.perf_counter() - start)
+    return result
@@ -2,6 +2,20 @@ from typing import List
 from pydantic import BaseModel, field_validator, Field
 import re
 
+def port_key(port: str) -> tuple:
+    # Разбиваем на префикс (g0/, tg0/, ge1/) и номер
+    match = re.match(r"([a-z]+[0-9]*/?)([0-9]+(?:/[0-9]+)?)", port.lower())
+    if match:
+        prefix, number = match.groups()
+        # Разбиваем номер на части (например 1/0/5 → (1,0,5))
+        num_parts = tuple(int(x) for x in number.split('/'))
+        return (prefix, num_parts)
+    return (port.lower(), ())  # fallback для нестандартных имён
+
+def sort_ports(ports: List[str]) -> List[str]:
+    """Порты без дубликатов в естественном порядке (g0/2 раньше g0/10)."""
+    return sorted(set(ports), key=port_key)
+
 class VlanPort(BaseModel):
     port: str
 
@@ -14,19 +28,7 @@ class Vlan(BaseModel):
     @field_validator("ports")
     @classmethod
     def sort_and_unique_ports(cls, v: List[str]) -> List[str]:
-        def port_key(port: str) -> tuple:
-            # Разбиваем на префикс (g0/, tg0/, ge1/) и номер
-            match = re.match(r"([a-z]+[0-9]*/?)([0-9]+(?:/[0-9]+)?)", port.lower())
-            if match:
-                prefix, number = match.groups()
-                # Разбиваем номер на части (например 1/0/5 → (1,0,5))
-                num_parts = tuple(int(x) for x in number.split('/'))
-                return (prefix, num_parts)
-            return (port.lower(), ())  # fallback для нестандартных имён
-
-        unique_ports = set(v)  # убираем дубликаты
-        sorted_ports = sorted(unique_ports, key=port_key)
-        return sorted_ports
+        return sort_ports(v)
 
     class Config:
         json_encoders = {}
\ No newline at end of file
@@ -0,0 +1,143 @@
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+VLAN_MAX = 4094
+_SEPARATORS = re.compile(r"[,;\s]+")
+
+
+class VlanSet:
+    """
+    Множество VLAN 1–4094 как 4096-битная маска (одно целое Python): членство,
+    объединение, пересечение и разность — битовые операции без разбора строк.
+    Строковая форма — диапазоны "1-100,200,300-310" (parse/str); в JSON пишется она же.
+    Неизменяемо: операции возвращают новое множество.
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self, vlans: Iterable[int] = ()):
+        bits = 0
+        for vlan in vlans:
+            bits |= 1 << _check(int(vlan))
+        self.bits = bits
+
+    @classmethod
+    def from_bits(cls, bits: int) -> "VlanSet":
+        vlan_set = cls()
+        vlan_set.bits = bits & _ALL_BITS
+        return vlan_set
+
+    @classmethod
+    def all(cls) -> "VlanSet":
+        return cls.from_bits(_ALL_BITS)
+
+    @classmethod
+    def parse(cls, text: Optional[str]) -> "VlanSet":
+        """
+        "1-100,200,300-310" (разделители — запятая, точка с запятой, пробелы),
+        "all" — все VLAN, пустая строка/None/"none" — пустое множество.
+        ValueError — если в строке не номера VLAN.
+        """
+        if text is None:
+            return cls()
+        text = text.strip().lower()
+        if text in ("", "none"):
+            return cls()
+        if text == "all":
+            return cls.all()
+
+        bits = 0
+        for token in _SEPARATORS.split(text):
+            if not token:
+                continue
+            start, sep, end = token.partition("-")
+            try:
+                low = _check(int(start))
+                high = _check(int(end)) if sep else low
+            except ValueError:
+                raise ValueError(f"Некорректный список VLAN: {text!r}") from None
+            if low > high:
+                low, high = high, low
+            bits |= ((1 << (high - low + 1)) - 1) << low
+        return cls.from_bits(bits)
+
+    @classmethod
+    def coerce(cls, value: Union["VlanSet", str, Iterable[int], None]) -> "VlanSet":
+        """VlanSet из множества, строки диапазонов (в т.ч. из прошлых снапшотов) или номеров."""
+        if isinstance(value, VlanSet):
+            return value
+        if value is None or isinstance(value, str):
+            return cls.parse(value)
+        return cls(value)
+
+    def ranges(self) -> Iterator[tuple]:
+        """(начало, конец) непрерывных диапазонов по возрастанию."""
+        bits = self.bits
+        while bits:
+            low = (bits & -bits).bit_length() - 1
+            shifted = bits >> low
+            high = low + (~shifted & (shifted + 1)).bit_length() - 2   # последняя единица подряд от low
+            yield low, high
+            bits &= ~(((1 << (high - low + 1)) - 1) << low)
+
+    def __str__(self) -> str:
+        return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in self.ranges())
+
+    def __repr__(self) -> str:
+        return f"VlanSet({str(self)!r})"
+
+    def __iter__(self) -> Iterator[int]:
+        for low, high in self.ranges():
+            yield from range(low, high + 1)
+
+    def __len__(self) -> int:
+        return bin(self.bits).count("1")
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def __contains__(self, vlan) -> bool:
+        try:
+            vlan = int(vlan)
+        except (TypeError, ValueError):
+            return False
+        return 1 <= vlan <= VLAN_MAX and bool(self.bits >> vlan & 1)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, VlanSet) and self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __or__(self, other: "VlanSet") -> "VlanSet":
+        return VlanSet.from_bits(self.bits | other.bits)
+
+    def __and__(self, other: "VlanSet") -> "VlanSet":
+        return VlanSet.from_bits(self.bits & other.bits)
+
+    def __sub__(self, other: "VlanSet") -> "VlanSet":
+        return VlanSet.from_bits(self.bits & ~other.bits)
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+
+    def issubset(self, other: "VlanSet") -> bool:
+        return self.bits & ~other.bits == 0
+
+    def to_bytes(self) -> bytes:
+        """512 байт — 4096 бит, бит N — VLAN N."""
+        return self.bits.to_bytes(512, "little")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "VlanSet":
+        return cls.from_bits(int.from_bytes(data, "little"))
+
+
+def _check(vlan: int) -> int:
+    if not 1 <= vlan <= VLAN_MAX:
+        raise ValueError(f"VLAN вне диапазона 1–{VLAN_MAX}: {vlan}")
+    return vlan
+
+
+_ALL_BITS = ((1 << VLAN_MAX) - 1) << 1
@@ -1,10 +1,19 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from src.normalizer.base_normalizer import BaseNormalizer
+from src.models.entry_store import ArpEntryStore
 
 class ArpNormalizer(BaseNormalizer):
     @classmethod
     def normalize(cls, parsed_data: Dict[str, Any], vendor: str) -> Dict[str, Any]:
         entries = parsed_data.get("arp_entries", [])
+        if isinstance(entries, ArpEntryStore):
+            # Колоночное хранилище уже в нормализованном виде — отдаём как есть
+            return {"arp_entries_normalized": entries}
+        return {"arp_entries_normalized": cls.normalize_entries(entries)}
+
+    @classmethod
+    def normalize_entries(cls, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Нормализация пачки записей — используется и потоковым разбором."""
         normalized = []
 
         for entry in entries:
@@ -15,4 +24,4 @@ class ArpNormalizer(BaseNormalizer):
                 "interface": entry["interface"]
             })
 
-        return {"arp_entries_normalized": normalized}
\ No newline at end of file
+        return normalized
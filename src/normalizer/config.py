@@ -1,5 +1,16 @@
 from typing import Dict, Any, List
 from src.normalizer.base_normalizer import BaseNormalizer
+from src.models.vlan_set import VlanSet
+
+def _vlan_list(value):
+    """Список VLAN в каноническом виде ("1-100,200"); нераспознанный — как есть."""
+    if not value:
+        return value
+    try:
+        return str(VlanSet.parse(value))
+    except ValueError as e:
+        print(f"{e} — оставляем как есть")
+        return value
 
 class ConfigNormalizer(BaseNormalizer):
     @classmethod
@@ -26,8 +37,8 @@ class ConfigNormalizer(BaseNormalizer):
             normalized = {
                 "name": name,
                 "mode": raw_intf["mode"] or "access",
-                "allowed_vlans": raw_intf["allowed_vlans"],
-                "untagged_vlans": raw_intf["untagged_vlans"],
+                "allowed_vlans": _vlan_list(raw_intf["allowed_vlans"]),
+                "untagged_vlans": _vlan_list(raw_intf["untagged_vlans"]),
                 "pvid": raw_intf["pvid"] if raw_intf["pvid"] else ("1" if raw_intf["mode"] == "trunk" else None),
                 "voice_vlan_mode": raw_intf["voice_vlan_mode"],
                 "voice_vlan_vid": raw_intf["voice_vlan_vid"]
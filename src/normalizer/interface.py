@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 from src.normalizer.base_normalizer import BaseNormalizer
 from src.models.interface import Interface
+from src.models.validation import validate_batch
 
 class InterfaceNormalizer(BaseNormalizer):
     @classmethod
@@ -33,7 +34,7 @@ class InterfaceNormalizer(BaseNormalizer):
                 speed_normalized = speed_str
 
             normalized_intf = {
-                "name": name,
+                "name": name.replace(" ", ""),
                 "description": (raw_intf.get("description") or "").strip() or None,
                 "status": raw_intf.get("status", "down").lower(),
                 "vlan": raw_intf.get("vlan", "1"),
@@ -41,12 +42,6 @@ class InterfaceNormalizer(BaseNormalizer):
                 "speed": speed_normalized,
                 "type": raw_intf.get("type", "unknown")
             }
+            normalized.append(normalized_intf)
 
-            try:
-                validated = Interface(**normalized_intf)
-                normalized.append(validated.model_dump())
-            except Exception as e:
-                print(f"Ошибка валидации интерфейса {name}: {e}")
-                continue
-
-        return {"interfaces": normalized}
\ No newline at end of file
+        return {"interfaces": validate_batch(Interface, normalized, "interfaces", label="интерфейса", key="name")}
\ No newline at end of file
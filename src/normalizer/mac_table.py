@@ -1,10 +1,19 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from src.normalizer.base_normalizer import BaseNormalizer
+from src.models.entry_store import MacEntryStore
 
 class MacTableNormalizer(BaseNormalizer):
     @classmethod
     def normalize(cls, parsed_data: Dict[str, Any], vendor: str) -> Dict[str, Any]:
         entries = parsed_data.get("mac_entries", [])
+        if isinstance(entries, MacEntryStore):
+            # Колоночное хранилище уже в нормализованном виде — отдаём как есть
+            return {"mac_entries_normalized": entries}
+        return {"mac_entries_normalized": cls.normalize_entries(entries)}
+
+    @classmethod
+    def normalize_entries(cls, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Нормализация пачки записей — используется и потоковым разбором."""
         normalized = []
 
         for entry in entries:
@@ -17,4 +26,4 @@ class MacTableNormalizer(BaseNormalizer):
                 "device_hostname": entry.get("device_hostname")
             })
 
-        return {"mac_entries_normalized": normalized}
\ No newline at end of file
+        return normalized
@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 from src.normalizer.base_normalizer import BaseNormalizer
 from src.models.svi import SVI
+from src.models.validation import validate_batch
 
 class SVINormalizer(BaseNormalizer):
     @classmethod
@@ -16,11 +17,6 @@ class SVINormalizer(BaseNormalizer):
                 "status": raw_svi["status"].lower(),
                 "description": None  # заполним позже
             }
-            try:
-                validated = SVI(**norm)
-                normalized.append(validated.model_dump())
-            except Exception as e:
-                print(f"Ошибка валидации SVI {norm['interface']}: {e}")
-                continue
+            normalized.append(norm)
 
-        return {"svi": normalized}
\ No newline at end of file
+        return {"svi": validate_batch(SVI, normalized, "svi", label="SVI", key="interface")}
\ No newline at end of file
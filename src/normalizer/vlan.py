@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 from src.normalizer.base_normalizer import BaseNormalizer
-from src.models.vlan import Vlan
+from src.models.vlan import Vlan, sort_ports
+from src.models.validation import validate_batch
 
 class VlanNormalizer(BaseNormalizer):
     @classmethod
@@ -24,15 +25,9 @@ class VlanNormalizer(BaseNormalizer):
                 "vlan_id": int(vlan_id),
                 "name": raw_vlan["name"].strip(),
                 "status": raw_vlan["status"].lower(),
-                "ports": sorted(raw_vlan["ports"])  # уже list[str]
+                "ports": sort_ports(raw_vlan["ports"])  # уже list[str]
             }
+            normalized_vlans.append(normalized)
 
-            # Валидация через Pydantic
-            try:
-                validated = Vlan(**normalized)
-                normalized_vlans.append(validated.model_dump())
-            except Exception as e:
-                print(f"Ошибка валидации VLAN {vlan_id}: {e}")
-                continue
-
-        return {"vlans": normalized_vlans}
\ No newline at end of file
+        # Валидация через Pydantic — одной пачкой
+        return {"vlans": validate_batch(Vlan, normalized_vlans, "vlans", label="VLAN", key="vlan_id")}
\ No newline at end of file
@@ -1,7 +1,5 @@
 # src/parsers/__init__.py
-from .registry import register_parser, get_parser
+from .registry import register_parser, get_parser, load_vendor
 
-# Принудительно импортируем все модули-парсеры при импорте пакета
-import src.parsers.nateks
-import src.parsers.rvi
-# import src.parsers.eltex  # и т.д.
\ No newline at end of file
+# Модули вендоров не импортируются здесь: get_parser() загружает их по требованию
+# (src/parsers/registry.py, VENDOR_MODULES)
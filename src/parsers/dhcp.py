@@ -1,3 +1,4 @@
+import json
 import re
 from typing import Dict, Any, List
 from src.parsers.base_parser import BaseParser
@@ -86,6 +87,70 @@ class DhcpReservationsParser(BaseParser):
         return {"dhcp_reservations": entries}
 
 
+def _clean_mac(client_id) -> str:
+    mac_clean = (client_id or "").replace("-", "").replace(":", "").replace(".", "").lower()
+    return mac_clean if len(mac_clean) == 12 else None
+
+
+def _records(value) -> List[Dict]:
+    # ConvertTo-Json: пустой список — null, одна запись без @() — объект вместо массива
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class DhcpJsonParser(BaseParser):
+    """
+    JSON из collect_dhcp_json(): {"leases": [...], "reservations": [...]} — разбирается
+    одним json.loads, записи в тех же полях, что у построчных парсеров Format-List.
+    """
+
+    @classmethod
+    def parse(cls, command: str, raw_text: str, vendor: str = None) -> Dict[str, Any]:
+        if "dhcp_json" not in command.lower():
+            return {}
+        if not raw_text.strip():
+            return {"dhcp_leases": [], "dhcp_reservations": []}
+
+        try:
+            data = json.loads(raw_text.lstrip("\ufeff"))
+        except ValueError as e:
+            print(f"[DHCP PARSER] Некорректный JSON: {e}")
+            return {"dhcp_leases": [], "dhcp_reservations": []}
+
+        leases = []
+        for item in _records(data.get("leases")):
+            mac = _clean_mac(item.get("ClientId"))
+            if not mac:
+                continue
+            leases.append({
+                "ip": item.get("IPAddress"),
+                "mac": mac,
+                "hostname": item.get("HostName") or None,
+                "address_state": item.get("AddressState"),
+                "lease_end": item.get("LeaseExpiryTime") or None,
+                "scope_id": item.get("ScopeId"),
+            })
+
+        reservations = []
+        for item in _records(data.get("reservations")):
+            mac = _clean_mac(item.get("ClientId"))
+            if not mac:
+                continue
+            reservations.append({
+                "ip": item.get("IPAddress"),
+                "mac": mac,
+                "name": item.get("Name") or None,
+                "description": item.get("Description") or None,
+                "type": item.get("Type"),
+                "scope_id": item.get("ScopeId"),
+            })
+
+        print(f"[DHCP PARSER] Спарсено leases: {len(leases)}, reservations: {len(reservations)}")
+        return {"dhcp_leases": leases, "dhcp_reservations": reservations}
+
+
 # Регистрация — теперь отдельно от вендора
 register_parser("dhcp", "dhcp_leases", DhcpLeasesParser.parse)
-register_parser("dhcp", "dhcp_reservations", DhcpReservationsParser.parse)
\ No newline at end of file
+register_parser("dhcp", "dhcp_reservations", DhcpReservationsParser.parse)
+register_parser("dhcp", "dhcp_json", DhcpJsonParser.parse)
@@ -2,7 +2,8 @@ import re
 from typing import Dict, List, Any
 from src.parsers.base_parser import BaseParser
 from src.parsers.registry import register_parser
-from src.filters.port_filters import is_ignored_port  # импорт фильтра
+from src.filters.port_filters import get_port_filter  # импорт фильтра
+from src.parsers.template_engine import register_templates
 
 
 class NateksVlanParser(BaseParser):
@@ -256,10 +257,6 @@ class NateksMacAddressTableParser(BaseParser):
                     if len(mac_clean) != 12 or not all(c in "0123456789abcdef" for c in mac_clean):
                         continue
 
-                    # Фильтрация портов (игнор по port_filters.yaml)
-                    if device_ip and is_ignored_port(device_ip, port):
-                        continue
-
                     entry = {
                         "vlan": vlan,
                         "mac": mac_clean,
@@ -274,6 +271,10 @@ class NateksMacAddressTableParser(BaseParser):
 
                     entries.append(entry)
 
+        # Фильтрация портов (игнор по port_filters.yaml) — одним пакетом
+        if device_ip:
+            entries = get_port_filter().filter_entries(device_ip, entries)
+
         print(f"[DEBUG] Спарсено MAC-записей: {len(entries)}")
         return {"mac_entries": entries}
 
@@ -287,6 +288,7 @@ class NateksArpParser(BaseParser):
 
         lines = raw_text.splitlines()
         parsing = False
+        port_filter = get_port_filter() if device_ip else None
 
         for line in lines:
             line = line.strip()
@@ -315,7 +317,7 @@ class NateksArpParser(BaseParser):
                 # Фильтрация портов (если interface = "v670(tg0/2)" — извлекаем port)
                 port = interface.split("(")[1].split(")")[0] if "(" in interface else interface
 
-                if device_ip and is_ignored_port(device_ip, port):
+                if port_filter and port_filter.is_ignored(device_ip, port):
                     continue
 
                 entry = {
@@ -432,3 +434,6 @@ register_parser("nateks", "arp", NateksArpParser.parse)
 register_parser("nateks", "dhcp_leases", NateksDhcpLeasesParser.parse)
 register_parser("nateks", "dhcp_reservations", NateksDhcpReservationsParser.parse)
 
+# MAC и ARP — через шаблоны (templates/nateks.yaml): перекрывают ручные парсеры выше,
+# ручные классы оставлены как эталон для benchmarks/bench_parsers.py
+register_templates("nateks")
@@ -1,11 +1,64 @@
-from typing import Callable, Dict
+import importlib
+import threading
+from typing import Callable, Dict, Set
 
 parser_registry: Dict[str, Callable] = {}
 
-def register_parser(vendor: str, command_slug: str, parser_func: Callable):
+# Модуль с парсерами вендора (по умолчанию src.parsers.<vendor>) импортируется
+# при первом запросе парсера этого вендора, а не при импорте пакета
+VENDOR_MODULES: Dict[str, str] = {
+    "nateks": "src.parsers.nateks",
+    "rvi": "src.parsers.rvi",
+    "dhcp": "src.parsers.dhcp",
+}
+
+_loaded_vendors: Set[str] = set()
+_load_lock = threading.Lock()
+
+def load_vendor(vendor: str):
+    """Регистрирует парсеры вендора (импорт его модуля), если ещё не зарегистрированы."""
+    if vendor in _loaded_vendors:
+        return
+    with _load_lock:
+        if vendor in _loaded_vendors:
+            return
+        module = VENDOR_MODULES.get(vendor, f"src.parsers.{vendor}")
+        try:
+            importlib.import_module(module)
+        except ModuleNotFoundError as e:
+            # Нет модуля вендора — нет и парсеров (get_parser вернёт None)
+            if e.name != module:
+                raise
+        _loaded_vendors.add(vendor)
+
+# Парсеры, которые умеют дописывать записи в колоночное хранилище (store=...)
+store_parsers: Set[str] = set()
+
+def register_parser(vendor: str, command_slug: str, parser_func: Callable, accepts_store: bool = False):
     key = f"{vendor}_{command_slug}"
     parser_registry[key] = parser_func
+    if accepts_store:
+        store_parsers.add(key)
+    else:
+        store_parsers.discard(key)
 
 def get_parser(vendor: str, command_slug: str) -> Callable | None:
+    load_vendor(vendor)
     key = f"{vendor}_{command_slug}"
     return parser_registry.get(key)
+
+def accepts_store(vendor: str, command_slug: str) -> bool:
+    load_vendor(vendor)
+    return f"{vendor}_{command_slug}" in store_parsers
+
+# Потоковые парсеры: func(command, lines, vendor, **kwargs) -> итератор пачек записей
+stream_parser_registry: Dict[str, Callable] = {}
+
+def register_stream_parser(vendor: str, command_slug: str, parser_func: Callable):
+    key = f"{vendor}_{command_slug}"
+    stream_parser_registry[key] = parser_func
+
+def get_stream_parser(vendor: str, command_slug: str) -> Callable | None:
+    load_vendor(vendor)
+    key = f"{vendor}_{command_slug}"
+    return stream_parser_registry.get(key)
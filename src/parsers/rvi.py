@@ -2,7 +2,8 @@ import re
 from typing import Dict, Any
 from src.parsers.base_parser import BaseParser
 from src.parsers.registry import register_parser
-from src.filters.port_filters import is_ignored_port
+from src.filters.port_filters import get_port_filter
+from src.parsers.template_engine import register_templates
 
 class RViMacAddressTableParser(BaseParser):
     @classmethod
@@ -42,10 +43,6 @@ class RViMacAddressTableParser(BaseParser):
                     if len(mac_clean) != 12 or not all(c in "0123456789abcdef" for c in mac_clean):
                         continue
 
-                    # Фильтрация портов
-                    if device_ip and is_ignored_port(device_ip, port):
-                        continue
-
                     entry = {
                         "vlan": vlan,
                         "mac": mac_clean,
@@ -60,9 +57,16 @@ class RViMacAddressTableParser(BaseParser):
 
                     entries.append(entry)
 
+        # Фильтрация портов — одним пакетом
+        if device_ip:
+            entries = get_port_filter().filter_entries(device_ip, entries)
+
         print(f"[DEBUG] Спарсено MAC-записей RVi: {len(entries)}")
         return {"mac_entries": entries}
 
 
 # Регистрация (должна быть в конце файла)
-register_parser("rvi", "mac_address_table", RViMacAddressTableParser.parse)
\ No newline at end of file
+register_parser("rvi", "mac_address_table", RViMacAddressTableParser.parse)
+
+# MAC-таблица — через шаблон (templates/rvi.yaml), ручной парсер выше — эталон
+register_templates("rvi")
@@ -0,0 +1,347 @@
+import io
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import yaml
+
+from src.filters.port_filters import get_port_filter
+from src.parsers.registry import register_parser, register_stream_parser
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+
+def _squash(value: str) -> Optional[str]:
+    return " ".join(value.split()) or None
+
+def _to_int(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+# Преобразования полей — выражения Python, которые вклеиваются в собранный построитель
+# записей ({v} — значение столбца; незаполненная группа приходит как "")
+TRANSFORMS: Dict[str, str] = {
+    "mac": "{v}.replace('.', '').replace(':', '').replace('-', '').lower()",
+    "dash_none": "({v} if {v} not in ('', '-') else None)",
+    "empty_none": "({v} or None)",
+    "lower": "{v}.lower()",
+    "strip": "{v}.strip()",
+    "squash": "(_squash({v}) if ('  ' in {v} or '\\t' in {v}) else ({v} or None))",
+    "int": "_to_int({v})",
+}
+
+def port_of(value: Optional[str]) -> Optional[str]:
+    """Порт из поля интерфейса: "v670(tg0/2)" → "tg0/2", "g0/1" → "g0/1"."""
+    if value and "(" in value:
+        return value.split("(")[1].split(")")[0]
+    return value
+
+
+class TemplateParser:
+    """
+    Парсер, собранный из декларативного шаблона (templates/<vendor>.yaml).
+
+    Движок regex: регулярные выражения шаблона компилируются один раз, вывод
+    разбирается одним проходом findall по всему тексту (построчный цикл — внутри re).
+    Движок textfsm: шаблон TextFSM (свой или из ntc_templates) компилируется в
+    автомат один раз на поток и переиспользуется через Reset().
+    Из строк-кортежей записи строит функция, сгенерированная по шаблону
+    (литерал словаря + преобразования полей + фильтр портов в одном list comprehension).
+    """
+
+    def __init__(self, vendor: str, slug: str, spec: Dict[str, Any]):
+        self.vendor = vendor
+        self.slug = slug
+        self.command = spec["command"]
+        self.result_key = spec["result_key"]
+        self.label = spec.get("label", slug)
+        self.engine = spec.get("engine", "regex")
+
+        self.fields: List[str] = list(spec.get("fields") or [])
+        self.constants: Dict[str, Any] = dict(spec.get("constants") or {})
+        self.transforms: Dict[str, str] = dict(spec.get("transforms") or {})
+        unknown = set(self.transforms.values()) - set(TRANSFORMS)
+        if unknown:
+            raise ValueError(f"Шаблон {vendor}/{slug}: неизвестные преобразования {sorted(unknown)}")
+        self.device_fields = bool(spec.get("device_fields"))
+        self.filter_port = spec.get("filter_port")
+
+        if self.engine == "regex":
+            self.start = re.compile(spec["start"], re.MULTILINE) if spec.get("start") else None
+            self.row = re.compile(spec["row"], re.MULTILINE)
+            self.columns = {name: idx - 1 for name, idx in self.row.groupindex.items()}
+            self.single_group = self.row.groups == 1
+        elif self.engine == "textfsm":
+            self.template_text = self._load_textfsm_template(spec)
+            self._local = threading.local()
+            self.columns = {name.lower(): idx for idx, name in enumerate(self._fsm().header)}
+            self.single_group = False
+        else:
+            raise ValueError(f"Шаблон {vendor}/{slug}: неизвестный движок {self.engine}")
+
+        # sources: {поле результата: имя группы/колонки} — переименование (удобно для ntc_templates)
+        for field, source in (spec.get("sources") or {}).items():
+            if source.lower() not in self.columns:
+                raise ValueError(f"Шаблон {vendor}/{slug}: нет группы {source} для поля {field}")
+            self.columns[field] = self.columns[source.lower()]
+
+        missing = [f for f in self.fields if f not in self.columns and f not in self.constants]
+        if missing:
+            raise ValueError(f"Шаблон {vendor}/{slug}: поля без группы и без константы: {missing}")
+
+        self._builders: Dict[tuple, Callable] = {}
+
+    @staticmethod
+    def _load_textfsm_template(spec: Dict[str, Any]) -> str:
+        if spec.get("ntc_template"):
+            import ntc_templates
+            path = Path(ntc_templates.__file__).parent / "templates" / spec["ntc_template"]
+        else:
+            path = TEMPLATES_DIR / spec["template"]
+        return path.read_text(encoding="utf-8")
+
+    def _fsm(self):
+        fsm = getattr(self._local, "fsm", None)
+        if fsm is None:
+            import textfsm
+            fsm = textfsm.TextFSM(io.StringIO(self.template_text))
+            self._local.fsm = fsm
+        else:
+            fsm.Reset()
+        return fsm
+
+    def _value_expr(self, field: str) -> str:
+        if field not in self.columns:
+            return f"_constants[{field!r}]"
+        value = f"r[{self.columns[field]}]"
+        transform = self.transforms.get(field)
+        return TRANSFORMS[transform].format(v=value) if transform else value
+
+    def _builder(self, with_ip: bool, with_hostname: bool, with_filter: bool) -> Callable:
+        """Построитель записей под конкретный набор опций (генерируется один раз)."""
+        key = (with_ip, with_hostname, with_filter)
+        builder = self._builders.get(key)
+        if builder is not None:
+            return builder
+
+        items = [f"{field!r}: {self._value_expr(field)}" for field in self.fields]
+        if self.device_fields and with_ip:
+            items.append("'device_ip': _device_ip")
+        if self.device_fields and with_hostname:
+            items.append("'device_hostname': _device_hostname")
+        condition = f" if r[{self.columns[self.filter_port]}] not in _ignored" if with_filter else ""
+
+        source = (
+            "def build(rows, _ignored, _device_ip, _device_hostname):\n"
+            f"    return [{{{', '.join(items)}}} for r in rows{condition}]\n"
+        )
+        namespace = {"_constants": self.constants, "_squash": _squash, "_to_int": _to_int}
+        exec(compile(source, f"<template {self.vendor}/{self.slug}>", "exec"), namespace)
+        builder = self._builders.setdefault(key, namespace["build"])
+        return builder
+
+    def _column_builder(self, fields: tuple, with_filter: bool) -> Callable:
+        """
+        Построитель столбцов в порядке fields — для колоночного хранилища.
+        Строки транспонируются одним zip, преобразования применяются к столбцу целиком.
+        """
+        key = ("columns", fields, with_filter)
+        builder = self._builders.get(key)
+        if builder is not None:
+            return builder
+
+        missing = [f for f in fields if f not in self.columns and f not in self.constants]
+        if missing:
+            raise ValueError(f"Шаблон {self.vendor}/{self.slug}: нет полей {missing} для хранилища")
+
+        lines = ["def build(rows, _ignored):"]
+        if with_filter:
+            lines.append(f"    rows = [r for r in rows if r[{self.columns[self.filter_port]}] not in _ignored]")
+        lines.append("    if not rows:")
+        lines.append(f"        return [()] * {len(fields)}")
+        lines.append("    cols = list(zip(*rows))")
+
+        items = []
+        for field in fields:
+            if field not in self.columns:
+                items.append(f"(_constants[{field!r}],) * len(rows)")
+                continue
+            column = f"cols[{self.columns[field]}]"
+            transform = self.transforms.get(field)
+            items.append(f"[{TRANSFORMS[transform].format(v='v')} for v in {column}]" if transform else column)
+        lines.append(f"    return [{', '.join(items)}]")
+
+        namespace = {"_constants": self.constants, "_squash": _squash, "_to_int": _to_int}
+        exec(compile("\n".join(lines) + "\n", f"<template {self.vendor}/{self.slug} columns>", "exec"), namespace)
+        builder = self._builders.setdefault(key, namespace["build"])
+        return builder
+
+    def rows(self, raw_text: str) -> List[tuple]:
+        """Строки таблицы как кортежи значений групп ("" для незаполненных)."""
+        if self.engine == "textfsm":
+            return [tuple(row) for row in self._fsm().ParseText(raw_text)]
+
+        pos = 0
+        if self.start is not None:
+            match = self.start.search(raw_text)
+            if match is None:
+                return []
+            pos = match.end()
+
+        rows = self.row.findall(raw_text, pos)
+        if self.single_group:
+            rows = [(value,) for value in rows]
+        return rows
+
+    def _ignored_values(self, rows: List[tuple], device_ip: str) -> set:
+        """Значения столбца фильтра, порт которых игнорируется (проверка по уникальным значениям)."""
+        port_filter = get_port_filter()
+        idx = self.columns[self.filter_port]
+        transform = self.transforms.get(self.filter_port)
+        ignored = set()
+        for value in {r[idx] for r in rows}:
+            port = value
+            if transform == "squash":
+                port = _squash(value)
+            if port_filter.is_ignored(device_ip, port_of(port)):
+                ignored.add(value)
+        return ignored
+
+    def build_entries(self, rows: List[tuple], device_ip: str = None, device_hostname: str = None) -> List[Dict[str, Any]]:
+        with_filter = bool(self.filter_port and device_ip and self.filter_port in self.columns)
+        ignored = self._ignored_values(rows, device_ip) if with_filter else None
+        builder = self._builder(bool(device_ip), bool(device_hostname), with_filter and bool(ignored))
+        return builder(rows, ignored, device_ip, device_hostname)
+
+    def append_to_store(self, store, rows: List[tuple], device_ip: str = None, device_hostname: str = None) -> int:
+        """Дописывает строки в колоночное хранилище (MacEntryStore/ArpEntryStore) без промежуточных словарей."""
+        with_filter = bool(self.filter_port and device_ip and self.filter_port in self.columns)
+        ignored = self._ignored_values(rows, device_ip) if with_filter else None
+        columns = self._column_builder(tuple(store.FIELDS), with_filter and bool(ignored))(rows, ignored)
+        store.extend_columns(columns, device_ip, device_hostname)
+        return len(columns[0])
+
+    def parse(
+        self,
+        command: str,
+        raw_text: str,
+        vendor: str = None,
+        device_ip: str = None,
+        device_hostname: str = None,
+        store=None
+    ) -> Dict[str, Any]:
+        """С store — записи дописываются в колоночное хранилище, и в результате лежит оно."""
+        if command != self.command:
+            return {}
+
+        rows = self.rows(raw_text or "")
+        if store is not None:
+            count = self.append_to_store(store, rows, device_ip, device_hostname)
+            print(f"[DEBUG] Спарсено {self.label}: {count}")
+            return {self.result_key: store}
+
+        entries = self.build_entries(rows, device_ip, device_hostname)
+
+        print(f"[DEBUG] Спарсено {self.label}: {len(entries)}")
+        return {self.result_key: entries}
+
+    def iter_entries(
+        self,
+        command: str,
+        lines: Iterable[str],
+        vendor: str = None,
+        device_ip: str = None,
+        device_hostname: str = None,
+        batch_size: int = 5000,
+        store=None
+    ) -> Iterator[Any]:
+        """
+        Потоковый разбор: строки приходят по одной (например, прямо из SSH-канала),
+        записи отдаются пачками по batch_size. Полный текст вывода в памяти не собирается.
+        С store пачки дописываются в хранилище, а наружу отдаётся число добавленных записей.
+        """
+        if command != self.command:
+            return
+
+        if store is not None:
+            flush = lambda rows: self.append_to_store(store, rows, device_ip, device_hostname)
+        else:
+            flush = lambda rows: self.build_entries(rows, device_ip, device_hostname)
+
+        if self.engine == "textfsm":
+            # TextFSM разбирает только целый текст — здесь потоковость условная
+            rows = self.rows("\n".join(lines))
+            for i in range(0, len(rows), batch_size):
+                yield flush(rows[i:i + batch_size])
+            return
+
+        start = self.start
+        match_row = self.row.match
+        batch: List[tuple] = []
+
+        for line in lines:
+            if start is not None:
+                if start.search(line):
+                    start = None
+                continue
+            m = match_row(line)
+            if m is None:
+                continue
+            batch.append(m.groups(""))
+            if len(batch) >= batch_size:
+                yield flush(batch)
+                batch = []
+
+        if batch:
+            yield flush(batch)
+
+    def parse_lines(self, command: str, lines: Iterable[str], vendor: str = None, device_ip: str = None, device_hostname: str = None) -> Dict[str, Any]:
+        """Как parse(), но по итератору строк."""
+        if command != self.command:
+            return {}
+
+        entries = []
+        for batch in self.iter_entries(command, lines, vendor, device_ip=device_ip, device_hostname=device_hostname):
+            entries.extend(batch)
+
+        print(f"[DEBUG] Спарсено {self.label} (поток): {len(entries)}")
+        return {self.result_key: entries}
+
+
+_compiled: Dict[str, TemplateParser] = {}
+_compiled_lock = threading.Lock()
+
+def load_templates(vendor: str) -> Dict[str, Dict[str, Any]]:
+    path = TEMPLATES_DIR / f"{vendor}.yaml"
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+def get_template_parser(vendor: str, slug: str) -> Optional[TemplateParser]:
+    """Скомпилированный парсер шаблона (компиляция — один раз на процесс)."""
+    key = f"{vendor}_{slug}"
+    parser = _compiled.get(key)
+    if parser is not None:
+        return parser
+
+    with _compiled_lock:
+        if key not in _compiled:
+            spec = load_templates(vendor).get(slug)
+            if spec is None:
+                return None
+            _compiled[key] = TemplateParser(vendor, slug, spec)
+        return _compiled[key]
+
+def register_templates(vendor: str) -> List[str]:
+    """
+    Компилирует и регистрирует в реестре все шаблоны вендора (обычный и потоковый
+    парсер). Возвращает slug'и.
+    """
+    registered = []
+    for slug in load_templates(vendor):
+        parser = get_template_parser(vendor, slug)
+        register_parser(vendor, slug, parser.parse, accepts_store=True)
+        register_stream_parser(vendor, slug, parser.iter_entries)
+        registered.append(slug)
+    return registered
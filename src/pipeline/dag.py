@@ -0,0 +1,169 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class Stage:
+    """
+    Стадия графа: func(*результаты зависимостей) и её замеры.
+    Часть стадии (parent) своей функции не имеет: её время — сумма вызовов, обёрнутых
+    в timed(), и замеров record() изнутри родительской стадии.
+    """
+
+    __slots__ = ("name", "func", "deps", "parent", "status", "result", "error", "started", "wall", "cpu")
+
+    def __init__(self, name: str, func: Optional[Callable], deps: Sequence[str] = (), parent: str = None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.parent = parent
+        self.status = "pending"   # pending → running → done | failed | skipped
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.started: Optional[float] = None   # от начала прогона графа, секунд
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class StageGraph:
+    """
+    Небольшой планировщик стадий с зависимостями. Каждая стадия выполняется в своём
+    потоке, как только готовы все её зависимости, — независимые стадии идут
+    одновременно. Для каждой стадии пишется время (wall) и процессорное время (cpu):
+    потока самой стадии плюс вызовов, обёрнутых в timed(), — для стадий, которые
+    раздают работу своим потокам (движок сбора, DHCP-серверы).
+    Части стадии (add_part) — разбор и нормализация внутри сбора устройств: их время
+    вычитается из родительской стадии, а работа в других процессах (пул разбора)
+    добавляется record().
+    Ошибка стадии не останавливает независимые ветки; зависящие от неё стадии
+    пропускаются, а run() после завершения остальных поднимает первую ошибку.
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        self.wall = 0.0
+        self._origin: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, func: Callable, deps: Sequence[str] = ()) -> Stage:
+        if name in self.stages:
+            raise ValueError(f"Стадия {name} уже есть в графе {self.name}")
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            # Зависимости добавляются раньше зависящих — так циклы невозможны
+            raise ValueError(f"Стадия {name}: неизвестные зависимости {', '.join(missing)}")
+        stage = self.stages[name] = Stage(name, func, deps)
+        return stage
+
+    def add_part(self, name: str, parent: str) -> Stage:
+        """Часть стадии parent со своими замерами (см. timed/record); зависеть от неё нельзя."""
+        if name in self.stages:
+            raise ValueError(f"Стадия {name} уже есть в графе {self.name}")
+        if parent not in self.stages:
+            raise ValueError(f"Стадия {name}: неизвестная родительская стадия {parent}")
+        stage = self.stages[name] = Stage(name, None, parent=parent)
+        return stage
+
+    def record(self, name: str, wall: float, cpu: float):
+        """Замер работы стадии name, выполненной вне потоков этого процесса (воркер пула разбора)."""
+        stage = self.stages[name]
+        with self._lock:
+            if stage.started is None and self._origin is not None:
+                stage.started = time.perf_counter() - wall - self._origin
+            stage.wall += wall
+            stage.cpu += cpu
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """
+        func, процессорное время вызовов которой (в любом потоке) добавляется к стадии name.
+        Для части стадии — ещё и время вызовов (wall); у родителя это время вычитается.
+        """
+        stage = self.stages[name]
+        parent = self.stages[stage.parent] if stage.parent else None
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.thread_time()
+            wall = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - started
+                with self._lock:
+                    stage.cpu += elapsed
+                    if parent is not None:
+                        parent.cpu -= elapsed
+                        if stage.started is None and self._origin is not None:
+                            stage.started = wall - self._origin
+                        stage.wall += time.perf_counter() - wall
+        return wrapper
+
+    def _execute(self, stage: Stage, origin: float) -> Any:
+        stage.started = time.perf_counter() - origin
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            return stage.func(*(self.stages[dep].result for dep in stage.deps))
+        finally:
+            elapsed = time.thread_time() - cpu
+            with self._lock:
+                stage.cpu += elapsed
+            stage.wall = time.perf_counter() - wall
+
+    def run(self) -> Dict[str, Any]:
+        """Выполняет граф; результаты стадий по именам."""
+        origin = self._origin = time.perf_counter()
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.stages)), thread_name_prefix=f"stage-{self.name}") as executor:
+            while True:
+                for stage in self.stages.values():
+                    if stage.status != "pending" or stage.parent:
+                        continue
+                    dep_status = [self.stages[dep].status for dep in stage.deps]
+                    if any(status in ("failed", "skipped") for status in dep_status):
+                        stage.status = "skipped"
+                    elif all(status == "done" for status in dep_status):
+                        stage.status = "running"
+                        running[executor.submit(self._execute, stage, origin)] = stage
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    try:
+                        stage.result = future.result()
+                        stage.status = "done"
+                    except Exception as e:
+                        stage.error = e
+                        stage.status = "failed"
+                        print(f"[PIPELINE] {self.name}: ошибка стадии {stage.name}: {e}")
+        self.wall = time.perf_counter() - origin
+        for stage in self.stages.values():
+            if stage.parent:
+                stage.status = self.stages[stage.parent].status
+
+        for stage in self.stages.values():
+            if stage.error is not None:
+                raise stage.error
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    def timings(self) -> List[Dict[str, Any]]:
+        return [
+            {"stage": stage.name, "part_of": stage.parent, "status": stage.status, "started": stage.started,
+             "wall": stage.wall, "cpu": stage.cpu}
+            for stage in self.stages.values()
+        ]
+
+    def report(self):
+        total = sum(stage.wall for stage in self.stages.values() if not stage.parent)
+        print(f"[PIPELINE] {self.name}: {self.wall:.2f} с (сумма стадий {total:.2f} с)")
+        for stage in self.stages.values():
+            started = f"+{stage.started:.2f} с" if stage.started is not None else "—"
+            # wall части — сумма вызовов по всем потокам и воркерам, может быть больше wall родителя
+            name = f"└ {stage.name}" if stage.parent else stage.name
+            print(f"  {name:<12} {stage.status:<8} старт {started:<10} "
+                  f"wall {stage.wall:.2f} с  cpu {stage.cpu:.2f} с")
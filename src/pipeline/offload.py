@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.collectors.engine import load_collector_config
+from src.models.entry_store import ArpEntryStore, MacEntryStore
+from src.models.validation import get_validation_stats, merge_validation_stats, reset_validation_stats
+from src.normalizer.arp import ArpNormalizer
+from src.normalizer.mac_table import MacTableNormalizer
+from src.parsers.registry import accepts_store, get_parser
+
+DEFAULT_OFFLOAD_CONFIG = {
+    "enabled": True,
+    "workers": 0,            # процессов разбора; 0 — по числу ядер
+    "min_bytes": 262144,     # выводы меньше разбираются прямо в потоке сборщика
+}
+
+# slug → (команда, нормализатор, хранилище)
+PARSE_STEPS = {
+    "mac_address_table": ("show mac address-table", MacTableNormalizer, MacEntryStore),
+    "arp": ("show arp", ArpNormalizer, ArpEntryStore),
+}
+
+
+def load_offload_config(collector_config: dict = None) -> dict:
+    """Секция offload из config/collector.yaml поверх DEFAULT_OFFLOAD_CONFIG."""
+    config = dict(DEFAULT_OFFLOAD_CONFIG)
+    section = (collector_config if collector_config is not None else load_collector_config()).get("offload") or {}
+    config.update({k: v for k, v in section.items() if v is not None})
+    return config
+
+
+Timer = Callable[[str, Callable], Callable]  # (стадия, функция) → функция с замером (StageGraph.timed)
+
+
+def untimed(stage: str, func: Callable) -> Callable:
+    return func
+
+
+def parse_normalize(vendor: str, command_slug: str, text: str, timer: Timer = None, **parser_kwargs) -> Optional[Dict[str, Any]]:
+    """
+    Разбор и нормализация вывода одной команды — в любом процессе.
+    Шаблонные парсеры пишут в колоночное хранилище: оно и возвращается
+    (массивы и таблицы интернирования — компактно при передаче между процессами).
+    timer — замер стадий "parse" и "normalize". None — парсера для вендора нет.
+    """
+    parser = get_parser(vendor, command_slug)
+    if parser is None:
+        return None
+    timer = timer or untimed
+    command, normalizer, store_class = PARSE_STEPS[command_slug]
+    if accepts_store(vendor, command_slug):
+        parser_kwargs["store"] = store_class()
+    parsed = timer("parse", parser)(command, text, vendor, **parser_kwargs)
+    return timer("normalize", normalizer.normalize)(parsed, vendor)
+
+
+def _parse_in_worker(vendor: str, command_slug: str, text: str, **parser_kwargs) -> Tuple[Optional[Dict[str, Any]], Dict, Dict]:
+    """
+    parse_normalize в воркере пула; вместе с результатом — счётчики валидации этого
+    разбора и время стадий {стадия: (wall, cpu)}: cpu — process_time воркера.
+    """
+    reset_validation_stats()
+    times: Dict[str, Tuple[float, float]] = {}
+
+    def timer(stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                spent_wall, spent_cpu = times.get(stage, (0.0, 0.0))
+                times[stage] = (spent_wall + time.perf_counter() - wall, spent_cpu + time.process_time() - cpu)
+        return timed
+
+    result = parse_normalize(vendor, command_slug, text, timer=timer, **parser_kwargs)
+    return result, get_validation_stats(), times
+
+
+class ParseOffloader:
+    """
+    Разбор больших выводов в пуле процессов. Потоки сборщика заняты только SSH:
+    вывод от min_bytes уходит в отдельный процесс (разбор и нормализация идут
+    параллельно на всех ядрах, не споря за GIL с остальными сессиями), мелкий —
+    разбирается на месте, где пересылка дороже самого разбора.
+    Размер прошлого вывода устройства запоминается: для команд, которые были
+    большими, потоковый разбор в потоке сборщика не включается (expects_large).
+    """
+
+    def __init__(self, config: dict = None):
+        self.config = config or load_offload_config()
+        self.min_bytes = int(self.config["min_bytes"])
+        self.enabled = bool(self.config["enabled"])
+        self._sizes: Dict[Tuple[str, str], int] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # fork из процесса с потоками SSH небезопасен (чужие блокировки копируются
+                # захваченными) — воркеры стартуют с чистого интерпретатора
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                workers = int(self.config["workers"]) or os.cpu_count() or 1
+                self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                print(f"[OFFLOAD] Пул разбора: {workers} процессов, порог {self.min_bytes} байт")
+            return self._executor
+
+    def remember(self, device_ip: str, command_slug: str, size: int):
+        self._sizes[(device_ip, command_slug)] = size
+
+    def expects_large(self, device_ip: str, command_slug: str) -> bool:
+        """Прошлый вывод команды был от min_bytes — разбирать его в пуле, а не потоком."""
+        return self.enabled and self._sizes.get((device_ip, command_slug), 0) >= self.min_bytes
+
+    def parse(self, ip: str, vendor: str, command_slug: str, text: str, graph=None, **parser_kwargs) -> Optional[Dict[str, Any]]:
+        """
+        parse_normalize — в пуле процессов для больших выводов, иначе в текущем потоке.
+        graph — StageGraph со стадиями "parse" и "normalize": время разбора идёт в них,
+        в том числе процессорное время воркера.
+        """
+        self.remember(ip, command_slug, len(text))
+        timer = graph.timed if graph is not None else None
+        if not self.enabled or len(text) < self.min_bytes:
+            return parse_normalize(vendor, command_slug, text, timer=timer, **parser_kwargs)
+        try:
+            future = self._pool().submit(_parse_in_worker, vendor, command_slug, text, **parser_kwargs)
+            result, stats, times = future.result()
+        except BrokenProcessPool as e:
+            # Воркер упал (OOM и т.п.) — пул пересоздаётся при следующем выводе, этот разбираем на месте
+            print(f"[OFFLOAD] Пул разбора недоступен ({e}) — разбор в потоке сборщика")
+            with self._lock:
+                self._executor = None
+            return parse_normalize(vendor, command_slug, text, timer=timer, **parser_kwargs)
+        # Валидация и разбор шли в воркере — его счётчики и время в отчёт этого процесса
+        merge_validation_stats(stats)
+        if graph is not None:
+            for stage, (wall, cpu) in times.items():
+                graph.record(stage, wall, cpu)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_offloader: Optional[ParseOffloader] = None
+
+
+def get_offloader() -> ParseOffloader:
+    """Пул разбора из config/collector.yaml (секция offload) — один на процесс."""
+    global _offloader
+    if _offloader is None:
+        _offloader = ParseOffloader()
+    return _offloader
@@ -0,0 +1,350 @@
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.collectors.change_probe import carry_forward_snapshot
+from src.collectors.engine import CollectionEngine, load_collector_config
+from src.collectors.session_pool import SessionPool
+from src.collectors.ssh_collector import collect_raw, get_static_commands
+from src.merge.vlan_index import VlanPortIndex
+from src.models.vlan_set import VlanSet
+from src.normalizer.config import ConfigNormalizer
+from src.normalizer.interface import InterfaceNormalizer
+from src.normalizer.svi import SVINormalizer
+from src.normalizer.version import VersionNormalizer
+from src.normalizer.vlan import VlanNormalizer
+from src.parsers.registry import get_parser
+from src.storage.blobs import memoize_parse
+from src.storage.config import enabled_backends
+from src.storage.file import save_parsed, save_snapshot
+from src.storage.sqlite import get_history_storage
+
+GLOBAL_VLANS_PATH = Path("data/snapshots/global_vlans_snapshot.json")
+
+# Поля устройства из devices.yaml (show version, если разобран, их перекрывает)
+DEVICE_FIELDS = ("model", "serial_number", "id_number", "firmware", "build", "vend_ID", "product_ID")
+
+
+def _is_vlan_1(vlan: Dict) -> bool:
+    return str(vlan["vlan_id"]) == "1"
+
+
+def apply_vlans(device_obj: Dict, normalized: Dict) -> Dict:
+    device_obj["vlans"] = [v for v in normalized.get("vlans", []) if not _is_vlan_1(v)]  # VLAN 1 не учитываем
+    return {"vlans_total": len(device_obj["vlans"])}
+
+
+def apply_interfaces(device_obj: Dict, normalized: Dict) -> Dict:
+    device_obj["interfaces"] = normalized.get("interfaces", [])
+    return {"interfaces_total": len(device_obj["interfaces"])}
+
+
+def apply_version(device_obj: Dict, normalized: Dict) -> Dict:
+    for key, value in normalized.items():
+        if value:
+            device_obj[key] = value
+    return {}
+
+
+def apply_svi(device_obj: Dict, normalized: Dict) -> Dict:
+    # Описание SVI — имя его VLAN (VLAN разобраны раньше, см. STATIC_STEPS)
+    names = {str(v["vlan_id"]): v["name"] for v in device_obj["vlans"]}
+    svis = normalized.get("svi", [])
+    for svi in svis:
+        interface = svi["interface"].upper()
+        if interface.startswith("VLAN") and interface[4:] in names:
+            svi["description"] = names[interface[4:]]
+    device_obj["svi"] = svis
+    return {"svi_total": len(svis)}
+
+
+def _vlan_set(value):
+    try:
+        return VlanSet.parse(value) if value else value
+    except ValueError:
+        return value  # нераспознанный список остаётся строкой (ConfigNormalizer уже предупредил)
+
+
+def apply_config(device_obj: Dict, normalized: Dict) -> Dict:
+    """running-config — только для обогащения интерфейсов (mode, VLAN на порту, voice VLAN)."""
+    config_intfs = {intf["name"].lower(): intf for intf in normalized.get("interfaces_config_normalized", [])}
+    enriched = 0
+    for intf in device_obj["interfaces"]:
+        cfg = config_intfs.get(intf["name"].lower())
+        if cfg is None:
+            continue
+        intf["mode"] = cfg["mode"]
+        # Списки VLAN — маски VlanSet (в снапшот пишутся строкой диапазонов)
+        intf["allowed_vlans"] = _vlan_set(cfg["allowed_vlans"])
+        intf["untagged_vlans"] = _vlan_set(cfg["untagged_vlans"])
+        intf["pvid"] = cfg["pvid"] if cfg["pvid"] else ("1" if cfg["mode"] == "trunk" else None)
+        intf["voice_vlan_mode"] = cfg["voice_vlan_mode"]
+        intf["voice_vlan_vid"] = cfg["voice_vlan_vid"]
+        intf.pop("vlan", None)
+        enriched += 1
+    print(f"{device_obj['ip']}: обогащено интерфейсов из конфига: {enriched}")
+    return {"enriched_interfaces": enriched}
+
+
+# Статический сбор — таблица шагов: slug парсера → (команда, нормализатор, как результат
+# ложится в устройство). Шаги выполняются по порядку: SVI берут имена из VLAN,
+# running-config обогащает уже разобранные интерфейсы. apply возвращает поля summary
+STATIC_STEPS: Tuple[Tuple[str, str, Any, Callable[[Dict, Dict], Dict]], ...] = (
+    ("vlan", "show vlan", VlanNormalizer, apply_vlans),
+    ("interface_brief", "show interface brief", InterfaceNormalizer, apply_interfaces),
+    ("version", "show version", VersionNormalizer, apply_version),
+    ("ip_interface", "show ip interface brief", SVINormalizer, apply_svi),
+    ("running_config", "show running-config", ConfigNormalizer, apply_config),
+)
+
+
+def parse_static(ip, vendor, slug, command, raw_text, parser, normalizer):
+    """
+    Разбор + нормализация одной команды. Неизменённый вывод (тот же sha256 при той же
+    версии парсера) не разбирается заново — результат берётся из кэша. parsed пишется
+    в любом случае: у каждого опроса свой файл, как и без кэша.
+    """
+    normalized, cached = memoize_parse(
+        raw_text, vendor, slug,
+        lambda: normalizer.normalize(parser(command, raw_text, vendor), vendor),
+    )
+    if cached:
+        print(f"{command}: вывод не изменился — результат из кэша разбора")
+    save_parsed(normalized, ip, slug)
+    return normalized
+
+
+class GlobalVlans:
+    """
+    Глобальные VLAN: {vlan_id: {vlan_id, name, status, devices: [{ip, hostname, ports, trunk_ports}]}}.
+    Устройства сдают свои VLAN и интерфейсы из потоков сборщика по мере готовности
+    (add — под блокировкой), свёртка (reduce) идёт в порядке devices.yaml — снимок не
+    зависит от того, какое устройство ответило раньше. Имя и статус VLAN —
+    с первого устройства, где он есть. VLAN 1 не учитывается.
+    Заодно строится обратный индекс VLAN → (устройство, порт) — index (VlanPortIndex);
+    trunk_ports — trunk-порты устройства, где VLAN разрешён.
+    previous — прошлый GlobalVlans: вклад устройств, которые в этот прогон не собирались,
+    переносится из него (тик плана в main_daemon.py собирает статику не со всех сразу).
+    """
+
+    def __init__(self, devices: List[Dict], previous: "GlobalVlans" = None):
+        self.order = {device["ip"]: position for position, device in enumerate(devices)}
+        self.devices_count = len(devices)
+        self._by_device: Dict[str, Tuple[str, List[Dict], List[Dict]]] = {}
+        if previous is not None:
+            with previous._lock:
+                self._by_device = {ip: entry for ip, entry in previous._by_device.items() if ip in self.order}
+        self._lock = threading.Lock()
+        self.index = VlanPortIndex()
+
+    def add(self, ip: str, hostname: str, vlans: List[Dict], interfaces: List[Dict] = ()):
+        with self._lock:
+            self._by_device[ip] = (hostname, vlans, interfaces)
+
+    def reduce(self) -> List[Dict]:
+        with self._lock:
+            by_device = sorted(self._by_device.items(), key=lambda item: self.order.get(item[0], len(self.order)))
+
+        index = VlanPortIndex()
+        global_vlans: Dict[Any, Dict] = {}
+        for ip, (hostname, vlans, interfaces) in by_device:
+            index.add_device(ip, [v for v in vlans if not _is_vlan_1(v)], interfaces)
+            for v in vlans:
+                if _is_vlan_1(v):
+                    continue
+                vlan = global_vlans.get(v["vlan_id"])
+                if vlan is None:
+                    vlan = global_vlans[v["vlan_id"]] = {
+                        "vlan_id": v["vlan_id"],
+                        "name": v["name"],
+                        "status": v["status"],
+                        "devices": []
+                    }
+                vlan["devices"].append({"ip": ip, "hostname": hostname, "ports": v.get("ports", [])})
+
+        for vlan in global_vlans.values():
+            trunk_ports: Dict[str, List[str]] = {}
+            for device_ip, port in index.trunks_carrying(int(vlan["vlan_id"])):
+                trunk_ports.setdefault(device_ip, []).append(port)
+            for device in vlan["devices"]:
+                device["trunk_ports"] = trunk_ports.get(device["ip"], [])
+        self.index = index
+        return list(global_vlans.values())
+
+    def snapshot(self) -> Dict:
+        global_vlans = self.reduce()
+        return {
+            "snapshot": {
+                "id": datetime.utcnow().isoformat(),
+                "type": "global_vlans",
+                "created_at": datetime.utcnow().isoformat() + "Z",
+                "schema_version": "1.0",
+                "devices_count": self.devices_count,
+                "vlans_total": len(global_vlans)
+            },
+            "vlans": global_vlans
+        }
+
+    def save(self, path: Path = GLOBAL_VLANS_PATH) -> Path:
+        snapshot = self.snapshot()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+        print(f"Сохранён глобальный VLAN-снимок: {path} (уникальных VLAN: {snapshot['snapshot']['vlans_total']})")
+        return path
+
+
+def carry_forward_static(device, global_vlans: GlobalVlans = None):
+    """Устройство не изменилось: прошлый снапшот сохраняется как текущий. False — если переносить нечего."""
+    ip = device["ip"]
+    snapshot = carry_forward_snapshot(ip)
+    if snapshot is None:
+        return False
+
+    print(f"{ip}: без изменений — переносим снапшот {snapshot['snapshot']['carried_from']}")
+    device_obj = snapshot.get("device") or {}
+    if global_vlans is not None:
+        global_vlans.add(ip, device.get("hostname", ip), device_obj.get("vlans", []), device_obj.get("interfaces", []))
+    if "file" in enabled_backends():
+        save_snapshot(snapshot, identifier=ip)
+
+    history = get_history_storage()
+    if history is not None:
+        history.write_interfaces(ip, device_obj.get("interfaces", []), device_hostname=device.get("hostname", ip))
+    return True
+
+
+def build_device(device: Dict, raw: Dict[str, str]) -> Tuple[Dict, Dict]:
+    """Устройство снапшота из выводов команд по STATIC_STEPS; (device_obj, summary)."""
+    ip = device["ip"]
+    device_obj = {
+        "ip": ip,
+        "hostname": device.get("hostname", ip),
+        "vendor": device["vendor"],
+        **{field: device.get(field) for field in DEVICE_FIELDS},
+        "location": device.get("location", "unknown"),
+        "status": "reachable",
+        "vlans": [],
+        "interfaces": [],
+        "lldp_neighbors": [],
+        "svi": [],
+        "config": {}
+    }
+    summary = {"vlans_total": 0, "interfaces_total": 0, "svi_total": 0, "enriched_interfaces": 0}
+
+    for slug, command, normalizer, apply in STATIC_STEPS:
+        parser = get_parser(device["vendor"], slug)
+        if parser is None or command not in raw:
+            print(f"{ip}: {command} — нет парсера или вывода")
+            continue
+        normalized = parse_static(ip, device["vendor"], slug, command, raw[command], parser, normalizer)
+        summary.update(apply(device_obj, normalized))
+    return device_obj, summary
+
+
+def process_static_device(device, pool=None, probe=None, global_vlans: GlobalVlans = None, raw: Dict[str, str] = None):
+    """
+    Статический снапшот устройства. raw — уже собранные выводы статических команд
+    (тик плана в main_daemon.py): ни пробы, ни сбора.
+    """
+    ip = device["ip"]
+    hostname = device.get("hostname", ip)
+    print(f"\n=== Обрабатываем статику {hostname} ({ip}) ===")
+
+    if raw is not None:
+        probe = None
+
+    # Дешёвая проба: неизменённое устройство не собираем целиком
+    probe_result = None
+    if probe is not None and probe.enabled_for(device):
+        probe_result = probe.check(device, pool=pool)
+        print(f"{ip}: проба — {probe_result.reason}")
+        if not probe_result.needs_full and carry_forward_static(device, global_vlans):
+            return "carried"
+
+    if raw is None:
+        # Выводы проб, совпадающие со статическими командами, повторно не запрашиваем
+        static_commands = get_static_commands()
+        raw = {
+            cmd: output for cmd, output in (probe_result.outputs if probe_result else {}).items()
+            if cmd in static_commands and not output.startswith("ERROR:")
+        }
+        remaining = [cmd for cmd in static_commands if cmd not in raw]
+        collected = collect_raw(device, command_type="static", pool=pool, commands=remaining) if remaining else {}
+        if remaining and not collected:
+            print(f"Не удалось собрать static для {ip}")
+            return
+        raw.update(collected)
+
+    print(f"Собрано static: {list(raw.keys())}")
+
+    device_obj, summary = build_device(device, raw)
+    if global_vlans is not None:
+        global_vlans.add(ip, hostname, device_obj["vlans"], device_obj["interfaces"])
+
+    snapshot = {
+        "snapshot": {
+            "id": datetime.utcnow().isoformat(),
+            "type": "static_device",
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "schema_version": "1.0",
+            "device_ip": ip,
+            "device_hostname": hostname,
+            "summary": {**summary, "hosts_total": 0, "errors": 0}
+        },
+        "device": device_obj,
+        "vlans": device_obj["vlans"],
+        "hosts": []
+    }
+
+    if "file" in enabled_backends():
+        save_snapshot(snapshot, identifier=ip)
+
+    history = get_history_storage()
+    if history is not None:
+        history.write_interfaces(ip, device_obj["interfaces"], device_hostname=hostname)
+
+    if probe_result is not None:
+        probe.mark_collected(device, probe_result)
+    return "collected"
+
+
+def run_static(devices, engine=None, pool=None, probe=None, process=None, global_vlans: GlobalVlans = None) -> List:
+    """
+    Статический сбор по всем устройствам параллельно (лимиты — config/collector.yaml)
+    и глобальный VLAN-снимок по их результатам. engine/pool/process — для долгоживущего
+    процесса (main_daemon.py): общий движок, пул SSH-сессий и обёртка над process_static_device.
+    global_vlans — свой GlobalVlans, если после прогона нужен индекс VLAN → порт (global_vlans.index).
+    """
+    engine = engine or CollectionEngine.from_config()
+    global_vlans = global_vlans or GlobalVlans(devices)
+    process = process or process_static_device
+
+    run_pool = None
+    if pool is None and probe is not None:
+        # Проба и полный сбор устройства — за один логин: пул сессий на время прогона,
+        # сессия устройства закрывается, как только оно обработано
+        run_pool = pool = SessionPool.from_config(load_collector_config())
+        device_process = process
+
+        def process(device, **kwargs):
+            try:
+                return device_process(device, **kwargs)
+            finally:
+                run_pool.invalidate(device["ip"])
+
+    try:
+        results = engine.run(devices, process, pool=pool, probe=probe, global_vlans=global_vlans)
+    finally:
+        if run_pool is not None:
+            run_pool.close_all()
+    if probe is not None:
+        probe.save_state()
+        carried = sum(1 for _, result in results if result == "carried")
+        collected = sum(1 for _, result in results if result == "collected")
+        print(f"Проба изменений: без изменений {carried}, собрано полностью {collected}")
+    global_vlans.save()
+    return results
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from src.models.entry_store import json_default
+from src.storage.config import load_storage_config
+
+RAW_BLOBS_DIR = Path("data/raw/blobs")
+PARSE_CACHE_DIR = Path("data/cache/parsed")
+
+# Код, от которого зависит нормализованный результат: любая правка здесь — новая версия парсера
+PARSER_CODE_DIRS = (Path("src/parsers"), Path("src/normalizer"), Path("src/models"))
+PARSER_CODE_SUFFIXES = (".py", ".yaml", ".textfsm")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+
+
+class BlobWriter:
+    """Потоковая запись blob: текст пишется во временный файл и хешируется по ходу."""
+
+    def __init__(self, store: "BlobStore"):
+        self.store = store
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.digest: Optional[str] = None
+        store.base_dir.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = store.base_dir / f"incoming.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> str:
+        self._file.close()
+        self.digest = self._hash.hexdigest()
+        path = self.store.path(self.digest)
+        if path.exists():
+            self._tmp_path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._tmp_path.replace(path)
+        return self.digest
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, *exc):
+        # Как и обычный raw-файл, недочитанный вывод тоже сохраняется
+        self.commit()
+
+
+class BlobStore:
+    """
+    Raw-выводы по содержимому: data/raw/blobs/ab/<sha256>.txt.
+    Одинаковый вывод (running-config, version, vlan без изменений) хранится один раз,
+    а каждый опрос пишет только маленький .ref-файл со ссылкой на blob.
+    """
+
+    def __init__(self, base_dir: Path = RAW_BLOBS_DIR):
+        self.base_dir = Path(base_dir)
+
+    def path(self, digest: str) -> Path:
+        return self.base_dir / digest[:2] / f"{digest}.txt"
+
+    def put(self, text: str) -> str:
+        digest = content_hash(text)
+        path = self.path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(path, text.encode("utf-8"))
+        return digest
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def get(self, digest: str) -> str:
+        return self.path(digest).read_text(encoding="utf-8")
+
+    def write_ref(self, path: Path, digest: str, **meta) -> Path:
+        """Ссылка опроса на blob: {"blob": sha256, "collected_at": ..., ...}."""
+        ref = {"blob": digest, "collected_at": datetime.utcnow().isoformat(timespec="seconds") + "Z", **meta}
+        _write_atomic(path, json.dumps(ref, ensure_ascii=False).encode("utf-8"))
+        return path
+
+
+def read_raw_output(path: Union[str, Path], store: BlobStore = None) -> str:
+    """Текст raw-вывода: из обычного .txt или по .ref-ссылке из хранилища blob."""
+    path = Path(path)
+    if path.suffix != ".ref":
+        return path.read_text(encoding="utf-8")
+    ref = json.loads(path.read_text(encoding="utf-8"))
+    return (store or BlobStore()).get(ref["blob"])
+
+
+_parser_version: Optional[str] = None
+
+def parser_version() -> str:
+    """Хеш исходников парсеров, шаблонов, нормализаторов и моделей — считается раз на процесс."""
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256()
+        for base in PARSER_CODE_DIRS:
+            for path in sorted(base.rglob("*")):
+                if path.suffix in PARSER_CODE_SUFFIXES and path.is_file():
+                    digest.update(path.as_posix().encode("utf-8"))
+                    digest.update(path.read_bytes())
+        _parser_version = digest.hexdigest()[:16]
+    return _parser_version
+
+
+class ParseCache:
+    """
+    Мемоизация разбора: (хеш raw, версия парсера) → нормализованный результат.
+    Файл на (вендор, команда, raw): data/cache/parsed/<vendor>/<slug>/<sha256>.json;
+    запись с другой версией парсера считается промахом и перезаписывается.
+    Попадание обновляет mtime записи — срок retention.parse_cache считается от последнего использования.
+    """
+
+    def __init__(self, base_dir: Path = PARSE_CACHE_DIR, version: str = None):
+        self.base_dir = Path(base_dir)
+        self.version = version or parser_version()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def path(self, vendor: str, slug: str, raw_hash: str) -> Path:
+        return self.base_dir / vendor / slug / f"{raw_hash}.json"
+
+    def get(self, vendor: str, slug: str, raw_hash: str) -> Optional[Dict[str, Any]]:
+        path = self.path(vendor, slug, raw_hash)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("parser_version") != self.version:
+            return None
+        # mtime — время последнего обращения: compaction удаляет по нему давно не нужные записи
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("result")
+
+    def put(self, vendor: str, slug: str, raw_hash: str, result: Dict[str, Any]):
+        path = self.path(vendor, slug, raw_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"parser_version": self.version, "result": result}
+        data = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        _write_atomic(path, data.encode("utf-8"))
+
+    def memoize(self, raw_text: str, vendor: str, slug: str, compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Результат compute() для raw_text — из кэша, если этот вывод уже разбирался
+        текущей версией парсера. Возвращает (результат, взят ли из кэша).
+        Ответы с ошибкой (ERROR: ...) не кэшируются.
+        """
+        if raw_text.startswith("ERROR:"):
+            return compute(), False
+
+        raw_hash = content_hash(raw_text)
+        cached = self.get(vendor, slug, raw_hash)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            return cached, True
+
+        result = compute()
+        self.put(vendor, slug, raw_hash, result)
+        return result, False
+
+
+_blob_store: Optional[BlobStore] = None
+_parse_cache: Optional[ParseCache] = None
+_loaded = False
+_init_lock = threading.Lock()
+
+def _init():
+    global _blob_store, _parse_cache, _loaded
+    with _init_lock:
+        if _loaded:
+            return
+        config = load_storage_config()
+        raw_config = config.get("raw") or {}
+        if raw_config.get("mode") == "blobs":
+            _blob_store = BlobStore(raw_config.get("blobs_path", RAW_BLOBS_DIR))
+        cache_config = config.get("parse_cache") or {}
+        if cache_config.get("enabled"):
+            _parse_cache = ParseCache(cache_config.get("path", PARSE_CACHE_DIR))
+        _loaded = True
+
+def get_blob_store() -> Optional[BlobStore]:
+    """BlobStore процесса, если raw.mode: blobs в config/storage.yaml, иначе None (обычные .txt)."""
+    _init()
+    return _blob_store
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """ParseCache процесса, если parse_cache.enabled в config/storage.yaml, иначе None."""
+    _init()
+    return _parse_cache
+
+def memoize_parse(raw_text: str, vendor: str, slug: str, compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+    """ParseCache.memoize, если кэш включён; иначе просто compute()."""
+    cache = get_parse_cache()
+    if cache is None:
+        return compute(), False
+    return cache.memoize(raw_text, vendor, slug, compute)
@@ -0,0 +1,233 @@
+import json
+import time
+import zipfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.storage.config import load_storage_config
+from src.storage.delta import DELTA_DIR, DeltaSnapshotReader
+from src.storage.manifest import DATA_DIR, file_timestamp, get_manifest, series_key
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+LOGS_DIR = DATA_DIR / "logs"
+
+# Категория → (каталог, рекурсивно, пропускаемые подкаталоги)
+CATEGORIES = {
+    "raw": (DATA_DIR / "raw", True, ("blobs",)),
+    "parsed": (DATA_DIR / "parsed", True, ()),
+    "snapshots_static": (DATA_DIR / "snapshots" / "static", False, ()),
+    "snapshots_dynamic": (DATA_DIR / "snapshots" / "dynamic", False, ()),
+    "counters": (DATA_DIR / "counters", False, ()),
+}
+
+# Уже сжатое в архив кладётся без повторного сжатия
+STORED_SUFFIXES = (".gz", ".zst")
+
+# Blob без ссылок удаляется не раньше чем через сутки (ссылка могла ещё не записаться)
+BLOB_GRACE_SECONDS = 86400
+
+FileItem = Tuple[Path, str, str]  # (путь, время из имени, ключ ряда)
+
+
+def _write_json(path: Path, data: Any):
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp_path.replace(path)
+
+def archive_index(category: str, day: str) -> Dict[str, Any]:
+    """Оглавление архива дня: {"category", "day", "files": [{"name", "key", "at", "size", "blob"?}]}."""
+    path = ARCHIVE_DIR / category / f"{day}.index.json"
+    if not path.exists():
+        return {"category": category, "day": day, "files": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Compactor:
+    """
+    Обслуживание data/:
+      - поопросные файлы прошлых дней (raw, parsed, снапшоты) сворачиваются
+        в data/archive/<категория>/<YYYY-MM-DD>.zip + <YYYY-MM-DD>.index.json;
+        последний файл каждого ряда (устройство + команда) остаётся на месте;
+      - файлы и архивы старше срока категории удаляются;
+      - дельта-цепочка обрезается до последнего checkpoint старше срока
+        (сами дельты не архивируются — без цепочки они бесполезны);
+      - blob'ы raw без ссылок, старые логи и записи кэша разбора удаляются;
+      - манифест последних файлов пересобирается по результатам обхода.
+    """
+
+    def __init__(self, retention: Dict[str, Any] = None, today: datetime = None, dry_run: bool = False):
+        config = load_storage_config()
+        self.retention = retention if retention is not None else config["retention"]
+        self.blobs_dir = Path((config.get("raw") or {}).get("blobs_path", DATA_DIR / "raw" / "blobs"))
+        self.parse_cache_dir = Path((config.get("parse_cache") or {}).get("path", DATA_DIR / "cache" / "parsed"))
+        self.today = (today or datetime.utcnow()).strftime("%Y-%m-%d")
+        self.dry_run = dry_run
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    def cutoff(self, category: str) -> Optional[str]:
+        """День (YYYY-MM-DD), раньше которого данные категории удаляются; None — бессрочно."""
+        days = int(self.retention.get(category) or 0)
+        if days <= 0:
+            return None
+        return (datetime.strptime(self.today, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    def _unlink(self, path: Path, counter: str):
+        self.stats[counter] += 1
+        if not self.dry_run:
+            path.unlink(missing_ok=True)
+
+    def run(self) -> Dict[str, int]:
+        latest: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for category in CATEGORIES:
+            latest[category] = self.compact_category(category)
+        self.prune_delta_chain()
+        self.prune_blobs()
+        self.prune_by_age(LOGS_DIR, "*.log", "logs")
+        self.prune_by_age(self.parse_cache_dir, "*.json", "parse_cache")
+
+        if not self.dry_run:
+            manifest = get_manifest()
+            # Дельта-снапшоты в обход не попадают — их записи переносятся из текущего манифеста
+            for key, entry in manifest.latest("snapshots_dynamic").items():
+                if entry.get("kind") == "delta" and Path(entry["path"]).exists():
+                    latest["snapshots_dynamic"][key] = entry
+            manifest.replace(latest)
+        return dict(self.stats)
+
+    def scan(self, category: str) -> List[FileItem]:
+        root, recursive, skip = CATEGORIES[category]
+        if not root.exists():
+            return []
+        items = []
+        for path in (root.rglob("*") if recursive else root.glob("*")):
+            if not path.is_file() or path.suffix == ".tmp":
+                continue
+            if skip and path.relative_to(root).parts[0] in skip:
+                continue
+            timestamp = file_timestamp(path)
+            if timestamp is not None:
+                items.append((path, timestamp, series_key(path)))
+        return items
+
+    def compact_category(self, category: str) -> Dict[str, Dict[str, Any]]:
+        """Архивирует/удаляет файлы категории; возвращает записи манифеста по последним файлам."""
+        items = self.scan(category)
+        newest: Dict[str, FileItem] = {}
+        for item in items:
+            current = newest.get(item[2])
+            if current is None or (item[1], item[0].name) > (current[1], current[0].name):
+                newest[item[2]] = item
+
+        cutoff = self.cutoff(category)
+        by_day: Dict[str, List[FileItem]] = defaultdict(list)
+        for item in items:
+            path, timestamp, key = item
+            if newest[key] is item:
+                continue
+            day = timestamp[:10]
+            if cutoff is not None and day < cutoff:
+                self._unlink(path, f"{category}_expired")
+            elif self.retention.get("archive", True) and day < self.today:
+                by_day[day].append(item)
+
+        for day, day_items in sorted(by_day.items()):
+            self._archive(category, day, day_items)
+        self._prune_archives(category, cutoff)
+
+        latest = {}
+        for key, (path, timestamp, _) in newest.items():
+            entry = {"path": path.as_posix(), "at": timestamp}
+            if path.suffix == ".ref":
+                entry["blob"] = self._ref_blob(path)
+            latest[key] = entry
+        return latest
+
+    @staticmethod
+    def _ref_blob(path: Path) -> Optional[str]:
+        try:
+            return json.loads(path.read_text(encoding="utf-8")).get("blob")
+        except (OSError, ValueError):
+            return None
+
+    def _archive(self, category: str, day: str, items: List[FileItem]):
+        self.stats[f"{category}_archived"] += len(items)
+        if self.dry_run:
+            return
+        base = ARCHIVE_DIR / category
+        base.mkdir(parents=True, exist_ok=True)
+        index = archive_index(category, day)
+        indexed = {entry["name"] for entry in index["files"]}
+
+        # Порядок: архив → оглавление → удаление исходников; повторный запуск после сбоя
+        # не дублирует ни членов архива, ни строк оглавления
+        with zipfile.ZipFile(base / f"{day}.zip", "a", compression=zipfile.ZIP_DEFLATED) as zf:
+            archived = set(zf.namelist())
+            for path, timestamp, key in items:
+                name = path.relative_to(DATA_DIR).as_posix()
+                if name not in archived:
+                    compress = zipfile.ZIP_STORED if path.suffix in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+                    zf.write(path, name, compress_type=compress)
+                if name not in indexed:
+                    entry = {"name": name, "key": key, "at": timestamp, "size": path.stat().st_size}
+                    if path.suffix == ".ref":
+                        entry["blob"] = self._ref_blob(path)
+                    index["files"].append(entry)
+        _write_json(base / f"{day}.index.json", index)
+
+        for path, _, _ in items:
+            path.unlink(missing_ok=True)
+
+    def _prune_archives(self, category: str, cutoff: Optional[str]):
+        if cutoff is None:
+            return
+        for path in sorted((ARCHIVE_DIR / category).glob("*.zip")):
+            if path.stem < cutoff:
+                self._unlink(path, f"{category}_archives_expired")
+                (ARCHIVE_DIR / category / f"{path.stem}.index.json").unlink(missing_ok=True)
+
+    def prune_delta_chain(self):
+        """Удаляет checkpoint'ы и дельты, предшествующие последнему checkpoint старше срока."""
+        cutoff = self.cutoff("snapshots_dynamic")
+        if cutoff is None or not DELTA_DIR.exists():
+            return
+        cutoff_at = datetime.strptime(cutoff, "%Y-%m-%d")
+        for state_path in DELTA_DIR.glob("*_state.json"):
+            snapshot_type = state_path.name[:-len("_state.json")]
+            files = DeltaSnapshotReader(snapshot_type).files()
+            start = None
+            for i, (timestamp, kind, _) in enumerate(files):
+                if timestamp >= cutoff_at:
+                    break
+                if kind == "checkpoint":
+                    start = i
+            for _, _, path in files[:start or 0]:
+                self._unlink(path, "delta_expired")
+
+    def prune_blobs(self):
+        """Удаляет blob'ы raw, на которые не ссылается ни живой .ref, ни оглавление архива."""
+        if not self.blobs_dir.exists():
+            return
+        referenced = set()
+        for ref in (DATA_DIR / "raw").rglob("*.ref"):
+            referenced.add(self._ref_blob(ref))
+        for index_path in (ARCHIVE_DIR / "raw").glob("*.index.json"):
+            with open(index_path, "r", encoding="utf-8") as f:
+                referenced.update(entry.get("blob") for entry in json.load(f)["files"])
+
+        grace = time.time() - BLOB_GRACE_SECONDS
+        for blob in self.blobs_dir.glob("*/*.txt"):
+            if blob.stem not in referenced and blob.stat().st_mtime < grace:
+                self._unlink(blob, "blobs_unreferenced")
+
+    def prune_by_age(self, root: Path, pattern: str, category: str):
+        """Удаляет файлы, не изменявшиеся дольше срока категории (по mtime)."""
+        days = int(self.retention.get(category) or 0)
+        if days <= 0 or not root.exists():
+            return
+        limit = time.time() - days * 86400
+        for path in root.rglob(pattern):
+            if path.is_file() and path.stat().st_mtime < limit:
+                self._unlink(path, f"{category}_expired")
@@ -0,0 +1,87 @@
+import threading
+from pathlib import Path
+
+import yaml
+
+STORAGE_CONFIG_FILE = Path("config/storage.yaml")
+
+DEFAULT_STORAGE_CONFIG = {
+    "backends": ["file"],
+    "dynamic_snapshots": {
+        "mode": "full",
+        "checkpoint_every": 48,
+        "checkpoint_max_age": 86400,
+    },
+    "serializer": {
+        "format": "json",
+        "compression": "none",
+        "encoder": "auto",
+        "pretty": True,
+    },
+    "sqlite": {
+        "path": "data/history.sqlite3",
+    },
+    "raw": {
+        "mode": "files",
+        "blobs_path": "data/raw/blobs",
+    },
+    "parse_cache": {
+        "enabled": False,
+        "path": "data/cache/parsed",
+    },
+    "retention": {
+        "archive": True,
+        "raw": 30,
+        "parsed": 30,
+        "snapshots_static": 365,
+        "snapshots_dynamic": 90,
+        "logs": 30,
+        "parse_cache": 30,
+        "counters": 90,
+    },
+}
+
+
+_cached = {}  # {"stamp": mtime файла (None — файла нет), "config": ...}
+_cache_lock = threading.Lock()
+
+def _read_storage_config() -> dict:
+    config = {
+        section: dict(values) if isinstance(values, dict) else list(values)
+        for section, values in DEFAULT_STORAGE_CONFIG.items()
+    }
+
+    if not STORAGE_CONFIG_FILE.exists():
+        return config
+
+    with open(STORAGE_CONFIG_FILE, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    for section, values in (data.get("storage") or {}).items():
+        if isinstance(values, dict):
+            config.setdefault(section, {}).update({k: v for k, v in values.items() if v is not None})
+        elif values is not None:
+            config[section] = values
+    return config
+
+def load_storage_config() -> dict:
+    """
+    Секция storage из config/storage.yaml поверх значений по умолчанию (по подсекциям).
+    Файл разбирается один раз на процесс и заново — только если изменилось его mtime
+    (вызывается по устройствам и циклам); возвращается копия.
+    """
+    try:
+        stamp = STORAGE_CONFIG_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        stamp = None
+    with _cache_lock:
+        if "config" not in _cached or _cached["stamp"] != stamp:
+            _cached.update(stamp=stamp, config=_read_storage_config())
+        config = _cached["config"]
+    return {section: dict(values) if isinstance(values, dict) else values for section, values in config.items()}
+
+
+def enabled_backends(config: dict = None) -> set:
+    """Включённые backend'ы хранения: file, sqlite."""
+    config = config or load_storage_config()
+    return set(config.get("backends") or ["file"])
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.models.entry_store import json_default
+
+DELTA_DIR = Path("data/snapshots/dynamic/delta")
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """Хеш записи: по нему дифф — линейный проход без сравнения полей."""
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=json_default)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+def _dump(path: Path, data: Dict[str, Any]):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=json_default)
+    tmp_path.replace(path)
+
+def _parse_timestamp(value: Union[str, datetime, None]) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    for fmt in (TIMESTAMP_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.rstrip("Z").split(".")[0], fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Не удалось разобрать время: {value}")
+
+
+class DeltaSnapshotWriter:
+    """
+    Дельта-снапшоты таблицы (по умолчанию — хосты, ключ MAC).
+    Каждый опрос пишет только добавленные, изменённые и удалённые записи
+    относительно предыдущего; раз в checkpoint_every дельт (или checkpoint_max_age
+    секунд) — полный checkpoint. Хеши записей предыдущего опроса лежат в state-файле,
+    поэтому предыдущий снапшот не перечитывается.
+
+    Файлы (в base_dir, имена сортируются по времени):
+      {ts}_{type}_checkpoint.json — полный снапшот
+      {ts}_{type}_delta.json      — {"snapshot": ..., "added": [...], "changed": [...], "removed": [ключи]}
+    """
+
+    def __init__(
+        self,
+        snapshot_type: str = "hosts",
+        base_dir: Path = DELTA_DIR,
+        key: str = "mac",
+        records_key: str = "hosts",
+        checkpoint_every: int = 48,
+        checkpoint_max_age: int = 86400
+    ):
+        self.snapshot_type = snapshot_type
+        self.base_dir = Path(base_dir)
+        self.key = key
+        self.records_key = records_key
+        self.checkpoint_every = max(0, int(checkpoint_every))
+        self.checkpoint_max_age = int(checkpoint_max_age)
+        self.state_path = self.base_dir / f"{snapshot_type}_state.json"
+        self._state: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, snapshot_type: str = "hosts") -> "DeltaSnapshotWriter":
+        return cls(
+            snapshot_type=snapshot_type,
+            records_key=snapshot_type,
+            checkpoint_every=config.get("checkpoint_every", 48),
+            checkpoint_max_age=config.get("checkpoint_max_age", 86400),
+        )
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self._state is None:
+            self._state = {}
+            if self.state_path.exists():
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    self._state = json.load(f)
+        return self._state
+
+    def _needs_checkpoint(self, state: Dict[str, Any], now: datetime) -> bool:
+        checkpoint = state.get("checkpoint")
+        if not checkpoint or not (self.base_dir / checkpoint).exists():
+            return True
+        if state.get("deltas", 0) >= self.checkpoint_every:
+            return True
+        checkpoint_at = _parse_timestamp(state.get("checkpoint_at"))
+        return checkpoint_at is None or (now - checkpoint_at).total_seconds() >= self.checkpoint_max_age
+
+    def write(self, snapshot: Dict[str, Any], now: datetime = None) -> Path:
+        now = now or datetime.utcnow()
+        timestamp = now.strftime(TIMESTAMP_FORMAT)
+        records = snapshot.get(self.records_key) or []
+        hashes = {record[self.key]: record_hash(record) for record in records}
+
+        with self._lock:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            state = self._load_state()
+
+            if self._needs_checkpoint(state, now):
+                path = self.base_dir / f"{timestamp}_{self.snapshot_type}_checkpoint.json"
+                meta = dict(snapshot.get("snapshot") or {}, kind="checkpoint")
+                _dump(path, dict(snapshot, snapshot=meta))
+                state = {"checkpoint": path.name, "checkpoint_at": timestamp, "deltas": 0}
+                print(f"Сохранён checkpoint ({len(records)} записей): {path}")
+            else:
+                previous = state.get("hashes") or {}
+                added, changed = [], []
+                for record in records:
+                    old_hash = previous.get(record[self.key])
+                    if old_hash is None:
+                        added.append(record)
+                    elif old_hash != hashes[record[self.key]]:
+                        changed.append(record)
+                removed = [k for k in previous if k not in hashes]
+
+                path = self.base_dir / f"{timestamp}_{self.snapshot_type}_delta.json"
+                meta = dict(
+                    snapshot.get("snapshot") or {},
+                    kind="delta",
+                    base=state["checkpoint"],
+                    previous=state.get("last"),
+                    added_count=len(added),
+                    changed_count=len(changed),
+                    removed_count=len(removed),
+                )
+                extra = {k: v for k, v in snapshot.items() if k not in ("snapshot", self.records_key)}
+                _dump(path, {"snapshot": meta, **extra, "added": added, "changed": changed, "removed": removed})
+                state = dict(state, deltas=state.get("deltas", 0) + 1)
+                print(f"Сохранена дельта (+{len(added)} ~{len(changed)} -{len(removed)} из {len(records)}): {path}")
+
+            state["last"] = path.name
+            state["hashes"] = hashes
+            _dump(self.state_path, state)
+            self._state = state
+            return path
+
+
+class DeltaSnapshotReader:
+    """Восстановление таблицы на любой момент: ближайший checkpoint не позже момента + дельты после него."""
+
+    def __init__(self, snapshot_type: str = "hosts", base_dir: Path = DELTA_DIR, key: str = "mac", records_key: str = "hosts"):
+        self.snapshot_type = snapshot_type
+        self.base_dir = Path(base_dir)
+        self.key = key
+        self.records_key = records_key
+
+    def files(self) -> List[Tuple[datetime, str, Path]]:
+        """(время, checkpoint|delta, путь) по возрастанию времени."""
+        found = []
+        for kind in ("checkpoint", "delta"):
+            for path in self.base_dir.glob(f"*_{self.snapshot_type}_{kind}.json"):
+                try:
+                    found.append((datetime.strptime(path.name[:19], TIMESTAMP_FORMAT), kind, path))
+                except ValueError:
+                    continue
+        return sorted(found)
+
+    def timestamps(self) -> List[datetime]:
+        return [ts for ts, _, _ in self.files()]
+
+    def load_at(self, when: Union[str, datetime, None] = None) -> Optional[Dict[str, Any]]:
+        """
+        Таблица на момент when (None — последняя). Возвращает снапшот в формате полного:
+        {"snapshot": метаданные последнего применённого файла, records_key: [...]}, либо None.
+        Порядок записей: как в checkpoint, новые — в конце.
+        """
+        when = _parse_timestamp(when)
+        files = [f for f in self.files() if when is None or f[0] <= when]
+        checkpoints = [i for i, (_, kind, _) in enumerate(files) if kind == "checkpoint"]
+        if not checkpoints:
+            return None
+
+        start = checkpoints[-1]
+        with open(files[start][2], "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        table = {record[self.key]: record for record in snapshot.get(self.records_key) or []}
+        meta = snapshot.get("snapshot") or {}
+        extra = {k: v for k, v in snapshot.items() if k not in ("snapshot", self.records_key)}
+
+        for _, _, path in files[start + 1:]:
+            with open(path, "r", encoding="utf-8") as f:
+                delta = json.load(f)
+            for k in delta.get("removed") or []:
+                table.pop(k, None)
+            for record in delta.get("changed") or []:
+                table[record[self.key]] = record
+            for record in delta.get("added") or []:
+                table[record[self.key]] = record
+            meta = delta.get("snapshot") or meta
+            extra.update({k: v for k, v in delta.items() if k not in ("snapshot", "added", "changed", "removed")})
+
+        meta = dict(meta, reconstructed_from=files[start][2].name, deltas_applied=len(files) - start - 1)
+        return {"snapshot": meta, **extra, self.records_key: list(table.values())}
+
+
+_writers: Dict[str, DeltaSnapshotWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_delta_writer(snapshot_type: str, config: dict) -> DeltaSnapshotWriter:
+    """Писатель на тип снапшота — один на процесс (хеши предыдущего опроса держит в памяти)."""
+    with _writers_lock:
+        writer = _writers.get(snapshot_type)
+        if writer is None:
+            writer = _writers[snapshot_type] = DeltaSnapshotWriter.from_config(config, snapshot_type)
+        return writer
@@ -1,12 +1,184 @@
-from typing import Dict
+from typing import Any, BinaryIO, Dict, Iterator, Optional
 from pathlib import Path
 from datetime import datetime
+import gzip
+import io
 import json
 
-from typing import Dict
-from pathlib import Path
-from datetime import datetime
-import json
+from src.models.entry_store import json_default
+from src.storage.config import load_storage_config
+from src.storage.delta import get_delta_writer
+from src.storage.manifest import record_latest, series_key
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: без неё — стандартный json
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость: без неё zstd недоступен
+    zstandard = None
+
+SERIALIZER_FORMATS = ("json", "ndjson")
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Сколько строк NDJSON копить перед одним write()
+NDJSON_CHUNK = 1000
+
+
+def _is_records(value: Any) -> bool:
+    """Список записей (или колоночное хранилище) — в NDJSON пишется построчно."""
+    return isinstance(value, list) or hasattr(value, "iter_dicts")
+
+def _iter_records(value: Any) -> Iterator[Any]:
+    return value.iter_dicts() if hasattr(value, "iter_dicts") else iter(value)
+
+
+class Serializer:
+    """
+    Сериализатор файлов data/.
+      format: json   — один JSON-документ (pretty: true — с отступами, как раньше)
+              ndjson — по записи на строку, пишется по мере обхода (без сборки
+                       всего текста в памяти): {"_header": {...}}, затем для каждого
+                       списка документа {"_section": ключ} и его записи
+      compression: none | gzip | zstd (zstd — если установлен zstandard)
+      encoder: auto (orjson, если установлен) | json | orjson
+    """
+
+    def __init__(self, format: str = "json", compression: str = "none", encoder: str = "auto",
+                 pretty: bool = True, level: Optional[int] = None):
+        if format not in SERIALIZER_FORMATS:
+            raise ValueError(f"Неизвестный формат сериализации: {format}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Неизвестное сжатие: {compression}")
+        if compression == "zstd" and zstandard is None:
+            print("zstandard не установлен — вместо zstd используем gzip")
+            compression = "gzip"
+        if encoder == "orjson" and orjson is None:
+            print("orjson не установлен — используем стандартный json")
+        self.format = format
+        self.compression = compression
+        self.use_orjson = encoder in ("auto", "orjson") and orjson is not None
+        self.pretty = bool(pretty)
+        self.level = level
+
+    @classmethod
+    def from_config(cls, config: dict = None) -> "Serializer":
+        config = config if config is not None else load_storage_config().get("serializer") or {}
+        return cls(
+            format=config.get("format", "json"),
+            compression=config.get("compression", "none"),
+            encoder=config.get("encoder", "auto"),
+            pretty=config.get("pretty", True),
+            level=config.get("level"),
+        )
+
+    @property
+    def suffix(self) -> str:
+        return f".{self.format}{COMPRESSIONS[self.compression]}"
+
+    def encode(self, obj: Any) -> bytes:
+        """Компактный JSON одной записи."""
+        if self.use_orjson:
+            return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8")
+
+    def _open(self, path: Path) -> BinaryIO:
+        if self.compression == "gzip":
+            return gzip.open(path, "wb", compresslevel=self.level or 6)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.level or 3).stream_writer(open(path, "wb"))
+        return open(path, "wb")
+
+    def _write_json(self, f: BinaryIO, document: Dict[str, Any]):
+        if not self.pretty:
+            f.write(self.encode(document))
+        elif self.use_orjson:
+            f.write(orjson.dumps(document, default=json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2))
+        else:
+            text = io.TextIOWrapper(f, encoding="utf-8")
+            json.dump(document, text, ensure_ascii=False, indent=2, default=json_default)
+            text.flush()
+            text.detach()
+
+    def _write_ndjson(self, f: BinaryIO, document: Dict[str, Any]):
+        encode = self.encode
+        header = {k: v for k, v in document.items() if not _is_records(v)}
+        f.write(encode({"_header": header}) + b"\n")
+
+        for key, value in document.items():
+            if not _is_records(value):
+                continue
+            f.write(encode({"_section": key}) + b"\n")
+            chunk = []
+            for record in _iter_records(value):
+                chunk.append(encode(record))
+                if len(chunk) >= NDJSON_CHUNK:
+                    f.write(b"\n".join(chunk) + b"\n")
+                    chunk = []
+            if chunk:
+                f.write(b"\n".join(chunk) + b"\n")
+
+    def dump(self, document: Dict[str, Any], path: Path) -> Path:
+        """Пишет документ в path (расширение .json заменяется на suffix сериализатора)."""
+        path = Path(path)
+        if path.suffix == ".json":
+            path = path.with_suffix("")
+        path = path.with_name(path.name + self.suffix)
+
+        with self._open(path) as f:
+            if self.format == "ndjson":
+                self._write_ndjson(f, document)
+            else:
+                self._write_json(f, document)
+        return path
+
+
+def _open_for_read(path: Path) -> BinaryIO:
+    name = path.name
+    if name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Для чтения {path} нужен zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
+
+def read_document(path) -> Dict[str, Any]:
+    """Читает файл любого из форматов Serializer (json/ndjson, со сжатием или без)."""
+    path = Path(path)
+    stem = path.name.removesuffix(".gz").removesuffix(".zst")
+    with _open_for_read(path) as f:
+        if not stem.endswith(".ndjson"):
+            return json.load(f)
+
+        document: Dict[str, Any] = {}
+        section = None
+        for line in io.TextIOWrapper(f, encoding="utf-8"):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, dict) and len(item) == 1:
+                if "_header" in item:
+                    document.update(item["_header"])
+                    continue
+                if "_section" in item:
+                    section = document.setdefault(item["_section"], [])
+                    continue
+            if section is not None:
+                section.append(item)
+        return document
+
+
+_serializer: Optional[Serializer] = None
+
+def get_serializer() -> Serializer:
+    """Сериализатор из config/storage.yaml (секция serializer) — один на процесс."""
+    global _serializer
+    if _serializer is None:
+        _serializer = Serializer.from_config()
+    return _serializer
 
 def save_parsed(parsed_data: Dict, identifier: str, command_slug: str):
     timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
@@ -21,6 +193,9 @@ def save_parsed(parsed_data: Dict, identifier: str, command_slug: str):
         subfolder = "macs" if command_slug == "mac_address_table" else "arps"
         base_path = base_path / subfolder
 
+    elif command_slug == "interface_status":  # состояние интерфейсов с SNMP-устройств
+        base_path = Path("data/parsed/dynamic/interfaces")
+
     elif command_slug in ["dhcp_leases", "dhcp_reservations"]:
         base_path = Path("data/parsed/dynamic")
         subfolder = "dhcp_leases" if command_slug == "dhcp_leases" else "dhcp_reservations"
@@ -34,16 +209,19 @@ def save_parsed(parsed_data: Dict, identifier: str, command_slug: str):
 
     base_path.mkdir(parents=True, exist_ok=True)
 
-    filename = base_path / f"{identifier}_{timestamp}_{command_slug}.json"
-
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+    # Колоночные хранилища MAC/ARP превращаются в словари только здесь, при записи
+    filename = get_serializer().dump(parsed_data, base_path / f"{identifier}_{timestamp}_{command_slug}.json")
 
+    record_latest("parsed", filename)
     print(f"Сохранён parsed ({command_slug}): {filename}")
 
+def static_snapshot_key(identifier: str) -> str:
+    """Ключ ряда статических снапшотов устройства в манифесте (категория snapshots_static)."""
+    return series_key(Path(f"data/snapshots/static/{identifier}_static_snapshot.json"))
+
 def save_snapshot(snapshot: Dict, identifier: str = None):
     """
-    Сохраняет snapshot в JSON.
+    Сохраняет snapshot (формат — config/storage.yaml, секция serializer).
     Если identifier задан — используем его в имени файла.
     """
     timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
@@ -52,19 +230,32 @@ def save_snapshot(snapshot: Dict, identifier: str = None):
     
     Path("data/snapshots/static").mkdir(parents=True, exist_ok=True)
     
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    filename = get_serializer().dump(snapshot, filename)
     
+    record_latest("snapshots_static", filename)
     print(f"Сохранён snapshot: {filename}")
+    return filename
 
 # src/storage/file.py (добавляем в конец файла)
 def save_dynamic_snapshot(snapshot: Dict, snapshot_type: str = "hosts"):
+    """
+    mode: full — снапшот целиком (как раньше); mode: delta — только изменения
+    относительно прошлого опроса + периодический checkpoint (config/storage.yaml).
+    """
+    snapshot_config = load_storage_config()["dynamic_snapshots"]
+    if snapshot_config.get("mode") == "delta" and snapshot_type in snapshot:
+        path = get_delta_writer(snapshot_type, snapshot_config).write(snapshot)
+        record_latest("snapshots_dynamic", path, key=f"snapshots/dynamic/{snapshot_type}_snapshot",
+                      kind="delta", snapshot_type=snapshot_type)
+        return path
+
     timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
     filename = f"data/snapshots/dynamic/{timestamp}_{snapshot_type}_snapshot.json"
     
     Path("data/snapshots/dynamic").mkdir(parents=True, exist_ok=True)
     
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    filename = get_serializer().dump(snapshot, filename)
+    record_latest("snapshots_dynamic", filename)
     
-    print(f"Сохранён dynamic snapshot: {filename}")
\ No newline at end of file
+    print(f"Сохранён dynamic snapshot: {filename}")
+    return filename
@@ -0,0 +1,159 @@
+import atexit
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DATA_DIR = Path("data")
+MANIFEST_FILE = DATA_DIR / "manifest" / "latest.json"
+
+# Как часто (не чаще) сбрасывать манифест на диск при записи файлов; остальное — при выходе
+MANIFEST_FLUSH_INTERVAL = 5.0
+
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}")
+
+# Расширения, которые не входят в ключ ряда (смена формата сериализации не начинает новый ряд)
+SERIES_SUFFIXES = (".json", ".ndjson", ".gz", ".zst", ".txt", ".ref")
+
+
+def file_timestamp(path: Path) -> Optional[str]:
+    """Время опроса из имени файла (YYYY-MM-DD_HH-MM-SS) или None, если файл не «поопросный»."""
+    found = TIMESTAMP_RE.search(Path(path).name)
+    return found.group(0) if found else None
+
+def series_key(path: Path) -> str:
+    """
+    Ключ ряда файлов: путь относительно data/ без времени и расширений в имени.
+    data/parsed/static/10.0.0.1_2026-01-01_00-00-00_vlan.ndjson → parsed/static/10.0.0.1_vlan
+    """
+    path = Path(path)
+    try:
+        relative = path.relative_to(DATA_DIR)
+    except ValueError:
+        relative = path
+    name = TIMESTAMP_RE.sub("", relative.name, count=1)
+    while Path(name).suffix in SERIES_SUFFIXES:
+        name = name[:-len(Path(name).suffix)]
+    name = re.sub(r"__+", "_", name).strip("_")
+    return (relative.parent / name).as_posix()
+
+
+class LatestManifest:
+    """
+    Манифест последних файлов data/: {категория: {ключ ряда: {"path", "at", ...}}}.
+    Писатели отмечают каждый новый файл (record), читатели берут путь из манифеста
+    вместо glob по большим каталогам. На диск пишется с объединением с уже лежащим
+    файлом (там могут быть записи другого процесса) — не чаще MANIFEST_FLUSH_INTERVAL
+    и при завершении процесса; compaction пересобирает манифест целиком.
+    """
+
+    def __init__(self, path: Path = MANIFEST_FILE, flush_interval: float = MANIFEST_FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._dirty = False
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._disk: Optional[tuple] = None  # ((mtime_ns, size), latest) — последнее прочитанное с диска
+
+    def _read_disk(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        # Файл разбирается заново, только если изменился: читатели (проба изменений
+        # по каждому устройству) спрашивают манифест часто
+        try:
+            stat = self.path.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._disk is None or self._disk[0] != stamp:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._disk = (stamp, json.load(f).get("latest", {}))
+        except (FileNotFoundError, ValueError):
+            return {}
+        return {category: dict(entries) for category, entries in self._disk[1].items()}
+
+    def record(self, category: str, path: Path, key: str = None, **extra):
+        """Новый файл ряда; key — явный ключ (по умолчанию series_key(path))."""
+        path = Path(path)
+        entry = {"path": path.as_posix(), "at": file_timestamp(path) or datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S"), **extra}
+        with self._lock:
+            self._entries.setdefault(category, {})[key or series_key(path)] = entry
+            self._dirty = True
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read_disk()
+            for category, entries in self._entries.items():
+                target = merged.setdefault(category, {})
+                for key, entry in entries.items():
+                    current = target.get(key)
+                    if current is None or current.get("at", "") <= entry["at"]:
+                        target[key] = entry
+            self._write(merged)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+
+    def replace(self, latest: Dict[str, Dict[str, Dict[str, Any]]]):
+        """
+        Пересборка категорий из latest (compaction); остальные категории остаются как есть.
+        Записи этого процесса новее — сохраняются поверх.
+        """
+        with self._lock:
+            merged = self._read_disk()
+            merged.update({category: dict(entries) for category, entries in latest.items()})
+            for category, entries in self._entries.items():
+                target = merged.setdefault(category, {})
+                for key, entry in entries.items():
+                    if key not in target or target[key].get("at", "") <= entry["at"]:
+                        target[key] = entry
+            self._write(merged)
+            self._dirty = False
+
+    def _write(self, latest: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"updated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z", "latest": latest}
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def latest(self, category: str, key: str = None) -> Any:
+        """Записи категории ({ключ: запись}) или одна запись по ключу ряда — с учётом ещё не сброшенных."""
+        with self._lock:
+            entries = dict(self._read_disk().get(category, {}))
+            entries.update(self._entries.get(category, {}))
+        return entries if key is None else entries.get(key)
+
+
+_manifest: Optional[LatestManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_manifest() -> LatestManifest:
+    """Манифест процесса; несброшенные записи пишутся при выходе."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = LatestManifest()
+            atexit.register(_manifest.flush)
+        return _manifest
+
+def record_latest(category: str, path, key: str = None, **extra):
+    get_manifest().record(category, path, key=key, **extra)
+
+def load_latest(category: str, key: str) -> Optional[Dict[str, Any]]:
+    """
+    Документ последнего файла ряда (read_document). Для дельта-снапшотов
+    (kind: delta) — таблица, восстановленная DeltaSnapshotReader.
+    """
+    entry = get_manifest().latest(category, key)
+    if entry is None:
+        return None
+    if entry.get("kind") == "delta":
+        from src.storage.delta import DeltaSnapshotReader
+        return DeltaSnapshotReader(entry["snapshot_type"], records_key=entry["snapshot_type"]).load_at()
+    from src.storage.file import read_document
+    return read_document(entry["path"])
@@ -0,0 +1,92 @@
+import math
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class RingBuffer:
+    """
+    Кольцевой буфер отсчётов фиксированной ёмкости: время — array('d'), каждое поле —
+    своя колонка array('f') (float32). Память выделяется один раз в конструкторе и не
+    растёт: новый отсчёт затирает самый старый. Пропущенное значение — NaN.
+    """
+
+    __slots__ = ("capacity", "fields", "times", "columns", "head", "count")
+
+    def __init__(self, capacity: int, fields: Sequence[str]):
+        self.capacity = max(1, int(capacity))
+        self.fields = tuple(fields)
+        self.times = array("d", bytes(8 * self.capacity))
+        self.columns = {field: array("f", bytes(4 * self.capacity)) for field in self.fields}
+        self.head = 0   # куда пишется следующий отсчёт
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, timestamp: float, values: Dict[str, Optional[float]]):
+        head = self.head
+        self.times[head] = timestamp
+        for field, column in self.columns.items():
+            value = values.get(field)
+            column[head] = math.nan if value is None else value
+        self.head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _positions(self) -> Iterator[int]:
+        """Позиции отсчётов от старого к новому."""
+        start = (self.head - self.count) % self.capacity
+        for i in range(self.count):
+            yield (start + i) % self.capacity
+
+    def samples(self, since: float = None, until: float = None) -> Iterator[Tuple[float, Dict[str, Optional[float]]]]:
+        """(время, {поле: значение или None}) от старых к новым; since включительно, until — нет."""
+        for pos in self._positions():
+            timestamp = self.times[pos]
+            if (since is not None and timestamp < since) or (until is not None and timestamp >= until):
+                continue
+            values = {}
+            for field, column in self.columns.items():
+                value = column[pos]
+                values[field] = None if math.isnan(value) else value
+            yield timestamp, values
+
+    def latest(self) -> Optional[Tuple[float, Dict[str, Optional[float]]]]:
+        if not self.count:
+            return None
+        pos = (self.head - 1) % self.capacity
+        return self.times[pos], {
+            field: (None if math.isnan(column[pos]) else column[pos]) for field, column in self.columns.items()
+        }
+
+    def downsample(self, bucket: float, since: float = None, until: float = None) -> List[Dict[str, float]]:
+        """
+        Свёртка по интервалам bucket секунд (границы кратны bucket): для каждого поля
+        среднее и максимум по непустым значениям, плюс число отсчётов интервала.
+        """
+        buckets: Dict[float, Dict[str, list]] = {}
+        for timestamp, values in self.samples(since, until):
+            start = timestamp - timestamp % bucket
+            acc = buckets.get(start)
+            if acc is None:
+                acc = buckets[start] = {"samples": [0], **{field: [0.0, 0, -math.inf] for field in self.fields}}
+            acc["samples"][0] += 1
+            for field, value in values.items():
+                if value is None:
+                    continue
+                total = acc[field]
+                total[0] += value
+                total[1] += 1
+                total[2] = max(total[2], value)
+
+        rows = []
+        for start, acc in sorted(buckets.items()):
+            row = {"ts": start, "samples": acc["samples"][0]}
+            for field in self.fields:
+                total, n, peak = acc[field]
+                row[f"{field}_avg"] = total / n if n else None
+                row[f"{field}_max"] = peak if n else None
+            rows.append(row)
+        return rows
+
+    def nbytes(self) -> int:
+        return self.times.itemsize * len(self.times) + sum(c.itemsize * len(c) for c in self.columns.values())
@@ -0,0 +1,278 @@
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from src.models.entry_store import iter_mac_rows, iter_arp_rows
+from src.storage.config import enabled_backends, load_storage_config
+
+DEFAULT_SQLITE_PATH = Path("data/history.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,              -- dynamic / static
+    seen_at TEXT NOT NULL,           -- UTC, ISO 8601 (сравнивается как строка)
+    devices_count INTEGER,
+    hosts_count INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS hosts (
+    run_id INTEGER NOT NULL,
+    seen_at TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    ip TEXT,
+    status TEXT,
+    type TEXT,
+    vlan TEXT,
+    port TEXT,
+    device_ip TEXT,
+    device_hostname TEXT,
+    hostname TEXT,
+    description TEXT,
+    dhcp_server TEXT,
+    lease_end TEXT
+);
+CREATE INDEX IF NOT EXISTS hosts_mac ON hosts (mac, seen_at);
+CREATE INDEX IF NOT EXISTS hosts_ip ON hosts (ip, seen_at);
+
+CREATE TABLE IF NOT EXISTS mac_sightings (
+    run_id INTEGER NOT NULL,
+    seen_at TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    vlan TEXT,
+    port TEXT,
+    device_ip TEXT,
+    device_hostname TEXT
+);
+CREATE INDEX IF NOT EXISTS mac_sightings_mac ON mac_sightings (mac, seen_at);
+CREATE INDEX IF NOT EXISTS mac_sightings_port ON mac_sightings (device_ip, port, seen_at);
+
+CREATE TABLE IF NOT EXISTS arp (
+    run_id INTEGER NOT NULL,
+    seen_at TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    interface TEXT,
+    device_ip TEXT
+);
+CREATE INDEX IF NOT EXISTS arp_ip ON arp (ip, seen_at);
+CREATE INDEX IF NOT EXISTS arp_mac ON arp (mac, seen_at);
+
+CREATE TABLE IF NOT EXISTS dhcp_leases (
+    run_id INTEGER NOT NULL,
+    seen_at TEXT NOT NULL,
+    mac TEXT,
+    ip TEXT,
+    dhcp_server TEXT,
+    source TEXT,                     -- lease / reservation
+    hostname TEXT,
+    description TEXT,
+    lease_end TEXT
+);
+CREATE INDEX IF NOT EXISTS dhcp_leases_mac ON dhcp_leases (mac, seen_at);
+CREATE INDEX IF NOT EXISTS dhcp_leases_ip ON dhcp_leases (ip, seen_at);
+
+CREATE TABLE IF NOT EXISTS interfaces (
+    run_id INTEGER NOT NULL,
+    seen_at TEXT NOT NULL,
+    device_ip TEXT NOT NULL,
+    device_hostname TEXT,
+    name TEXT NOT NULL,
+    description TEXT,
+    status TEXT,
+    vlan TEXT,
+    duplex TEXT,
+    speed TEXT,
+    type TEXT,
+    mode TEXT
+);
+CREATE INDEX IF NOT EXISTS interfaces_device ON interfaces (device_ip, name, seen_at);
+"""
+
+
+def _iso(value: Union[str, datetime, None]) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat(timespec="seconds")
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+class SqliteStorage:
+    """
+    История в SQLite: хосты, MAC-наблюдения, ARP, DHCP и интерфейсы по опросам.
+    Каждый опрос пишется одной транзакцией (executemany по таблицам), чтение —
+    по индексам (MAC, IP, устройство/порт) с фильтром по времени.
+    Соединение одно на процесс, запись — под блокировкой (статика пишет из потоков).
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: dict = None) -> "SqliteStorage":
+        config = config or load_storage_config()
+        return cls((config.get("sqlite") or {}).get("path", DEFAULT_SQLITE_PATH))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _new_run(self, kind: str, seen_at: str, devices_count: int = None, hosts_count: int = None) -> int:
+        cursor = self.conn.execute(
+            "INSERT INTO runs (kind, seen_at, devices_count, hosts_count) VALUES (?, ?, ?, ?)",
+            (kind, seen_at, devices_count, hosts_count),
+        )
+        return cursor.lastrowid
+
+    # Запись
+
+    def write_dynamic_run(
+        self,
+        hosts: List[Dict[str, Any]],
+        mac_entries: Iterable = (),
+        arp_entries: Iterable = (),
+        dhcp_leases: Iterable[Dict[str, Any]] = (),
+        devices_count: int = None,
+        seen_at: Union[str, datetime, None] = None
+    ) -> int:
+        """Один динамический опрос — одна транзакция. Возвращает id опроса."""
+        seen_at = _iso(seen_at) or _now()
+        with self._lock, self.conn:
+            run_id = self._new_run("dynamic", seen_at, devices_count, len(hosts))
+            self.conn.executemany(
+                "INSERT INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, seen_at, h["mac"], h.get("ip"), h.get("status"), h.get("type"), h.get("vlan"),
+                     h.get("port"), h.get("device_ip"), h.get("device_hostname"), h.get("hostname"),
+                     h.get("description"), h.get("dhcp_server"), h.get("lease_end"))
+                    for h in hosts
+                ),
+            )
+            self.conn.executemany(
+                "INSERT INTO mac_sightings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, seen_at, mac, vlan, port, device_ip, device_hostname)
+                    for mac, vlan, _type, port, device_ip, device_hostname in iter_mac_rows(mac_entries)
+                ),
+            )
+            self.conn.executemany(
+                "INSERT INTO arp VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, seen_at, ip, mac, interface, device_ip)
+                    for ip, mac, _age, _type, interface, device_ip, _device_hostname in iter_arp_rows(arp_entries)
+                ),
+            )
+            self.conn.executemany(
+                "INSERT INTO dhcp_leases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, seen_at, lease.get("mac"), lease.get("ip"), lease.get("dhcp_server"), lease.get("source"),
+                     lease.get("hostname") or lease.get("name"), lease.get("description"), lease.get("lease_end"))
+                    for lease in dhcp_leases or ()
+                ),
+            )
+        print(f"[SQLITE] Опрос {run_id}: хостов {len(hosts)} → {self.path}")
+        return run_id
+
+    def write_interfaces(
+        self,
+        device_ip: str,
+        interfaces: List[Dict[str, Any]],
+        device_hostname: str = None,
+        seen_at: Union[str, datetime, None] = None
+    ) -> int:
+        """Интерфейсы одного устройства из статического опроса."""
+        seen_at = _iso(seen_at) or _now()
+        with self._lock, self.conn:
+            run_id = self._new_run("static", seen_at, 1)
+            self.conn.executemany(
+                "INSERT INTO interfaces VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, seen_at, device_ip, device_hostname, i["name"], i.get("description"), i.get("status"),
+                     i.get("vlan"), i.get("duplex"), None if i.get("speed") is None else str(i.get("speed")),
+                     i.get("type"), i.get("mode"))
+                    for i in interfaces
+                ),
+            )
+        return run_id
+
+    # Запросы
+
+    def _select(self, table: str, where: Dict[str, Any], since=None, until=None, limit: int = None) -> List[Dict[str, Any]]:
+        clauses = [f"{column} = ?" for column in where]
+        params = list(where.values())
+        if since is not None:
+            clauses.append("seen_at >= ?")
+            params.append(_iso(since))
+        if until is not None:
+            clauses.append("seen_at <= ?")
+            params.append(_iso(until))
+        sql = f"SELECT * FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY seen_at"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def host_history(self, mac: str, since=None, until=None) -> List[Dict[str, Any]]:
+        """Итоговые записи хоста по опросам."""
+        return self._select("hosts", {"mac": mac}, since, until)
+
+    def mac_history(self, mac: str, since=None, until=None) -> List[Dict[str, Any]]:
+        """Где был виден MAC: все устройства/порты по опросам."""
+        return self._select("mac_sightings", {"mac": mac}, since, until)
+
+    def ip_history(self, ip: str, since=None, until=None) -> Dict[str, List[Dict[str, Any]]]:
+        """Какие MAC держали IP: по ARP и по DHCP."""
+        return {
+            "arp": self._select("arp", {"ip": ip}, since, until),
+            "dhcp": self._select("dhcp_leases", {"ip": ip}, since, until),
+        }
+
+    def port_history(self, device_ip: str, port: str, since=None, until=None) -> List[Dict[str, Any]]:
+        """Что было видно за портом устройства."""
+        return self._select("mac_sightings", {"device_ip": device_ip, "port": port}, since, until)
+
+    def interface_history(self, device_ip: str, name: str = None, since=None, until=None) -> List[Dict[str, Any]]:
+        where = {"device_ip": device_ip}
+        if name is not None:
+            where["name"] = name
+        return self._select("interfaces", where, since, until)
+
+    def last_seen(self, mac: str, until=None) -> Optional[Dict[str, Any]]:
+        """Последнее наблюдение MAC не позже until ("где был MAC X во вторник")."""
+        clauses, params = ["mac = ?"], [mac]
+        if until is not None:
+            clauses.append("seen_at <= ?")
+            params.append(_iso(until))
+        sql = f"SELECT * FROM mac_sightings WHERE {' AND '.join(clauses)} ORDER BY seen_at DESC LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+
+_storage: Optional[SqliteStorage] = None
+_storage_lock = threading.Lock()
+
+def get_history_storage(config: dict = None) -> Optional[SqliteStorage]:
+    """SqliteStorage процесса, если backend sqlite включён в config/storage.yaml, иначе None."""
+    global _storage
+    config = config or load_storage_config()
+    if "sqlite" not in enabled_backends(config):
+        return None
+    with _storage_lock:
+        if _storage is None:
+            _storage = SqliteStorage.from_config(config)
+        return _storage